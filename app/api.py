@@ -2,18 +2,75 @@
 Endpoints da API REST
 """
 
-from fastapi import APIRouter, HTTPException, Query
+import asyncio
+import math
+import time
+from fastapi import APIRouter, Header, HTTPException, Query, Request
+from fastapi.responses import FileResponse, JSONResponse
 from typing import Optional
 from app.models import (
     CryptoInfo, PredictionResponse, TechnicalAnalysis,
-    CryptoListResponse, ErrorResponse
+    CryptoListResponse, ErrorResponse, BatchAnalysisRequest, BatchAnalysisResponse,
+    TrainingJob, TrainingJobResponse, BatchPredictionRequest, BatchPredictionResponse,
+    DashboardResponse, CryptoInfoListResponse, BacktestRequest, BacktestResponse
+)
+from app.data_fetcher import CoinGeckoAPI, coin_gecko, async_coin_gecko
+from app.timeseries_store import DAY_MS, validate_coin_id
+from app.ml_engine import ml_predictor, ModelNotTrainedError
+from app.jobs import JobQueueFull, training_jobs
+from app.rate_limiter import BACKGROUND, RateLimitError, upstream_priority
+from app.responses import (
+    ARROW_AVAILABLE, ARROW_MEDIA_TYPE, arrow_ipc, encoded_response, json_response,
+    make_etag, not_modified, packed_float64
 )
-from app.data_fetcher import coin_gecko
-from app.ml_engine import ml_predictor
 from app.technical_analysis import analyzer
+from app.backtest import backtester
+from app.prewarm import prewarmer
+from app.profiling import authorized, profile_store, run_in_threadpool
+from app.stream import stream_hub
 
 router = APIRouter()
 
+def _rate_limited(error: RateLimitError) -> HTTPException:
+    """Resposta 503 quando o limite de requisições à API externa foi atingido"""
+    return HTTPException(
+        status_code=503,
+        detail=str(error),
+        headers={"Retry-After": str(math.ceil(error.retry_after))}
+    )
+
+@router.get("/crypto", response_model=CryptoInfoListResponse)
+async def get_crypto_info_many(
+    ids: str = Query(..., description="IDs separados por vírgula (ex: bitcoin,ethereum)")
+):
+    """
+    Obtém informações básicas de várias criptomoedas
+    
+    Os IDs são buscados em lotes de até 250 por chamada à API externa.
+    
+    - **ids**: IDs das criptomoedas separados por vírgula
+    """
+    coin_ids = list(dict.fromkeys(coin_id.strip().lower() for coin_id in ids.split(",") if coin_id.strip()))
+    if not coin_ids:
+        raise HTTPException(status_code=400, detail="Informe ao menos um ID")
+    if len(coin_ids) > 1000:
+        raise HTTPException(status_code=400, detail="Máximo de 1000 IDs por requisição")
+    try:
+        found = await async_coin_gecko.get_market_data_many(coin_ids)
+    except RateLimitError as e:
+        raise _rate_limited(e)
+    except Exception as e:
+        raise HTTPException(
+            status_code=500,
+            detail=f"Erro ao buscar dados das criptomoedas: {str(e)}"
+        )
+    cryptos = [CryptoInfo(**found[coin_id]) for coin_id in coin_ids if coin_id in found]
+    return CryptoInfoListResponse(
+        total=len(cryptos),
+        cryptos=cryptos,
+        missing=[coin_id for coin_id in coin_ids if coin_id not in found]
+    )
+
 @router.get("/crypto/{coin_id}", response_model=CryptoInfo)
 async def get_crypto_info(coin_id: str):
     """
@@ -22,15 +79,75 @@ async def get_crypto_info(coin_id: str):
     - **coin_id**: ID da criptomoeda (ex: bitcoin, ethereum)
     """
     try:
-        data = coin_gecko.get_market_data(coin_id)
+        validate_coin_id(coin_id)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    try:
+        data = await async_coin_gecko.get_market_data(coin_id)
         return CryptoInfo(**data)
+    except RateLimitError as e:
+        raise _rate_limited(e)
     except Exception as e:
         raise HTTPException(
             status_code=404,
             detail=f"Criptomoeda '{coin_id}' não encontrada ou erro ao buscar dados: {str(e)}"
         )
 
-@router.get("/predict/{coin_id}", response_model=PredictionResponse)
+def _training_reference(job: dict, status: str = "training") -> TrainingJobResponse:
+    """Referência do job em segundo plano para o cliente acompanhar"""
+    return TrainingJobResponse(
+        status=status,
+        job=TrainingJob(**job),
+        status_url=f"/api/jobs/{job['id']}"
+    )
+
+def _training_accepted(job: dict, status: str = "training") -> JSONResponse:
+    """Resposta 202 com a referência do job em segundo plano"""
+    return JSONResponse(status_code=202, content=_training_reference(job, status).model_dump())
+
+@router.post("/predict/batch", response_model=BatchPredictionResponse)
+async def predict_price_batch(request: BatchPredictionRequest):
+    """
+    Obtém predições de várias criptomoedas e horizontes em uma única chamada
+    
+    As features de cada moeda são calculadas uma vez e reutilizadas em todos
+    os horizontes. Pares sem modelo treinado são enfileirados para treino e
+    listados em `training`.
+    
+    - **coin_ids**: IDs das criptomoedas
+    - **horizons**: Números de dias à frente (1-30)
+    """
+    coin_ids = list(dict.fromkeys(request.coin_ids))
+    horizons = list(dict.fromkeys(request.horizons))
+    
+    # Aquecer o cache com os históricos de todas as moedas em paralelo
+    await asyncio.gather(
+        *[async_coin_gecko.get_historical_series(coin_id, days=60) for coin_id in coin_ids],
+        return_exceptions=True
+    )
+    
+    try:
+        predictions, missing, errors = await run_in_threadpool(
+            ml_predictor.predict_many, coin_ids, horizons
+        )
+        training = [training_jobs.submit(coin_id, days_ahead) for coin_id, days_ahead in missing]
+    except Exception as e:
+        raise HTTPException(
+            status_code=500,
+            detail=f"Erro ao gerar predições em lote: {str(e)}"
+        )
+    return BatchPredictionResponse(
+        total=len(predictions),
+        predictions=predictions,
+        training=training,
+        errors=errors
+    )
+
+@router.get(
+    "/predict/{coin_id}",
+    response_model=PredictionResponse,
+    responses={202: {"model": TrainingJobResponse, "description": "Modelo em treinamento"}}
+)
 async def predict_price(
     coin_id: str,
     days: int = Query(7, ge=1, le=30, description="Número de dias à frente para predição")
@@ -38,12 +155,21 @@ async def predict_price(
     """
     Obtém predição de preço usando Machine Learning
     
+    Se ainda não houver modelo treinado, o treino é enfileirado e a resposta
+    é 202 com a referência do job (acompanhe em `/api/jobs/{id}`).
+    
     - **coin_id**: ID da criptomoeda
     - **days**: Número de dias à frente (1-30)
     """
     try:
-        prediction = ml_predictor.predict(coin_id, days_ahead=days)
+        prediction = await run_in_threadpool(
+            ml_predictor.predict, coin_id, days_ahead=days, train_if_missing=False
+        )
         return PredictionResponse(**prediction)
+    except RateLimitError as e:
+        raise _rate_limited(e)
+    except ModelNotTrainedError:
+        return _training_accepted(training_jobs.submit(coin_id, days))
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
@@ -52,6 +178,43 @@ async def predict_price(
             detail=f"Erro ao gerar predição: {str(e)}"
         )
 
+@router.post("/train/{coin_id}", status_code=202, response_model=TrainingJobResponse)
+async def train_model(
+    coin_id: str,
+    days: int = Query(7, ge=1, le=30, description="Número de dias à frente do modelo")
+):
+    """
+    Enfileira o treinamento do modelo de uma criptomoeda
+    
+    Pedidos repetidos enquanto o job está ativo retornam o mesmo job.
+    
+    - **coin_id**: ID da criptomoeda
+    - **days**: Número de dias à frente (1-30)
+    """
+    try:
+        validate_coin_id(coin_id)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    try:
+        return _training_accepted(training_jobs.submit(coin_id, days))
+    except Exception as e:
+        raise HTTPException(
+            status_code=500,
+            detail=f"Erro ao enfileirar treinamento: {str(e)}"
+        )
+
+@router.get("/jobs/{job_id}", response_model=TrainingJob)
+async def get_training_job(job_id: str):
+    """
+    Obtém o estado de um job de treinamento ou de backtest
+    
+    - **job_id**: ID do job
+    """
+    job = training_jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Job '{job_id}' não encontrado")
+    return TrainingJob(**job)
+
 @router.get("/analysis/{coin_id}", response_model=TechnicalAnalysis)
 async def get_technical_analysis(coin_id: str):
     """
@@ -60,8 +223,11 @@ async def get_technical_analysis(coin_id: str):
     - **coin_id**: ID da criptomoeda
     """
     try:
-        analysis = analyzer.analyze(coin_id)
+        series = await async_coin_gecko.get_historical_series(coin_id, days=60)
+        analysis = analyzer.analyze_incremental(coin_id, series)
         return TechnicalAnalysis(**analysis)
+    except RateLimitError as e:
+        raise _rate_limited(e)
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
@@ -70,8 +236,192 @@ async def get_technical_analysis(coin_id: str):
             detail=f"Erro ao realizar análise técnica: {str(e)}"
         )
 
+@router.post("/analysis/batch", response_model=BatchAnalysisResponse)
+async def get_technical_analysis_batch(request: BatchAnalysisRequest):
+    """
+    Obtém a análise técnica de várias criptomoedas em uma única chamada
+    
+    Os históricos são buscados em paralelo e analisados juntos em uma
+    matriz moedas × tempo.
+    
+    - **coin_ids**: IDs das criptomoedas
+    - **days**: Número de dias de histórico (1-365)
+    """
+    coin_ids = list(dict.fromkeys(request.coin_ids))
+    fetched = await asyncio.gather(
+        *[async_coin_gecko.get_historical_series(coin_id, days=request.days) for coin_id in coin_ids],
+        return_exceptions=True
+    )
+    
+    series_by_coin = {}
+    errors = {}
+    for coin_id, result in zip(coin_ids, fetched):
+        if isinstance(result, Exception):
+            errors[coin_id] = str(result)
+        else:
+            series_by_coin[coin_id] = result
+    
+    try:
+        results, missing = await run_in_threadpool(
+            analyzer.analyze_many_series, series_by_coin, request.days
+        )
+    except Exception as e:
+        raise HTTPException(
+            status_code=500,
+            detail=f"Erro ao realizar análise técnica em lote: {str(e)}"
+        )
+    errors.update(missing)
+    return BatchAnalysisResponse(total=len(results), results=results, errors=errors)
+
+def _run_backtest_job(request: BacktestRequest) -> dict:
+    """Executa o backtest no job, com os ciclos de ML no pool de treinamento"""
+    started = time.perf_counter()
+    with upstream_priority(BACKGROUND):
+        results, errors = backtester.run(
+            request.coin_ids, request.granularity, request.days, request.horizons,
+            request.train_days, request.retrain_days, request.sync,
+            submit=training_jobs.run_in_pool, inflight=training_jobs.max_workers
+        )
+    return BacktestResponse(
+        total=len(results),
+        granularity=request.granularity,
+        duration=round(time.perf_counter() - started, 3),
+        results=results,
+        errors=errors
+    ).model_dump()
+
+@router.post("/backtest", status_code=202, response_model=TrainingJobResponse)
+async def run_backtest(request: BacktestRequest, x_admin_token: Optional[str] = Header(None)):
+    """
+    Enfileira o backtest dos sinais técnicos e, opcionalmente, das predições de ML
+    
+    Reproduz o histórico armazenado de cada moeda: o sinal de
+    compra/venda/manutenção é calculado para todas as barras, e cada
+    horizonte de ML passa por ciclos walk-forward de treino e predição no
+    mesmo pool de processos dos treinos. A resposta é 202 com o job; o
+    resultado (`BacktestResponse`: PnL, taxa de acerto e drawdown por moeda)
+    fica em `result` de `/api/jobs/{id}`.
+    
+    Pedidos com mais de `BACKTEST_MAX_RUNS` ciclos (moedas × horizontes)
+    exigem o cabeçalho `X-Admin-Token`; com `BACKTEST_MAX_PENDING` backtests
+    na fila, novos pedidos recebem 429.
+    
+    - **coin_ids**: IDs das criptomoedas
+    - **granularity**: daily ou hourly
+    - **horizons**: Horizontes de ML em dias (vazio: apenas sinais)
+    - **sync**: Atualiza as séries pela API antes
+    """
+    runs = len(set(request.coin_ids)) * len(request.horizons)
+    if runs > backtester.max_runs:
+        _require_admin(x_admin_token)
+    try:
+        job = training_jobs.submit_task(
+            "backtest", lambda: _run_backtest_job(request), params=request.model_dump(),
+            max_pending=backtester.max_pending
+        )
+    except JobQueueFull as e:
+        raise HTTPException(status_code=429, detail=str(e), headers={"Retry-After": "60"})
+    except Exception as e:
+        raise HTTPException(
+            status_code=500,
+            detail=f"Erro ao enfileirar backtest: {str(e)}"
+        )
+    return _training_accepted(job, "queued")
+
+@router.get("/analysis/{coin_id}/series")
+async def get_technical_analysis_series(
+    coin_id: str,
+    days: int = Query(60, ge=1, le=365, description="Número de dias de histórico")
+):
+    """
+    Obtém as séries completas dos indicadores técnicos para gráficos
+    
+    - **coin_id**: ID da criptomoeda
+    - **days**: Número de dias de histórico (1-365)
+    """
+    try:
+        series = await async_coin_gecko.get_historical_series(coin_id, days=days)
+        if not len(series):
+            raise ValueError(f"Não foi possível obter dados para {coin_id}")
+        indicators = analyzer.indicator_series(series.prices)
+        return {
+            "coin_id": coin_id,
+            "period_days": days,
+            "data_points": len(series),
+            "timestamps": series.isoformat_timestamps(),
+            "prices": series.prices.tolist(),
+            "indicators": {name: values.tolist() for name, values in indicators.items()}
+        }
+    except RateLimitError as e:
+        raise _rate_limited(e)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(
+            status_code=500,
+            detail=f"Erro ao calcular séries de indicadores: {str(e)}"
+        )
+
+@router.get("/dashboard/{coin_id}", response_model=DashboardResponse)
+async def get_dashboard(
+    coin_id: str,
+    days: int = Query(7, ge=1, le=30, description="Número de dias à frente para predição"),
+    chart_days: int = Query(30, ge=1, le=60, description="Dias de histórico do gráfico")
+):
+    """
+    Obtém informações, análise técnica, predição e histórico em uma única chamada
+    
+    A série de 60 dias é buscada uma vez e usada para a análise, as features
+    da predição e o gráfico (últimos `chart_days` dias, pontos diários).
+    Seções que falharem ficam vazias e o motivo vai em `errors`.
+    
+    - **coin_id**: ID da criptomoeda
+    - **days**: Número de dias à frente da predição (1-30)
+    - **chart_days**: Dias de histórico do gráfico (1-60)
+    """
+    info, series = await asyncio.gather(
+        async_coin_gecko.get_market_data(coin_id),
+        async_coin_gecko.get_historical_series(coin_id, days=60),
+        return_exceptions=True
+    )
+    if isinstance(info, RateLimitError):
+        raise _rate_limited(info)
+    if isinstance(info, Exception):
+        raise HTTPException(
+            status_code=404,
+            detail=f"Criptomoeda '{coin_id}' não encontrada ou erro ao buscar dados: {str(info)}"
+        )
+    
+    dashboard = {"coin_id": coin_id, "info": info, "errors": {}}
+    if isinstance(series, Exception):
+        dashboard["errors"]["historical"] = str(series)
+        return DashboardResponse(**dashboard)
+    
+    try:
+        dashboard["analysis"] = analyzer.analyze_incremental(coin_id, series)
+    except Exception as e:
+        dashboard["errors"]["analysis"] = str(e)
+    
+    try:
+        dashboard["prediction"] = await run_in_threadpool(
+            ml_predictor.predict_series, coin_id, series, days
+        )
+    except ModelNotTrainedError:
+        dashboard["training"] = _training_reference(training_jobs.submit(coin_id, days))
+    except Exception as e:
+        dashboard["errors"]["prediction"] = str(e)
+    
+    chart = series.since(int(time.time() * 1000) - chart_days * DAY_MS)
+    dashboard["historical"] = {
+        "coin_id": coin_id,
+        "period_days": chart_days,
+        "prices": chart.to_points()
+    }
+    return DashboardResponse(**dashboard)
+
 @router.get("/cryptos", response_model=CryptoListResponse)
 async def list_cryptos(
+    request: Request,
     limit: int = Query(50, ge=1, le=100, description="Número máximo de criptomoedas")
 ):
     """
@@ -80,11 +430,16 @@ async def list_cryptos(
     - **limit**: Número máximo de resultados (1-100)
     """
     try:
-        cryptos = coin_gecko.get_top_cryptos(limit=limit)
-        return CryptoListResponse(
+        cryptos = await async_coin_gecko.get_top_cryptos(limit=limit)
+        body = CryptoListResponse(
             total=len(cryptos),
             cryptos=cryptos
         )
+        return json_response(
+            request, body.model_dump(), max_age=int(CoinGeckoAPI._cache_ttl("coins/markets"))
+        )
+    except RateLimitError as e:
+        raise _rate_limited(e)
     except Exception as e:
         raise HTTPException(
             status_code=500,
@@ -93,6 +448,7 @@ async def list_cryptos(
 
 @router.get("/trending", response_model=CryptoListResponse)
 async def get_trending_cryptos(
+    request: Request,
     limit: int = Query(10, ge=1, le=20, description="Número máximo de resultados")
 ):
     """
@@ -101,11 +457,16 @@ async def get_trending_cryptos(
     - **limit**: Número máximo de resultados (1-20)
     """
     try:
-        cryptos = coin_gecko.get_trending_coins(limit=limit)
-        return CryptoListResponse(
+        cryptos = await async_coin_gecko.get_trending_coins(limit=limit)
+        body = CryptoListResponse(
             total=len(cryptos),
             cryptos=cryptos
         )
+        return json_response(
+            request, body.model_dump(), max_age=int(CoinGeckoAPI._cache_ttl("search/trending"))
+        )
+    except RateLimitError as e:
+        raise _rate_limited(e)
     except Exception as e:
         raise HTTPException(
             status_code=500,
@@ -114,26 +475,154 @@ async def get_trending_cryptos(
 
 @router.get("/historical/{coin_id}")
 async def get_historical_data(
+    request: Request,
     coin_id: str,
-    days: int = Query(30, ge=1, le=365, description="Número de dias de histórico")
+    days: int = Query(30, ge=1, le=365, description="Número de dias de histórico"),
+    output_format: str = Query(
+        "json", alias="format", pattern="^(json|columnar|binary|arrow)$",
+        description="json, columnar, binary (float64 empacotado) ou arrow (Arrow IPC)"
+    ),
+    max_points: Optional[int] = Query(
+        None, ge=3, le=10000, description="Reduz a série a no máximo N pontos (LTTB)"
+    )
 ):
     """
     Obtém dados históricos de preço de uma criptomoeda
     
+    A resposta tem ETag derivada do último ponto da série; com
+    `If-None-Match` igual, a resposta é 304 sem corpo.
+    
+    Formatos:
+    - **json**: lista de pontos `{timestamp, price, volume}` (timestamps ISO)
+    - **columnar**: arrays paralelos `timestamps` (epoch em ms), `prices` e `volumes`
+    - **binary**: colunas timestamp (ms), price e volume em float64 little-endian,
+      uma após a outra; o número de pontos vai no cabeçalho `X-Data-Points`
+    - **arrow**: tabela Arrow (IPC stream), se o pyarrow estiver instalado
+    
     - **coin_id**: ID da criptomoeda
     - **days**: Número de dias de histórico (1-365)
+    - **max_points**: Número máximo de pontos, escolhidos por LTTB preservando picos e vales
     """
+    if output_format == "arrow" and not ARROW_AVAILABLE:
+        raise HTTPException(status_code=400, detail="Formato arrow indisponível: pyarrow não está instalado")
     try:
-        historical = coin_gecko.get_historical_data(coin_id, days=days)
-        return {
-            "coin_id": coin_id,
-            "period_days": days,
-            "data_points": len(historical),
-            "prices": historical
+        series = await async_coin_gecko.get_historical_series(coin_id, days=days)
+        max_age = int(CoinGeckoAPI._cache_ttl("market_chart"))
+        etag = make_etag(
+            "historical", coin_id, days, output_format, max_points, len(series),
+            (int(series.timestamps[-1]), float(series.prices[-1])) if len(series) else None
+        )
+        cached = not_modified(request, etag, max_age)
+        if cached is not None:
+            return cached
+        
+        if max_points is not None:
+            series = series.downsample(max_points)
+        
+        if output_format == "json":
+            historical = series.to_points()
+            return json_response(request, {
+                "coin_id": coin_id,
+                "period_days": days,
+                "data_points": len(historical),
+                "prices": historical
+            }, etag=etag, max_age=max_age)
+        
+        columns = {
+            "timestamp": series.timestamps,
+            "price": series.prices,
+            "volume": series.volumes
         }
+        if output_format == "columnar":
+            return json_response(request, {
+                "coin_id": coin_id,
+                "period_days": days,
+                "data_points": len(series),
+                "timestamps": series.timestamps,
+                "prices": series.prices,
+                "volumes": series.volumes
+            }, etag=etag, max_age=max_age)
+        
+        if output_format == "arrow":
+            body, media_type = arrow_ipc(columns), ARROW_MEDIA_TYPE
+        else:
+            body, media_type = packed_float64(columns), "application/octet-stream"
+        return encoded_response(request, body, media_type, etag=etag, max_age=max_age, headers={
+            "X-Data-Points": str(len(series)),
+            "X-Columns": ",".join(columns)
+        })
+    except RateLimitError as e:
+        raise _rate_limited(e)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(
             status_code=500,
             detail=f"Erro ao buscar dados históricos: {str(e)}"
         )
 
+@router.get("/cache/stats")
+async def get_cache_stats():
+    """
+    Obtém os contadores do cache de requisições à API externa
+    """
+    return coin_gecko.cache.stats()
+
+@router.get("/models/stats")
+async def get_model_stats():
+    """
+    Obtém os modelos carregados em memória, seus tamanhos e taxas de acerto
+    """
+    return ml_predictor.registry.stats()
+
+@router.get("/prewarm/stats")
+async def get_prewarm_stats():
+    """
+    Estado do aquecimento periódico das principais criptomoedas
+    """
+    return prewarmer.stats()
+
+@router.get("/stream/stats")
+async def get_stream_stats():
+    """
+    Conexões e moedas acompanhadas pelo canal de atualizações ao vivo
+    """
+    return stream_hub.stats()
+
+@router.get("/upstream/stats")
+async def get_upstream_stats():
+    """
+    Obtém fichas, profundidade da fila e contadores do limite de requisições à API externa,
+    além do transporte em uso (HTTP, gravação ou reprodução de fixtures)
+    """
+    stats = async_coin_gecko.scheduler.stats()
+    stats["transport"] = async_coin_gecko.transport.stats()
+    return stats
+
+def _require_admin(token: Optional[str]):
+    """Exige o token de administrador (`PROFILE_TOKEN`) no cabeçalho `X-Admin-Token`"""
+    if not authorized(token):
+        raise HTTPException(status_code=403, detail="Token de administrador ausente ou inválido")
+
+@router.get("/profiles")
+async def list_profiles(x_admin_token: Optional[str] = Header(None)):
+    """
+    Lista os perfis de requisições gravados, do mais recente ao mais antigo
+    
+    Requer o cabeçalho `X-Admin-Token` com o valor de `PROFILE_TOKEN`.
+    """
+    _require_admin(x_admin_token)
+    return {"profiles": profile_store.list()}
+
+@router.get("/profiles/{name}")
+async def get_profile(name: str, x_admin_token: Optional[str] = Header(None)):
+    """
+    Baixa um perfil no formato do speedscope (abra em https://www.speedscope.app)
+    
+    Requer o cabeçalho `X-Admin-Token` com o valor de `PROFILE_TOKEN`.
+    """
+    _require_admin(x_admin_token)
+    path = profile_store.path(name)
+    if path is None:
+        raise HTTPException(status_code=404, detail=f"Perfil '{name}' não encontrado")
+    return FileResponse(path, media_type="application/json", filename=name)
@@ -0,0 +1,323 @@
+"""
+Backtest walk-forward dos sinais técnicos e das predições de ML sobre o histórico armazenado
+
+Uso:
+    python -m app.backtest bitcoin ethereum [--granularity daily] [--days 365]
+                           [--horizons 7 14] [--sync] [--workers N] [--estimators N]
+                           [--json arquivo]
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from app.data_fetcher import CoinGeckoAPI, coin_gecko, series_store
+from app.indicators import compute_indicators
+from app.price_series import PriceSeries, isoformat
+from app.technical_analysis import TechnicalAnalyzer
+from app.timeseries_store import DAY_MS, GRANULARITY_MS, TimeSeriesStore
+
+# Barras iniciais sem sinal (período da SMA mais longa)
+WARMUP_BARS = 50
+# Tamanho da janela de features do modelo (como em `MLPredictor`)
+FEATURE_WINDOW = 30
+# Janela buscada na API por `sync`, por granularidade
+SYNC_DAYS = {"hourly": 30, "daily": 365}
+
+
+def _bars(days: float, granularity: str) -> int:
+    """Número de barras da granularidade em `days` dias"""
+    return max(1, int(round(days * DAY_MS / GRANULARITY_MS[granularity])))
+
+
+def strategy_stats(prices: np.ndarray, position: np.ndarray, fee: float) -> Dict:
+    """PnL, acerto e drawdown de uma estratégia comprada/fora (long-only)
+
+    `position[t]` (0 ou 1) é decidida no fechamento da barra `t` e recebe o
+    retorno de `t` para `t + 1`. Cada mudança de posição paga `fee` (fração).
+    """
+    prices = np.asarray(prices, dtype=np.float64)
+    if len(prices) < 2:
+        return {
+            "total_return": 0.0, "buy_and_hold_return": 0.0, "max_drawdown": 0.0,
+            "trades": 0, "hit_rate": None, "exposure": 0.0
+        }
+    returns = np.diff(prices) / prices[:-1]
+    held = np.asarray(position[:-1], dtype=np.float64)
+    changes = np.diff(held, prepend=0.0)
+    strategy = held * returns - np.abs(changes) * fee
+    equity = np.concatenate([[1.0], np.cumprod(1 + strategy)])
+    drawdown = 1 - equity / np.maximum.accumulate(equity)
+
+    # Operações: da entrada (0 -> 1) até a barra seguinte à saída (1 -> 0), com a taxa de saída
+    entries = np.flatnonzero(changes > 0)
+    exits = np.flatnonzero(np.diff(held, append=0.0) < 0) + 1
+    trade_returns = equity[np.minimum(exits + 1, len(strategy))] / equity[entries] - 1
+
+    return {
+        "total_return": round(float(equity[-1] - 1) * 100, 2),
+        "buy_and_hold_return": round(float(prices[-1] / prices[0] - 1) * 100, 2),
+        "max_drawdown": round(float(drawdown.max()) * 100, 2),
+        "trades": int(len(entries)),
+        "hit_rate": round(float((trade_returns > 0).mean()), 3) if len(entries) else None,
+        "exposure": round(float(held.mean()), 3)
+    }
+
+
+def signal_positions(prices: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Sinal de `generate_signal` em cada barra e a posição resultante
+
+    Os indicadores de cada barra usam apenas os preços até ela. "compra"
+    entra, "venda" sai e "manutenção" mantém a posição anterior.
+    """
+    series = compute_indicators(prices)
+    sma_20 = series["sma_20"]
+    trend = TechnicalAnalyzer.determine_trends(prices, sma_20, series["sma_50"])
+    signals = TechnicalAnalyzer.generate_signals(
+        np.round(series["rsi"], 2), np.round(series["macd"], 2), trend, prices, sma_20
+    )
+    signals[:WARMUP_BARS] = "manutenção"
+
+    state = np.select([signals == "compra", signals == "venda"], [1, 0], default=-1)
+    last = np.maximum.accumulate(np.where(state >= 0, np.arange(len(state)), -1))
+    position = np.where(last >= 0, state[np.maximum(last, 0)], 0)
+    return signals, position
+
+
+def walk_forward(prices: np.ndarray, volumes: np.ndarray, horizon: int, train_bars: int,
+                 retrain_bars: int, fee: float, n_estimators: int = 50) -> Dict:
+    """Retreina e prediz em janelas sucessivas, sem olhar o futuro
+
+    A cada `retrain_bars` barras, um modelo com as features de `MLPredictor`
+    é treinado com as `train_bars` janelas mais recentes cujo preço-alvo
+    (`horizon` barras à frente) já é conhecido, e prediz as barras seguintes.
+    A estratégia fica comprada quando o preço previsto supera o atual.
+    """
+    from sklearn.ensemble import RandomForestRegressor
+    from app.ml_engine import ml_predictor
+
+    prices = np.asarray(prices, dtype=np.float64)
+    features = ml_predictor.build_feature_matrix(prices, volumes, FEATURE_WINDOW)
+    n_rows = len(features)
+    # Linha k: janela que termina na barra k + FEATURE_WINDOW - 1, alvo `horizon` barras depois
+    ends = np.arange(n_rows) + FEATURE_WINDOW - 1
+    targets = np.full(n_rows, np.nan)
+    labeled = ends + horizon < len(prices)
+    targets[labeled] = prices[ends[labeled] + horizon]
+
+    predicted = np.full(n_rows, np.nan)
+    retrains = 0
+    start = horizon + 10  # mínimo de amostras de treino (como em `train_model`)
+    for fold in range(start, n_rows, retrain_bars):
+        last_train = fold - horizon
+        first_train = max(0, last_train - train_bars + 1)
+        model = RandomForestRegressor(
+            n_estimators=n_estimators, max_depth=10, random_state=42, n_jobs=1
+        )
+        model.fit(features[first_train:last_train + 1], targets[first_train:last_train + 1])
+        stop = min(fold + retrain_bars, n_rows)
+        predicted[fold:stop] = model.predict(features[fold:stop])
+        retrains += 1
+
+    current = prices[ends]
+    evaluated = ~np.isnan(predicted) & labeled
+    errors = predicted[evaluated] - targets[evaluated]
+    direction = np.sign(predicted[evaluated] - current[evaluated]) == np.sign(
+        targets[evaluated] - current[evaluated]
+    )
+
+    position = np.zeros(len(prices))
+    position[ends] = np.where(np.isnan(predicted), 0, predicted > current)
+    result = {
+        "predictions": int((~np.isnan(predicted)).sum()),
+        "retrains": retrains,
+        "mae": round(float(np.abs(errors).mean()), 4) if len(errors) else None,
+        "direction_hit_rate": round(float(direction.mean()), 3) if len(errors) else None
+    }
+    result.update(strategy_stats(prices, position, fee))
+    return result
+
+
+class Backtester:
+    """Reproduz o histórico armazenado de várias moedas
+
+    Os sinais técnicos de todas as barras são calculados de forma vetorizada
+    no próprio processo; os ciclos walk-forward de ML, um por moeda e
+    horizonte, rodam em um pool de processos.
+    """
+
+    def __init__(self, store: TimeSeriesStore, client: Optional[CoinGeckoAPI] = None,
+                 workers: Optional[int] = None, fee_bps: float = 10.0, n_estimators: int = 50,
+                 max_runs: int = 20, max_pending: int = 2):
+        self.store = store
+        self.client = client
+        self.workers = workers or os.cpu_count() or 1
+        self.fee_bps = fee_bps
+        self.n_estimators = n_estimators
+        # Limites dos backtests pedidos pela API: ciclos walk-forward
+        # (moedas × horizontes) por pedido e jobs na fila ao mesmo tempo
+        self.max_runs = max_runs
+        self.max_pending = max_pending
+
+    def sync(self, coin_ids: Sequence[str], granularity: str) -> Dict[str, str]:
+        """Atualiza as séries armazenadas pela API; retorna os erros por moeda"""
+        errors = {}
+        for coin_id in coin_ids:
+            try:
+                self.client.get_historical_series(coin_id, days=SYNC_DAYS[granularity])
+            except Exception as e:
+                errors[coin_id] = str(e)
+        return errors
+
+    def load(self, coin_id: str, granularity: str, days: Optional[int] = None) -> PriceSeries:
+        """Série armazenada da moeda (toda, ou só os últimos `days` dias)"""
+        series = PriceSeries.from_records(self.store.load(coin_id, granularity))
+        if days is not None and len(series):
+            series = series.since(int(series.timestamps[-1]) - days * DAY_MS)
+        return series
+
+    def run(self, coin_ids: Sequence[str], granularity: str = "daily", days: Optional[int] = None,
+            horizons: Sequence[int] = (), train_days: float = 90, retrain_days: float = 7,
+            sync: bool = False, submit: Optional[Callable[..., Future]] = None,
+            inflight: Optional[int] = None) -> Tuple[List[Dict], Dict[str, str]]:
+        """Executa o backtest e retorna os resultados por moeda e os erros
+
+        `horizons`, `train_days` e `retrain_days` são em dias e convertidos
+        para barras da granularidade. Os ciclos walk-forward vão para
+        `submit(fn, *args)` (por exemplo, o pool de treino da API) ou, sem
+        ele, para um pool de `workers` processos criado só para esta execução.
+        No máximo `inflight` ciclos (padrão: todos) ficam enviados ao mesmo
+        tempo, para que outros jobs de um pool compartilhado não esperem pelo
+        backtest inteiro.
+        """
+        if granularity not in GRANULARITY_MS:
+            raise ValueError(f"Granularidade inválida: {granularity}")
+        coin_ids = list(dict.fromkeys(coin_ids))
+        fee = self.fee_bps / 10_000
+        errors = self.sync(coin_ids, granularity) if sync else {}
+
+        results = {}
+        loaded = {}
+        for coin_id in coin_ids:
+            series = self.load(coin_id, granularity, days)
+            if len(series) <= WARMUP_BARS:
+                errors.setdefault(coin_id, f"Histórico armazenado insuficiente: {coin_id} ({len(series)} pontos)")
+                continue
+            _, position = signal_positions(series.prices)
+            loaded[coin_id] = series
+            results[coin_id] = {
+                "coin_id": coin_id,
+                "bars": len(series),
+                "start": isoformat(series.timestamps[0]),
+                "end": isoformat(series.timestamps[-1]),
+                "signals": strategy_stats(series.prices, position, fee),
+                "ml": []
+            }
+
+        if horizons and loaded:
+            train_bars = _bars(train_days, granularity)
+            retrain_bars = _bars(retrain_days, granularity)
+            pool = None
+            if submit is None:
+                pool = ProcessPoolExecutor(
+                    max_workers=min(self.workers, len(loaded) * len(horizons)),
+                    mp_context=multiprocessing.get_context("spawn")
+                )
+                submit = pool.submit
+            runs = [(coin_id, days_ahead) for coin_id in loaded for days_ahead in horizons]
+            futures = deque()
+
+            def collect():
+                coin_id, days_ahead, future = futures.popleft()
+                try:
+                    outcome = {"days_ahead": days_ahead}
+                    outcome.update(future.result())
+                    results[coin_id]["ml"].append(outcome)
+                except Exception as e:
+                    errors[f"{coin_id}:{days_ahead}d"] = str(e)
+
+            try:
+                for coin_id, days_ahead in runs:
+                    if inflight is not None and len(futures) >= inflight:
+                        collect()
+                    series = loaded[coin_id]
+                    futures.append((coin_id, days_ahead, submit(
+                        walk_forward, series.prices, series.volumes, _bars(days_ahead, granularity),
+                        train_bars, retrain_bars, fee, self.n_estimators
+                    )))
+                while futures:
+                    collect()
+            finally:
+                if pool is not None:
+                    pool.shutdown()
+
+        return [results[coin_id] for coin_id in coin_ids if coin_id in results], errors
+
+
+# Instância global do backtester
+backtester = Backtester(
+    store=series_store,
+    client=coin_gecko,
+    workers=int(os.getenv("BACKTEST_WORKERS", 0)) or None,
+    fee_bps=float(os.getenv("BACKTEST_FEE_BPS", 10)),
+    n_estimators=int(os.getenv("BACKTEST_ESTIMATORS", 50)),
+    max_runs=int(os.getenv("BACKTEST_MAX_RUNS", 20)),
+    max_pending=int(os.getenv("BACKTEST_MAX_PENDING", 2))
+)
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Backtest walk-forward de sinais e predições")
+    parser.add_argument("coins", nargs="+", help="IDs das criptomoedas")
+    parser.add_argument("--granularity", choices=sorted(GRANULARITY_MS), default="daily")
+    parser.add_argument("--days", type=int, default=None, help="Últimos N dias do histórico (padrão: todo)")
+    parser.add_argument("--horizons", type=int, nargs="*", default=[], help="Horizontes de ML em dias")
+    parser.add_argument("--train-days", type=float, default=90)
+    parser.add_argument("--retrain-days", type=float, default=7)
+    parser.add_argument("--fee-bps", type=float, default=backtester.fee_bps)
+    parser.add_argument("--workers", type=int, default=backtester.workers)
+    parser.add_argument("--estimators", type=int, default=backtester.n_estimators, help="Árvores por modelo")
+    parser.add_argument("--sync", action="store_true", help="Atualiza as séries pela API antes")
+    parser.add_argument("--json", dest="json_path", help="Grava o resultado completo em JSON")
+    args = parser.parse_args(argv)
+
+    runner = Backtester(
+        series_store, coin_gecko, workers=args.workers, fee_bps=args.fee_bps, n_estimators=args.estimators
+    )
+    started = time.perf_counter()
+    results, errors = runner.run(
+        args.coins, args.granularity, args.days, args.horizons,
+        args.train_days, args.retrain_days, args.sync
+    )
+    duration = time.perf_counter() - started
+
+    print(f"{'moeda':<16} {'barras':>7} {'estratégia':>11} {'comprar/manter':>15} "
+          f"{'drawdown':>9} {'operações':>10} {'acerto':>7}")
+    for result in results:
+        rows = [("sinais", result["signals"])] + [
+            (f"ml {ml['days_ahead']}d", ml) for ml in result["ml"]
+        ]
+        for label, stats in rows:
+            hit_rate = "-" if stats["hit_rate"] is None else f"{stats['hit_rate']:.1%}"
+            print(f"{result['coin_id'] + ' ' + label:<16} {result['bars']:>7} "
+                  f"{stats['total_return']:>10.2f}% {stats['buy_and_hold_return']:>14.2f}% "
+                  f"{stats['max_drawdown']:>8.2f}% {stats['trades']:>10} {hit_rate:>7}")
+    for key, error in errors.items():
+        print(f"erro {key}: {error}", file=sys.stderr)
+    print(f"{len(results)} moedas em {duration:.1f}s")
+
+    if args.json_path:
+        with open(args.json_path, "w", encoding="utf-8") as f:
+            json.dump({"results": results, "errors": errors, "duration": duration}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
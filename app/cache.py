@@ -0,0 +1,214 @@
+"""
+Cache em memória com expiração (TTL), despejo LRU e coalescência de requisições
+"""
+
+import asyncio
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Hashable, List, Optional, Set
+
+
+def _wake(future: asyncio.Future):
+    if not future.done():
+        future.set_result(None)
+
+
+class Flight:
+    """Carregamento em andamento compartilhado entre chamadas concorrentes
+
+    Pode ser aguardado por threads (`wait`) e por corrotinas (`wait_async`)
+    ao mesmo tempo; `finish` acorda todos com o mesmo resultado.
+    """
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.value: Any = None
+        self.error: Optional[BaseException] = None
+        self._waiters: List[tuple] = []
+        self._lock = threading.Lock()
+
+    def finish(self, value: Any = None, error: Optional[BaseException] = None):
+        with self._lock:
+            self.value = value
+            self.error = error
+            self.event.set()
+            waiters, self._waiters = self._waiters, []
+        for loop, future in waiters:
+            try:
+                loop.call_soon_threadsafe(_wake, future)
+            except RuntimeError:  # event loop já encerrado
+                pass
+
+    def result(self) -> Any:
+        if self.error is not None:
+            raise self.error
+        return self.value
+
+    def wait(self) -> Any:
+        self.event.wait()
+        return self.result()
+
+    async def wait_async(self) -> Any:
+        """Aguarda sem bloquear o event loop; cancelar quem espera não afeta o carregamento"""
+        future = None
+        with self._lock:
+            if not self.event.is_set():
+                future = asyncio.get_running_loop().create_future()
+                self._waiters.append((asyncio.get_running_loop(), future))
+        if future is not None:
+            await future
+        return self.result()
+
+
+class TTLCache:
+    """Cache thread-safe com TTL por entrada, limite de tamanho e single-flight
+
+    Quando várias threads (ou corrotinas, via `aget_or_load`) pedem a mesma
+    chave ausente ao mesmo tempo, apenas a primeira executa o carregamento;
+    as demais aguardam e reutilizam o resultado. Threads e corrotinas
+    compartilham o mesmo carregamento da chave. No assíncrono, o carregamento
+    roda em uma tarefa do próprio cache: cancelar uma das chamadas só
+    interrompe a espera dela.
+    """
+
+    def __init__(self, max_size: int = 512, default_ttl: float = 60.0):
+        self.max_size = max_size
+        self.default_ttl = default_ttl
+        self._data: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._inflight: Dict[Hashable, Flight] = {}
+        self._tasks: Set[asyncio.Task] = set()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.coalesced = 0
+
+    def _lookup(self, key: Hashable, now: float):
+        """Busca uma entrada válida (chamar com o lock adquirido)"""
+        entry = self._data.get(key)
+        if entry is None:
+            return False, None
+        expires_at, value = entry
+        if expires_at <= now:
+            del self._data[key]
+            return False, None
+        self._data.move_to_end(key)
+        return True, value
+
+    def _store(self, key: Hashable, value: Any, ttl: Optional[float]):
+        """Armazena uma entrada e aplica o despejo LRU (chamar com o lock adquirido)"""
+        ttl = self.default_ttl if ttl is None else ttl
+        self._data[key] = (time.monotonic() + ttl, value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.max_size:
+            self._data.popitem(last=False)
+            self.evictions += 1
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """Obtém um valor válido do cache ou `default`"""
+        with self._lock:
+            found, value = self._lookup(key, time.monotonic())
+            if found:
+                self.hits += 1
+                return value
+            self.misses += 1
+            return default
+
+    def peek(self, key: Hashable, default: Any = None) -> Any:
+        """Como `get`, mas sem contar acerto ou falta nas estatísticas"""
+        with self._lock:
+            found, value = self._lookup(key, time.monotonic())
+            return value if found else default
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None):
+        """Armazena um valor no cache"""
+        with self._lock:
+            self._store(key, value, ttl)
+
+    def _claim(self, key: Hashable):
+        """(encontrado, valor, carregamento, líder) para uma chave"""
+        with self._lock:
+            found, value = self._lookup(key, time.monotonic())
+            if found:
+                self.hits += 1
+                return True, value, None, False
+
+            flight = self._inflight.get(key)
+            if flight is not None:
+                self.coalesced += 1
+                return False, None, flight, False
+            self.misses += 1
+            flight = self._inflight[key] = Flight()
+            return False, None, flight, True
+
+    def _finish(self, key: Hashable, flight: Flight, value: Any = None,
+                error: Optional[BaseException] = None, ttl: Optional[float] = None):
+        with self._lock:
+            if error is None:
+                self._store(key, value, ttl)
+            self._inflight.pop(key, None)
+        flight.finish(value, error)
+
+    def get_or_load(self, key: Hashable, loader: Callable[[], Any],
+                    ttl: Optional[float] = None) -> Any:
+        """Obtém o valor do cache ou executa `loader` uma única vez por chave"""
+        found, value, flight, leader = self._claim(key)
+        if found:
+            return value
+        if not leader:
+            return flight.wait()
+
+        try:
+            value = loader()
+        except BaseException as e:
+            self._finish(key, flight, error=e)
+            raise
+        self._finish(key, flight, value, ttl=ttl)
+        return value
+
+    async def _load(self, key: Hashable, flight: Flight, loader: Callable[[], Awaitable[Any]],
+                    ttl: Optional[float]):
+        try:
+            value = await loader()
+        except BaseException as e:
+            # Quem espera recebe o erro pelo carregamento compartilhado
+            self._finish(key, flight, error=e)
+        else:
+            self._finish(key, flight, value, ttl=ttl)
+
+    async def aget_or_load(self, key: Hashable, loader: Callable[[], Awaitable[Any]],
+                           ttl: Optional[float] = None) -> Any:
+        """Versão assíncrona de `get_or_load` para uso no event loop"""
+        found, value, flight, leader = self._claim(key)
+        if found:
+            return value
+        if leader:
+            task = asyncio.get_running_loop().create_task(self._load(key, flight, loader, ttl))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+        return await flight.wait_async()
+
+    def invalidate(self, key: Hashable):
+        """Remove uma entrada do cache"""
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        """Remove todas as entradas do cache"""
+        with self._lock:
+            self._data.clear()
+
+    def stats(self) -> Dict:
+        """Retorna contadores de uso do cache"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._data),
+                "max_size": self.max_size,
+                "hits": self.hits,
+                "misses": self.misses,
+                "coalesced": self.coalesced,
+                "evictions": self.evictions,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0
+            }
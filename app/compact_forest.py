@@ -0,0 +1,182 @@
+"""
+Formato compacto e mapeável em memória para florestas de árvores de regressão
+"""
+
+import json
+import os
+from typing import Dict
+
+import numpy as np
+
+# Identificação e versão do formato
+MAGIC = b"CAFOREST"
+FORMAT_VERSION = 1
+
+# Alinhamento (em bytes) do início de cada buffer no arquivo
+ALIGNMENT = 64
+
+# Buffers gravados, na ordem em que aparecem no arquivo
+BUFFERS = (
+    ("feature", np.dtype("<i4")),
+    ("threshold", np.dtype("<f4")),
+    ("left", np.dtype("<i4")),
+    ("right", np.dtype("<i4")),
+    ("value", np.dtype("<f8")),
+    ("roots", np.dtype("<i4"))
+)
+
+
+def _align(offset: int) -> int:
+    return -(-offset // ALIGNMENT) * ALIGNMENT
+
+
+def _float32_floor(threshold: np.ndarray) -> np.ndarray:
+    """Maior float32 menor ou igual a cada limiar
+
+    Para uma entrada float32 `x`, `x <= limiar` equivale a
+    `x <= _float32_floor(limiar)`, então a árvore decide igual à original.
+    """
+    rounded = threshold.astype(np.float32)
+    above = rounded.astype(np.float64) > threshold
+    rounded[above] = np.nextafter(rounded[above], np.float32(-np.inf))
+    return rounded
+
+
+class CompactForest:
+    """Floresta de árvores achatada em buffers contíguos
+
+    Os nós de todas as árvores ficam em arrays únicos (`feature`, `threshold`,
+    `left`, `right`, `value`) com índices globais; `roots` aponta a raiz de
+    cada árvore. Folhas apontam para si mesmas com limiar infinito, de modo
+    que a predição percorre `max_depth` níveis de todas as árvores e linhas
+    de uma vez. Carregado com `load`, os buffers são `np.memmap` somente
+    leitura, compartilhados entre processos pelo cache de páginas do SO.
+    """
+
+    def __init__(self, feature: np.ndarray, threshold: np.ndarray, left: np.ndarray,
+                 right: np.ndarray, value: np.ndarray, roots: np.ndarray,
+                 max_depth: int, n_features: int):
+        self.feature = feature
+        self.threshold = threshold
+        self.left = left
+        self.right = right
+        self.value = value
+        self.roots = roots
+        self.max_depth = max_depth
+        self.n_features = n_features
+
+    @property
+    def n_estimators(self) -> int:
+        return len(self.roots)
+
+    @property
+    def nbytes(self) -> int:
+        return sum(getattr(self, name).nbytes for name, _ in BUFFERS)
+
+    @classmethod
+    def from_estimator(cls, model) -> "CompactForest":
+        """Converte um `RandomForestRegressor` (ou similar) treinado"""
+        features, thresholds, lefts, rights, values, roots = [], [], [], [], [], []
+        offset = 0
+        max_depth = 0
+        for estimator in model.estimators_:
+            tree = estimator.tree_
+            n_nodes = tree.node_count
+            nodes = np.arange(offset, offset + n_nodes, dtype=np.int32)
+            is_leaf = tree.children_left < 0
+
+            features.append(np.where(is_leaf, 0, tree.feature).astype(np.int32))
+            thresholds.append(np.where(is_leaf, np.inf, _float32_floor(tree.threshold)).astype(np.float32))
+            lefts.append(np.where(is_leaf, nodes, tree.children_left + offset).astype(np.int32))
+            rights.append(np.where(is_leaf, nodes, tree.children_right + offset).astype(np.int32))
+            values.append(tree.value[:, 0, 0].astype(np.float64))
+            roots.append(offset)
+
+            offset += n_nodes
+            max_depth = max(max_depth, tree.max_depth)
+
+        return cls(
+            feature=np.concatenate(features),
+            threshold=np.concatenate(thresholds),
+            left=np.concatenate(lefts),
+            right=np.concatenate(rights),
+            value=np.concatenate(values),
+            roots=np.asarray(roots, dtype=np.int32),
+            max_depth=int(max_depth),
+            n_features=int(model.n_features_in_)
+        )
+
+    def tree_predictions(self, X: np.ndarray) -> np.ndarray:
+        """Predições de cada árvore para cada linha (árvores × linhas)"""
+        X = np.ascontiguousarray(X, dtype=np.float32)
+        if X.ndim == 1:
+            X = X.reshape(1, -1)
+        rows = np.arange(len(X))
+        nodes = np.broadcast_to(self.roots[:, None], (self.n_estimators, len(X)))
+        for _ in range(self.max_depth):
+            go_left = X[rows, self.feature[nodes]] <= self.threshold[nodes]
+            nodes = np.where(go_left, self.left[nodes], self.right[nodes])
+        return self.value[nodes]
+
+    def predict(self, X: np.ndarray) -> np.ndarray:
+        """Média das predições das árvores, como em `RandomForestRegressor.predict`"""
+        return self.tree_predictions(X).mean(axis=0)
+
+    def save(self, path: str):
+        """Grava a floresta em um único arquivo (escrita atômica)
+
+        Layout: `MAGIC`, tamanho do cabeçalho (uint32), cabeçalho JSON com
+        os deslocamentos de cada buffer e os buffers alinhados em 64 bytes.
+        """
+        buffers: Dict[str, Dict] = {}
+        arrays = [np.ascontiguousarray(getattr(self, name), dtype=dtype) for name, dtype in BUFFERS]
+        header = {
+            "version": FORMAT_VERSION,
+            "max_depth": self.max_depth,
+            "n_features": self.n_features,
+            "buffers": buffers
+        }
+
+        # O cabeçalho tem tamanho fixo depois de reservar espaço para os deslocamentos
+        for (name, dtype), array in zip(BUFFERS, arrays):
+            buffers[name] = {"dtype": dtype.str, "length": len(array), "offset": 0}
+        header_size = len(json.dumps(header)) + 32 * len(BUFFERS)
+        offset = _align(len(MAGIC) + 4 + header_size)
+        for (name, _), array in zip(BUFFERS, arrays):
+            buffers[name]["offset"] = offset
+            offset = _align(offset + array.nbytes)
+        encoded = json.dumps(header).encode("utf-8").ljust(header_size)
+
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(MAGIC)
+            f.write(np.uint32(len(encoded)).tobytes())
+            f.write(encoded)
+            for (name, _), array in zip(BUFFERS, arrays):
+                f.seek(buffers[name]["offset"])
+                f.write(array.tobytes())
+            f.truncate(offset)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: str) -> "CompactForest":
+        """Abre uma floresta gravada com `save`, mapeando os buffers em memória"""
+        with open(path, "rb") as f:
+            if f.read(len(MAGIC)) != MAGIC:
+                raise ValueError(f"Arquivo de modelo inválido: {path}")
+            header_size = int(np.frombuffer(f.read(4), dtype="<u4")[0])
+            header = json.loads(f.read(header_size))
+        if header.get("version") != FORMAT_VERSION:
+            raise ValueError(f"Versão de formato de modelo não suportada: {header.get('version')}")
+
+        arrays = {}
+        for name, _ in BUFFERS:
+            spec = header["buffers"][name]
+            if spec["length"] == 0:
+                arrays[name] = np.empty(0, dtype=spec["dtype"])
+                continue
+            arrays[name] = np.memmap(
+                path, dtype=spec["dtype"], mode="r",
+                offset=spec["offset"], shape=(spec["length"],)
+            )
+        return cls(max_depth=header["max_depth"], n_features=header["n_features"], **arrays)
@@ -2,35 +2,92 @@
 Módulo para buscar dados de APIs externas (CoinGecko)
 """
 
-import requests
-from typing import List, Dict, Optional
+import asyncio
+from typing import List, Dict, Optional, Set
 from datetime import datetime, timedelta
 import time
+import os
+from app.cache import TTLCache
+from app.metrics import metrics, stage, upstream_call
+from app.rate_limiter import (
+    INTERACTIVE, BACKGROUND, RequestScheduler
+)
+from app.price_series import PriceSeries
+from app.timeseries_store import (
+    TimeSeriesStore, granularity_for, points_from_market_chart
+)
+from app.transport import COINGECKO_URL, HttpTransport, Transport, transport_from_env
+
+# TTL (segundos) por tipo de endpoint; a primeira correspondência vence
+CACHE_TTLS = (
+    ("market_chart", 300),
+    ("coins/markets", 60),
+    ("search/trending", 300),
+    ("coins/", 60),
+)
+DEFAULT_CACHE_TTL = 60
+
+# Máximo de IDs por página de `coins/markets`
+MARKETS_PAGE_SIZE = 250
+
+
+class CoinNotFound(Exception):
+    """A CoinGecko não conhece o ID de criptomoeda pedido"""
+
 
 class CoinGeckoAPI:
     """Cliente para a API CoinGecko"""
     
-    BASE_URL = "https://api.coingecko.com/api/v3"
+    BASE_URL = COINGECKO_URL
+    
+    def __init__(self, cache: Optional[TTLCache] = None,
+                 store: Optional[TimeSeriesStore] = None,
+                 scheduler: Optional[RequestScheduler] = None,
+                 transport: Optional[Transport] = None):
+        self.transport = transport if transport is not None else HttpTransport(self.BASE_URL)
+        self.cache = cache if cache is not None else TTLCache(
+            max_size=int(os.getenv("CACHE_MAX_ENTRIES", 512)),
+            default_ttl=DEFAULT_CACHE_TTL
+        )
+        self.store = store if store is not None else TimeSeriesStore(
+            os.getenv("DATA_DIR", "data")
+        )
+        self.scheduler = scheduler if scheduler is not None else RequestScheduler()
     
-    def __init__(self):
-        self.session = requests.Session()
-        self.session.headers.update({
-            "Accept": "application/json",
-            "User-Agent": "CryptoAnalytics-Pro/1.0"
-        })
+    @staticmethod
+    def _cache_ttl(endpoint: str) -> float:
+        """Retorna o TTL de cache configurado para o endpoint"""
+        for pattern, ttl in CACHE_TTLS:
+            if pattern in endpoint:
+                return ttl
+        return DEFAULT_CACHE_TTL
+    
+    @staticmethod
+    def _cache_key(endpoint: str, params: Optional[Dict]) -> tuple:
+        """Gera a chave de cache de uma requisição"""
+        return (endpoint, tuple(sorted((params or {}).items())))
     
     def _make_request(self, endpoint: str, params: Optional[Dict] = None) -> Dict:
-        """Faz uma requisição à API"""
-        url = f"{self.BASE_URL}/{endpoint}"
-        try:
-            response = self.session.get(url, params=params, timeout=10)
-            response.raise_for_status()
-            return response.json()
-        except requests.exceptions.RequestException as e:
-            raise Exception(f"Erro ao buscar dados da API: {str(e)}")
+        """Faz uma requisição à API (com cache e coalescência de chamadas)"""
+        return self.cache.get_or_load(
+            self._cache_key(endpoint, params),
+            lambda: self._fetch(endpoint, params),
+            ttl=self._cache_ttl(endpoint)
+        )
     
-    def get_crypto_info(self, coin_id: str) -> Dict:
-        """Obtém informações básicas de uma criptomoeda"""
+    def _fetch(self, endpoint: str, params: Optional[Dict] = None) -> Dict:
+        """Faz uma requisição à API sem passar pelo cache, dentro do limite de taxa"""
+        with stage("data_fetcher", "fetch"):
+            return self.scheduler.call(lambda: self._get(endpoint, params))
+    
+    def _get(self, endpoint: str, params: Optional[Dict] = None) -> Dict:
+        """Executa a requisição pelo transporte configurado (HTTP, gravação ou reprodução)"""
+        with upstream_call(endpoint):
+            return self.transport.get(endpoint, params)
+    
+    @staticmethod
+    def _crypto_info_request(coin_id: str) -> tuple:
+        """Monta endpoint e parâmetros de informações de uma criptomoeda"""
         endpoint = f"coins/{coin_id}"
         params = {
             "localization": "false",
@@ -40,61 +97,80 @@ class CoinGeckoAPI:
             "developer_data": "false",
             "sparkline": "false"
         }
-        return self._make_request(endpoint, params)
+        return endpoint, params
     
-    def get_historical_data(self, coin_id: str, days: int = 30) -> List[Dict]:
-        """Obtém dados históricos de preço"""
+    @staticmethod
+    def _historical_request(coin_id: str, days: int) -> tuple:
+        """Monta endpoint e parâmetros de dados históricos"""
         endpoint = f"coins/{coin_id}/market_chart"
         params = {
             "vs_currency": "usd",
             "days": days,
             "interval": "daily" if days > 30 else "hourly"
         }
-        data = self._make_request(endpoint, params)
-        
-        # Formatar dados históricos
-        prices = []
-        volumes_data = data.get("total_volumes", [])
-        
-        if "prices" in data:
-            for idx, price_data in enumerate(data["prices"]):
-                timestamp = datetime.fromtimestamp(price_data[0] / 1000)
-                # Buscar volume correspondente ao mesmo timestamp
-                volume = 0
-                if volumes_data and idx < len(volumes_data):
-                    volume = volumes_data[idx][1] if len(volumes_data[idx]) > 1 else 0
-                
-                prices.append({
-                    "timestamp": timestamp.isoformat(),
-                    "price": price_data[1],
-                    "volume": volume
-                })
-        
-        return prices
+        return endpoint, params
     
-    def get_market_data(self, coin_id: str) -> Dict:
-        """Obtém dados de mercado formatados"""
-        data = self.get_crypto_info(coin_id)
-        market_data = data.get("market_data", {})
-        
+    @staticmethod
+    def _top_cryptos_request(limit: int) -> tuple:
+        """Monta endpoint e parâmetros da lista das principais criptomoedas"""
+        endpoint = "coins/markets"
+        params = {
+            "vs_currency": "usd",
+            "order": "market_cap_desc",
+            "per_page": limit,
+            "page": 1,
+            "sparkline": "false"
+        }
+        return endpoint, params
+    
+    @staticmethod
+    def _markets_request(coin_ids: List[str]) -> tuple:
+        """Monta endpoint e parâmetros de dados de mercado de várias criptomoedas"""
+        endpoint = "coins/markets"
+        params = {
+            "vs_currency": "usd",
+            "ids": ",".join(coin_ids),
+            "per_page": MARKETS_PAGE_SIZE,
+            "page": 1,
+            "sparkline": "false"
+        }
+        return endpoint, params
+    
+    @staticmethod
+    def _market_cache_key(coin_id: str) -> tuple:
+        """Chave de cache dos dados de mercado de uma criptomoeda"""
+        return ("market", coin_id)
+    
+    @staticmethod
+    def _range_request(coin_id: str, from_ts: int, to_ts: int) -> tuple:
+        """Monta endpoint e parâmetros de dados históricos entre dois instantes"""
+        endpoint = f"coins/{coin_id}/market_chart/range"
+        params = {
+            "vs_currency": "usd",
+            "from": from_ts,
+            "to": to_ts
+        }
+        return endpoint, params
+    
+    @staticmethod
+    def _parse_market_row(coin: Dict) -> Dict:
+        """Formata um item de `coins/markets` em dados de mercado"""
         return {
-            "id": data.get("id", coin_id),
-            "name": data.get("name", ""),
-            "symbol": data.get("symbol", "").upper(),
-            "current_price": market_data.get("current_price", {}).get("usd", 0),
-            "market_cap": market_data.get("market_cap", {}).get("usd", 0),
-            "total_volume": market_data.get("total_volume", {}).get("usd", 0),
-            "price_change_24h": market_data.get("price_change_percentage_24h", 0),
-            "high_24h": market_data.get("high_24h", {}).get("usd", 0),
-            "low_24h": market_data.get("low_24h", {}).get("usd", 0),
-            "last_updated": market_data.get("last_updated", datetime.now().isoformat())
+            "id": coin.get("id", ""),
+            "name": coin.get("name", ""),
+            "symbol": (coin.get("symbol") or "").upper(),
+            "current_price": coin.get("current_price") or 0,
+            "market_cap": coin.get("market_cap") or 0,
+            "total_volume": coin.get("total_volume") or 0,
+            "price_change_24h": coin.get("price_change_percentage_24h") or 0,
+            "high_24h": coin.get("high_24h") or 0,
+            "low_24h": coin.get("low_24h") or 0,
+            "last_updated": coin.get("last_updated") or datetime.now().isoformat()
         }
     
-    def get_trending_coins(self, limit: int = 10) -> List[Dict]:
-        """Obtém lista de criptomoedas em alta"""
-        endpoint = "search/trending"
-        data = self._make_request(endpoint)
-        
+    @staticmethod
+    def _parse_trending(data: Dict, limit: int) -> List[Dict]:
+        """Formata a resposta de `search/trending`"""
         coins = []
         if "coins" in data:
             for coin in data["coins"][:limit]:
@@ -108,18 +184,9 @@ class CoinGeckoAPI:
         
         return coins
     
-    def get_top_cryptos(self, limit: int = 50) -> List[Dict]:
-        """Obtém lista das principais criptomoedas"""
-        endpoint = "coins/markets"
-        params = {
-            "vs_currency": "usd",
-            "order": "market_cap_desc",
-            "per_page": limit,
-            "page": 1,
-            "sparkline": "false"
-        }
-        data = self._make_request(endpoint, params)
-        
+    @staticmethod
+    def _parse_top_cryptos(data: List[Dict]) -> List[Dict]:
+        """Formata a resposta de `coins/markets`"""
         cryptos = []
         for coin in data:
             cryptos.append({
@@ -131,7 +198,339 @@ class CoinGeckoAPI:
             })
         
         return cryptos
+    
+    def get_crypto_info(self, coin_id: str) -> Dict:
+        """Obtém informações básicas de uma criptomoeda"""
+        return self._make_request(*self._crypto_info_request(coin_id))
+    
+    @staticmethod
+    def _series_sync_plan(store: TimeSeriesStore, coin_id: str, days: int,
+                          granularity: str) -> Optional[Dict]:
+        """Requisição que completa a série armazenada (None se ela está em dia)
+        
+        Retorna `endpoint`, `params` e `covered_since` (início coberto por uma
+        busca completa, ou None para deltas) para `_merge_series`.
+        """
+        plan = store.plan_sync(
+            coin_id, granularity, days, max_age=CoinGeckoAPI._cache_ttl("market_chart")
+        )
+        if plan is None:
+            return None
+        if plan["type"] == "full":
+            endpoint, params = CoinGeckoAPI._historical_request(coin_id, days)
+            covered_since = plan["since"]
+        else:
+            endpoint, params = CoinGeckoAPI._range_request(coin_id, plan["from"], plan["to"])
+            covered_since = None
+        return {"endpoint": endpoint, "params": params, "covered_since": covered_since}
+    
+    @staticmethod
+    def _series_window(store: TimeSeriesStore, coin_id: str, days: int, granularity: str) -> PriceSeries:
+        """Janela dos últimos `days` dias da série armazenada"""
+        with stage("data_fetcher", "window"):
+            return PriceSeries.from_records(store.window(coin_id, granularity, days))
+    
+    @staticmethod
+    def _merge_series(store: TimeSeriesStore, coin_id: str, days: int, granularity: str,
+                      plan: Optional[Dict], data: Optional[Dict]) -> PriceSeries:
+        """Incorpora ao armazenamento a resposta do plano (se houver) e retorna a janela"""
+        if plan is not None:
+            with stage("data_fetcher", "merge"):
+                store.merge(coin_id, granularity, points_from_market_chart(data), plan["covered_since"])
+        return CoinGeckoAPI._series_window(store, coin_id, days, granularity)
+    
+    def _sync_series(self, coin_id: str, days: int, granularity: str) -> PriceSeries:
+        """Atualiza a série local buscando apenas o que falta e retorna a janela"""
+        plan = self._series_sync_plan(self.store, coin_id, days, granularity)
+        data = None if plan is None else self._fetch(plan["endpoint"], plan["params"])
+        return self._merge_series(self.store, coin_id, days, granularity, plan, data)
+    
+    def get_historical_series(self, coin_id: str, days: int = 30) -> PriceSeries:
+        """Obtém a série histórica (timestamp, price, volume) do armazenamento local
+        
+        Somente os pontos posteriores ao último armazenado são buscados na API.
+        A série fica em cache já em colunas, compartilhada pelos consumidores.
+        """
+        granularity = granularity_for(days)
+        return self.cache.get_or_load(
+            ("series", coin_id, granularity, days),
+            lambda: self._sync_series(coin_id, days, granularity),
+            ttl=self._cache_ttl("market_chart")
+        )
+    
+    def get_stored_series(self, coin_id: str, days: int = 30) -> PriceSeries:
+        """Janela já armazenada localmente, sem consultar a API nem gravar no armazenamento"""
+        return self._series_window(self.store, coin_id, days, granularity_for(days))
+    
+    def get_historical_data(self, coin_id: str, days: int = 30) -> List[Dict]:
+        """Obtém dados históricos de preço"""
+        return self.get_historical_series(coin_id, days).to_points()
+    
+    @staticmethod
+    def _cached_markets(cache: TTLCache, coin_ids: List[str]) -> tuple:
+        """Separa as moedas com dados de mercado no cache das que faltam (sem contar estatísticas)"""
+        found = {}
+        missing = []
+        for coin_id in dict.fromkeys(coin_ids):
+            market = cache.peek(CoinGeckoAPI._market_cache_key(coin_id))
+            if market is not None:
+                found[coin_id] = market
+            else:
+                missing.append(coin_id)
+        return found, missing
+    
+    @staticmethod
+    def _cache_market_rows(cache: TTLCache, data: List[Dict]) -> Dict[str, Dict]:
+        """Formata as linhas de `coins/markets` e preenche o cache por moeda"""
+        found = {}
+        for coin in data:
+            market = CoinGeckoAPI._parse_market_row(coin)
+            cache.set(
+                CoinGeckoAPI._market_cache_key(market["id"]), market,
+                ttl=CoinGeckoAPI._cache_ttl("coins/markets")
+            )
+            found[market["id"]] = market
+        return found
+    
+    def get_market_data_many(self, coin_ids: List[str]) -> Dict[str, Dict]:
+        """Obtém dados de mercado de várias criptomoedas
+        
+        As moedas fora do cache são buscadas em páginas de até 250 IDs em
+        `coins/markets`. IDs desconhecidos ficam de fora do resultado.
+        """
+        found, missing = self._cached_markets(self.cache, coin_ids)
+        for start in range(0, len(missing), MARKETS_PAGE_SIZE):
+            page = missing[start:start + MARKETS_PAGE_SIZE]
+            found.update(self._cache_market_rows(self.cache, self._fetch(*self._markets_request(page))))
+        return found
+    
+    def get_market_data(self, coin_id: str) -> Dict:
+        """Obtém dados de mercado formatados"""
+        market = self.get_market_data_many([coin_id]).get(coin_id)
+        if market is None:
+            raise CoinNotFound(f"Criptomoeda não encontrada: {coin_id}")
+        return market
+    
+    def get_trending_coins(self, limit: int = 10) -> List[Dict]:
+        """Obtém lista de criptomoedas em alta"""
+        return self._parse_trending(self._make_request("search/trending"), limit)
+    
+    def get_top_cryptos(self, limit: int = 50) -> List[Dict]:
+        """Obtém lista das principais criptomoedas"""
+        data = self._make_request(*self._top_cryptos_request(limit))
+        return self._parse_top_cryptos(data)
+
+
+class AsyncCoinGeckoAPI:
+    """Cliente assíncrono para a API CoinGecko (aiohttp com pool de conexões)
+    
+    Reaproveita a montagem de requisições e a formatação de respostas de
+    `CoinGeckoAPI`, e pode compartilhar o mesmo cache com o cliente síncrono.
+    """
+    
+    BASE_URL = CoinGeckoAPI.BASE_URL
+    
+    def __init__(self, cache: Optional[TTLCache] = None,
+                 store: Optional[TimeSeriesStore] = None,
+                 scheduler: Optional[RequestScheduler] = None,
+                 transport: Optional[Transport] = None,
+                 max_connections: int = 100, max_per_host: int = 20,
+                 timeout: float = 10, batch_window: float = 0.02):
+        self.transport = transport if transport is not None else HttpTransport(
+            self.BASE_URL, timeout=timeout,
+            max_connections=max_connections, max_per_host=max_per_host
+        )
+        self.cache = cache if cache is not None else TTLCache(
+            max_size=int(os.getenv("CACHE_MAX_ENTRIES", 512)),
+            default_ttl=DEFAULT_CACHE_TTL
+        )
+        self.store = store if store is not None else TimeSeriesStore(
+            os.getenv("DATA_DIR", "data")
+        )
+        self.scheduler = scheduler if scheduler is not None else RequestScheduler()
+        self.batch_window = batch_window
+        self._pending: Optional[Dict[str, asyncio.Future]] = None
+        # Referências fortes às tarefas de agrupamento (o loop só guarda referências fracas)
+        self._tasks: Set[asyncio.Task] = set()
+    
+    async def close(self):
+        """Cancela os lotes de mercado pendentes e fecha as conexões do transporte"""
+        tasks = list(self._tasks)
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        await self.transport.aclose()
+    
+    async def _make_request(self, endpoint: str, params: Optional[Dict] = None) -> Dict:
+        """Faz uma requisição à API (com cache e coalescência de chamadas)"""
+        return await self.cache.aget_or_load(
+            CoinGeckoAPI._cache_key(endpoint, params),
+            lambda: self._fetch(endpoint, params),
+            ttl=CoinGeckoAPI._cache_ttl(endpoint)
+        )
+    
+    async def _fetch(self, endpoint: str, params: Optional[Dict] = None) -> Dict:
+        """Faz uma requisição à API sem passar pelo cache, dentro do limite de taxa"""
+        with stage("data_fetcher", "fetch"):
+            return await self.scheduler.acall(lambda: self._get(endpoint, params))
+    
+    async def _get(self, endpoint: str, params: Optional[Dict] = None) -> Dict:
+        """Executa a requisição pelo transporte configurado (HTTP, gravação ou reprodução)"""
+        with upstream_call(endpoint):
+            return await self.transport.aget(endpoint, params)
+    
+    async def get_crypto_info(self, coin_id: str) -> Dict:
+        """Obtém informações básicas de uma criptomoeda"""
+        return await self._make_request(*CoinGeckoAPI._crypto_info_request(coin_id))
+    
+    async def _sync_series(self, coin_id: str, days: int, granularity: str) -> PriceSeries:
+        """Atualiza a série local buscando apenas o que falta e retorna a janela"""
+        plan = CoinGeckoAPI._series_sync_plan(self.store, coin_id, days, granularity)
+        data = None if plan is None else await self._fetch(plan["endpoint"], plan["params"])
+        return CoinGeckoAPI._merge_series(self.store, coin_id, days, granularity, plan, data)
+    
+    async def get_historical_series(self, coin_id: str, days: int = 30) -> PriceSeries:
+        """Obtém a série histórica (timestamp, price, volume) do armazenamento local"""
+        granularity = granularity_for(days)
+        return await self.cache.aget_or_load(
+            ("series", coin_id, granularity, days),
+            lambda: self._sync_series(coin_id, days, granularity),
+            ttl=CoinGeckoAPI._cache_ttl("market_chart")
+        )
+    
+    async def get_historical_data(self, coin_id: str, days: int = 30) -> List[Dict]:
+        """Obtém dados históricos de preço"""
+        return (await self.get_historical_series(coin_id, days)).to_points()
+    
+    async def get_market_data_many(self, coin_ids: List[str]) -> Dict[str, Dict]:
+        """Obtém dados de mercado de várias criptomoedas (páginas de até 250 IDs)"""
+        found, missing = CoinGeckoAPI._cached_markets(self.cache, coin_ids)
+        pages = [missing[start:start + MARKETS_PAGE_SIZE]
+                 for start in range(0, len(missing), MARKETS_PAGE_SIZE)]
+        results = await asyncio.gather(
+            *[self._fetch(*CoinGeckoAPI._markets_request(page)) for page in pages]
+        )
+        for data in results:
+            found.update(CoinGeckoAPI._cache_market_rows(self.cache, data))
+        return found
+    
+    async def _flush_market_batch(self):
+        """Busca de uma vez as moedas pedidas durante a janela de agrupamento
+
+        Todo pedido do lote recebe resposta: se a tarefa for cancelada (por
+        exemplo, no encerramento), os pedidos ainda pendentes são cancelados.
+        """
+        pending = None
+        found, error, cancelled = {}, None, False
+        try:
+            await asyncio.sleep(self.batch_window)
+            pending, self._pending = self._pending, None
+            found = await self.get_market_data_many(list(pending))
+        except asyncio.CancelledError:
+            cancelled = True
+            raise
+        except Exception as e:
+            error = e
+        finally:
+            if pending is None:
+                pending, self._pending = self._pending or {}, None
+            for coin_id, future in pending.items():
+                if future.done():
+                    continue
+                if coin_id in found:
+                    future.set_result(found[coin_id])
+                elif cancelled:
+                    future.cancel()
+                else:
+                    future.set_exception(error or CoinNotFound(f"Criptomoeda não encontrada: {coin_id}"))
+                    # Evita o aviso de exceção não recuperada quando ninguém mais espera
+                    future.exception()
+    
+    async def get_market_data(self, coin_id: str) -> Dict:
+        """Obtém dados de mercado formatados
+        
+        Pedidos de moedas fora do cache feitos dentro de `batch_window`
+        segundos são agrupados em uma única chamada a `coins/markets`.
+        """
+        market = self.cache.get(CoinGeckoAPI._market_cache_key(coin_id))
+        if market is not None:
+            return market
+        
+        if self._pending is None:
+            self._pending = {}
+            task = asyncio.get_running_loop().create_task(self._flush_market_batch())
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+        future = self._pending.get(coin_id)
+        if future is None:
+            future = asyncio.get_running_loop().create_future()
+            self._pending[coin_id] = future
+        return await asyncio.shield(future)
+    
+    async def get_trending_coins(self, limit: int = 10) -> List[Dict]:
+        """Obtém lista de criptomoedas em alta"""
+        data = await self._make_request("search/trending")
+        return CoinGeckoAPI._parse_trending(data, limit)
+    
+    async def get_top_cryptos(self, limit: int = 50) -> List[Dict]:
+        """Obtém lista das principais criptomoedas"""
+        data = await self._make_request(*CoinGeckoAPI._top_cryptos_request(limit))
+        return CoinGeckoAPI._parse_top_cryptos(data)
+
+# Cache e armazenamento de séries compartilhados entre os clientes
+api_cache = TTLCache(
+    max_size=int(os.getenv("CACHE_MAX_ENTRIES", 512)),
+    default_ttl=DEFAULT_CACHE_TTL
+)
+series_store = TimeSeriesStore(os.getenv("DATA_DIR", "data"))
+
+# Limite de taxa compartilhado por todas as requisições externas do processo
+# (o plano gratuito da CoinGecko permite cerca de 30 por minuto)
+upstream_scheduler = RequestScheduler(
+    rate=float(os.getenv("UPSTREAM_RATE_PER_MIN", 30)) / 60,
+    burst=int(os.getenv("UPSTREAM_BURST", 10)),
+    max_queue=int(os.getenv("UPSTREAM_MAX_QUEUE", 100)),
+    max_wait={
+        INTERACTIVE: float(os.getenv("UPSTREAM_MAX_WAIT", 10)),
+        BACKGROUND: float(os.getenv("UPSTREAM_BACKGROUND_MAX_WAIT", 120))
+    },
+    max_retries=int(os.getenv("UPSTREAM_MAX_RETRIES", 3))
+)
+
+# Transporte compartilhado pelos clientes (HTTP, gravação ou reprodução de fixtures)
+upstream_transport = transport_from_env(
+    max_connections=int(os.getenv("UPSTREAM_MAX_CONNECTIONS", 100)),
+    max_per_host=int(os.getenv("UPSTREAM_MAX_PER_HOST", 20))
+)
 
-# Instância global do cliente
-coin_gecko = CoinGeckoAPI()
+# Instâncias globais dos clientes
+coin_gecko = CoinGeckoAPI(
+    cache=api_cache, store=series_store, scheduler=upstream_scheduler, transport=upstream_transport
+)
+async_coin_gecko = AsyncCoinGeckoAPI(
+    cache=api_cache,
+    store=series_store,
+    scheduler=upstream_scheduler,
+    transport=upstream_transport,
+    batch_window=float(os.getenv("MARKET_BATCH_WINDOW", 0.02))
+)
 
+# Contadores do cache e do limite de requisições lidos a cada coleta de `/metrics`
+metrics.callback("cryptoanalytics_cache_hits_total", "Acertos do cache de requisições",
+                 lambda: api_cache.hits, kind="counter")
+metrics.callback("cryptoanalytics_cache_misses_total", "Faltas do cache de requisições",
+                 lambda: api_cache.misses, kind="counter")
+metrics.callback("cryptoanalytics_cache_coalesced_total", "Carregamentos coalescidos no cache",
+                 lambda: api_cache.coalesced, kind="counter")
+metrics.callback("cryptoanalytics_cache_evictions_total", "Entradas despejadas do cache",
+                 lambda: api_cache.evictions, kind="counter")
+metrics.callback("cryptoanalytics_cache_entries", "Entradas no cache",
+                 lambda: api_cache.stats()["size"])
+metrics.callback("cryptoanalytics_upstream_queue_depth", "Requisições externas aguardando ficha",
+                 lambda: {(priority,): count
+                          for priority, count in upstream_scheduler.stats()["queue_depth"].items()},
+                 labels=("priority",))
+metrics.callback("cryptoanalytics_upstream_throttled_total", "Respostas 429 da API externa",
+                 lambda: upstream_scheduler.throttled, kind="counter")
+metrics.callback("cryptoanalytics_upstream_retries_total", "Novas tentativas de requisições externas",
+                 lambda: upstream_scheduler.retries, kind="counter")
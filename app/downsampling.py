@@ -0,0 +1,47 @@
+"""
+Redução de pontos de séries temporais para gráficos
+"""
+
+import numpy as np
+
+
+def lttb_indices(x, y, n_out: int) -> np.ndarray:
+    """Índices escolhidos pelo Largest-Triangle-Three-Buckets
+
+    Mantém o primeiro e o último ponto e, de cada um dos `n_out - 2` baldes
+    intermediários, o ponto que forma o maior triângulo com o ponto escolhido
+    no balde anterior e a média do balde seguinte. Preserva picos e vales,
+    ao contrário de amostrar a cada k pontos.
+    """
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    n = len(x)
+    if n_out >= n:
+        return np.arange(n)
+    if n_out < 3:
+        return np.linspace(0, n - 1, max(n_out, 0)).astype(np.int64)
+
+    # Limites dos baldes intermediários sobre os pontos 1..n-2
+    edges = np.linspace(1, n - 1, n_out - 1).astype(np.int64)
+    selected = np.empty(n_out, dtype=np.int64)
+    selected[0] = 0
+    selected[-1] = n - 1
+
+    previous = 0
+    for bucket in range(n_out - 2):
+        start, end = edges[bucket], edges[bucket + 1]
+        # Média do balde seguinte (o último ponto, no caso do último balde)
+        next_end = edges[bucket + 2] if bucket + 2 < len(edges) else n
+        avg_x = x[end:next_end].mean()
+        avg_y = y[end:next_end].mean()
+
+        # Área (dobrada) do triângulo anterior-candidato-média
+        area = np.abs(
+            (x[previous] - avg_x) * (y[start:end] - y[previous])
+            - (x[previous] - x[start:end]) * (avg_y - y[previous])
+        )
+        previous = start + int(np.argmax(area))
+        selected[bucket + 1] = previous
+
+    return selected
+
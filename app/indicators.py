@@ -0,0 +1,291 @@
+"""
+Engine vetorizada de indicadores técnicos sobre séries completas
+
+Todas as funções aceitam arrays 1-D (uma série) ou 2-D (uma série por linha)
+e calculam ao longo do último eixo. O valor na posição `i` é o que o
+indicador retornaria usando apenas os preços até `i`.
+"""
+
+from collections import deque
+from typing import Dict
+
+import numpy as np
+
+
+def lfilter(b, a, x, axis: int = -1, zi=None):
+    """`scipy.signal.lfilter`, importado no primeiro uso (o import leva cerca de 1 s)"""
+    from scipy.signal import lfilter as _lfilter
+    return _lfilter(b, a, x, axis=axis, zi=zi)
+
+
+def _as_prices(prices) -> np.ndarray:
+    return np.asarray(prices, dtype=np.float64)
+
+
+def _expanding_mean(prices: np.ndarray) -> np.ndarray:
+    """Média de todos os preços até cada posição"""
+    counts = np.arange(1, prices.shape[-1] + 1, dtype=np.float64)
+    return np.cumsum(prices, axis=-1) / counts
+
+
+def _ema_recurrence(values: np.ndarray, alpha: float) -> np.ndarray:
+    """y[n] = alpha * x[n] + (1 - alpha) * y[n-1], iniciando em y[0] = x[0]"""
+    decay = 1.0 - alpha
+    zi = decay * values[..., :1]
+    y, _ = lfilter([alpha], [1.0, -decay], values, axis=-1, zi=zi)
+    return y
+
+
+def sma_series(prices, period: int) -> np.ndarray:
+    """Média Móvel Simples; antes de `period` pontos usa a média disponível"""
+    prices = _as_prices(prices)
+    n = prices.shape[-1]
+    result = _expanding_mean(prices)
+    if n > period:
+        csum = np.cumsum(prices, axis=-1)
+        result[..., period:] = (csum[..., period:] - csum[..., :-period]) / period
+    return result
+
+
+def ema_series(prices, period: int) -> np.ndarray:
+    """Média Móvel Exponencial; antes de `period` pontos usa a média disponível"""
+    prices = _as_prices(prices)
+    if prices.shape[-1] == 0:
+        return prices.copy()
+    result = _ema_recurrence(prices, 2 / (period + 1))
+    warmup = min(period - 1, prices.shape[-1])
+    result[..., :warmup] = _expanding_mean(prices[..., :warmup])
+    return result
+
+
+def rsi_series(prices, period: int = 14) -> np.ndarray:
+    """RSI com suavização de Wilder; 50 (neutro) até haver `period` variações"""
+    prices = _as_prices(prices)
+    n = prices.shape[-1]
+    result = np.full(prices.shape, 50.0)
+    if n < period + 1:
+        return result
+
+    deltas = np.diff(prices, axis=-1)
+    gains = np.where(deltas > 0, deltas, 0.0)
+    losses = np.where(deltas < 0, -deltas, 0.0)
+
+    # Média simples das primeiras `period` variações, depois recorrência de Wilder
+    alpha = 1.0 / period
+    avg_gain = np.empty(gains[..., period - 1:].shape)
+    avg_loss = np.empty(losses[..., period - 1:].shape)
+    avg_gain[..., 0] = gains[..., :period].mean(axis=-1)
+    avg_loss[..., 0] = losses[..., :period].mean(axis=-1)
+    if n > period + 1:
+        zi_gain = (1.0 - alpha) * avg_gain[..., :1]
+        zi_loss = (1.0 - alpha) * avg_loss[..., :1]
+        avg_gain[..., 1:], _ = lfilter([alpha], [1.0, alpha - 1.0], gains[..., period:], axis=-1, zi=zi_gain)
+        avg_loss[..., 1:], _ = lfilter([alpha], [1.0, alpha - 1.0], losses[..., period:], axis=-1, zi=zi_loss)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        rs = avg_gain / avg_loss
+        rsi = 100.0 - 100.0 / (1.0 + rs)
+    result[..., period:] = np.where(avg_loss == 0, 100.0, rsi)
+    return result
+
+
+def macd_series(prices, fast: int = 12, slow: int = 26, signal: int = 9) -> Dict[str, np.ndarray]:
+    """MACD, linha de sinal e histograma; zero até haver `slow` pontos"""
+    prices = _as_prices(prices)
+    n = prices.shape[-1]
+    macd = np.zeros(prices.shape)
+    signal_line = np.zeros(prices.shape)
+    if n >= slow:
+        macd[..., slow - 1:] = (ema_series(prices, fast) - ema_series(prices, slow))[..., slow - 1:]
+        signal_line[..., slow - 1:] = _ema_recurrence(macd[..., slow - 1:], 2 / (signal + 1))
+    return {
+        "macd": macd,
+        "macd_signal": signal_line,
+        "macd_histogram": macd - signal_line
+    }
+
+
+def compute_indicators(prices) -> Dict[str, np.ndarray]:
+    """Calcula todas as séries de indicadores usadas na análise técnica"""
+    prices = _as_prices(prices)
+    series = {
+        "sma_20": sma_series(prices, 20),
+        "sma_50": sma_series(prices, 50),
+        "ema_12": ema_series(prices, 12),
+        "ema_26": ema_series(prices, 26),
+        "rsi": rsi_series(prices, 14)
+    }
+    series.update(macd_series(prices, 12, 26, 9))
+    return series
+
+
+class IndicatorState:
+    """Estado incremental dos indicadores de uma série, atualizado a cada tick
+
+    Cada `update` custa tempo constante: somas móveis para as SMAs, recorrências
+    para EMAs/MACD/sinal e médias de Wilder para o RSI. Os ticks seguem a regra
+    de `TimeSeriesStore.merge`: o primeiro tick de cada intervalo (`step_ms`) é
+    a abertura e fica definitivo; um tick posterior no mesmo intervalo entra
+    como preço atual, depois da abertura, e é substituído pelo próximo tick.
+    Sobre a série armazenada, os valores são os das funções de série deste
+    módulo aplicadas à mesma série.
+    """
+
+    WINDOW = 50
+    RESYNC_EVERY = 1024
+
+    def __init__(self, step_ms: int = 86_400_000):
+        self.step_ms = step_ms
+        self.count = 0
+        self.last_ts = None
+        self.window = deque(maxlen=self.WINDOW)
+        self.sum_20 = 0.0
+        self.sum_50 = 0.0
+        self.sum_all = 0.0
+        self.ema_12 = 0.0
+        self.ema_26 = 0.0
+        self.macd = 0.0
+        self.macd_signal = 0.0
+        self.gain_sum = 0.0
+        self.loss_sum = 0.0
+        self.avg_gain = 0.0
+        self.avg_loss = 0.0
+        # Estado antes do preço atual provisório (None se o último tick é uma abertura)
+        self._tail = None
+
+    def _fields(self) -> Dict:
+        return {
+            "step_ms": self.step_ms,
+            "count": self.count,
+            "last_ts": self.last_ts,
+            "window": list(self.window),
+            "sum_20": self.sum_20,
+            "sum_50": self.sum_50,
+            "sum_all": self.sum_all,
+            "ema_12": self.ema_12,
+            "ema_26": self.ema_26,
+            "macd": self.macd,
+            "macd_signal": self.macd_signal,
+            "gain_sum": self.gain_sum,
+            "loss_sum": self.loss_sum,
+            "avg_gain": self.avg_gain,
+            "avg_loss": self.avg_loss
+        }
+
+    def _restore_fields(self, fields: Dict):
+        window = fields["window"]
+        for name, value in fields.items():
+            setattr(self, name, value)
+        self.window = deque(window, maxlen=self.WINDOW)
+
+    def update(self, timestamp: int, price: float):
+        """Incorpora um novo tick (ignora ticks anteriores ao último)"""
+        timestamp = int(timestamp)
+        price = float(price)
+        if self.last_ts is not None:
+            if timestamp <= self.last_ts:
+                return
+            if self._tail is not None:
+                # O preço atual anterior é substituído (ou descartado, se o intervalo mudou)
+                self._restore_fields(self._tail)
+                self._tail = None
+            if timestamp // self.step_ms == self.last_ts // self.step_ms:
+                # Mesmo intervalo da abertura: entra como preço atual provisório
+                self._tail = self._fields()
+        self._apply(timestamp, price)
+
+    def _apply(self, timestamp: int, price: float):
+        previous_price = self.window[-1] if self.window else None
+        n = self.count + 1
+
+        # Somas móveis das SMAs
+        self.sum_20 += price - (self.window[-20] if len(self.window) >= 20 else 0.0)
+        self.sum_50 += price - (self.window[0] if len(self.window) == self.WINDOW else 0.0)
+        self.sum_all += price
+        self.window.append(price)
+        if n % self.RESYNC_EVERY == 0:
+            recent = list(self.window)
+            self.sum_20 = float(sum(recent[-20:]))
+            self.sum_50 = float(sum(recent))
+
+        # EMAs (recorrência iniciada no primeiro preço)
+        if n == 1:
+            self.ema_12 = self.ema_26 = price
+        else:
+            self.ema_12 = (2 / 13) * price + (1 - 2 / 13) * self.ema_12
+            self.ema_26 = (2 / 27) * price + (1 - 2 / 27) * self.ema_26
+
+        # MACD e linha de sinal a partir do 26º ponto
+        if n >= 26:
+            self.macd = self.ema_12 - self.ema_26
+            if n == 26:
+                self.macd_signal = self.macd
+            else:
+                self.macd_signal = (2 / 10) * self.macd + (1 - 2 / 10) * self.macd_signal
+
+        # RSI de Wilder: média simples das 14 primeiras variações, depois recorrência
+        if previous_price is not None:
+            delta = price - previous_price
+            gain = delta if delta > 0 else 0.0
+            loss = -delta if delta < 0 else 0.0
+            deltas = n - 1
+            if deltas < 14:
+                self.gain_sum += gain
+                self.loss_sum += loss
+            elif deltas == 14:
+                self.avg_gain = (self.gain_sum + gain) / 14
+                self.avg_loss = (self.loss_sum + loss) / 14
+            else:
+                self.avg_gain = (1 / 14) * gain + (1 - 1 / 14) * self.avg_gain
+                self.avg_loss = (1 / 14) * loss + (1 - 1 / 14) * self.avg_loss
+
+        self.count = n
+        self.last_ts = timestamp
+
+    def _sma(self, period: int, total: float) -> float:
+        if self.count >= period:
+            return total / period
+        return self.sum_all / self.count
+
+    def _ema(self, period: int, value: float) -> float:
+        return value if self.count >= period else self.sum_all / self.count
+
+    def values(self) -> Dict[str, float]:
+        """Valores atuais dos indicadores"""
+        if not self.count:
+            raise ValueError("Estado de indicadores vazio")
+        if self.count < 15:
+            rsi = 50.0
+        elif self.avg_loss == 0:
+            rsi = 100.0
+        else:
+            rsi = 100.0 - 100.0 / (1.0 + self.avg_gain / self.avg_loss)
+        recent = list(self.window)[-30:]
+        return {
+            "price": self.window[-1],
+            "sma_20": self._sma(20, self.sum_20),
+            "sma_50": self._sma(50, self.sum_50),
+            "ema_12": self._ema(12, self.ema_12),
+            "ema_26": self._ema(26, self.ema_26),
+            "rsi": rsi,
+            "macd": self.macd if self.count >= 26 else 0.0,
+            "macd_signal": self.macd_signal if self.count >= 26 else 0.0,
+            "support": min(recent),
+            "resistance": max(recent)
+        }
+
+    def to_dict(self) -> Dict:
+        """Serializa o estado (inclusive o estado anterior ao preço atual provisório)"""
+        data = self._fields()
+        data["tail"] = self._tail
+        return data
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> "IndicatorState":
+        """Restaura um estado serializado com `to_dict`"""
+        state = cls(step_ms=data["step_ms"])
+        fields = dict(data)
+        tail = fields.pop("tail", None)
+        state._restore_fields(fields)
+        state._tail = tail
+        return state
@@ -0,0 +1,284 @@
+"""
+Fila de jobs de treinamento (e outras tarefas pesadas) executados em um pool de processos
+"""
+
+import multiprocessing
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from datetime import datetime
+from typing import Callable, Dict, Optional
+
+from app.data_fetcher import coin_gecko
+from app.metrics import STAGE_SECONDS, metrics
+from app.ml_engine import TRAINING_HISTORY_DAYS, ml_predictor
+from app.rate_limiter import BACKGROUND, upstream_priority
+
+TRAINING_JOB_SECONDS = metrics.histogram(
+    "cryptoanalytics_training_job_seconds",
+    "Tempo entre o envio e a conclusão dos jobs de treinamento",
+    ("status",)
+)
+
+
+class JobQueueFull(Exception):
+    """Já há o máximo de jobs do tipo na fila ou em execução"""
+
+
+def _sync_training_history(coin_id: str):
+    """Atualiza, no processo da API, a série que o treino vai ler do armazenamento
+
+    Assim as requisições externas passam pelo limite de taxa do processo e só
+    ele grava no armazenamento; o processo filho apenas lê.
+    """
+    with upstream_priority(BACKGROUND):
+        coin_gecko.get_historical_series(coin_id, days=TRAINING_HISTORY_DAYS)
+
+
+def _run_training(coin_id: str, days_ahead: int) -> Dict:
+    """Treina e salva o modelo no processo filho, com a série já sincronizada"""
+    from app.ml_engine import MLPredictor
+    return MLPredictor().train_model(coin_id, days_ahead, offline=True)
+
+
+def _warm_worker() -> float:
+    """Importa no processo filho as dependências do treino; retorna a duração"""
+    started = time.perf_counter()
+    import sklearn.ensemble  # noqa: F401
+    import sklearn.model_selection  # noqa: F401
+    from app.ml_engine import MLPredictor  # noqa: F401
+    return time.perf_counter() - started
+
+
+class TrainingJobManager:
+    """Executa treinamentos fora do processo da API, sem duplicar jobs
+
+    Um job por (coin_id, days_ahead) fica ativo de cada vez: pedidos repetidos
+    enquanto ele está na fila ou em execução recebem o mesmo job. Antes de ir
+    para o pool, cada job passa por `prepare(coin_id)` em uma thread do
+    processo da API (por exemplo, para sincronizar a série usada no treino).
+
+    Outras tarefas (`submit_task`, como o backtest) rodam em `task_workers`
+    threads próprias, para não atrasar o preparo dos treinos; elas enviam o
+    trabalho pesado ao mesmo pool com `run_in_pool` e são acompanhadas por
+    `get`, como os treinos.
+    """
+
+    def __init__(self, max_workers: int = 1, history_size: int = 1000,
+                 on_complete: Optional[Callable[[str, int], None]] = None,
+                 prepare: Optional[Callable[[str], None]] = None, task_workers: int = 1):
+        self.max_workers = max_workers
+        self.history_size = history_size
+        self.on_complete = on_complete
+        self.prepare = prepare
+        self.task_workers = task_workers
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._prepare_executor: Optional[ThreadPoolExecutor] = None
+        self._task_executor: Optional[ThreadPoolExecutor] = None
+        self._jobs: "OrderedDict[str, Dict]" = OrderedDict()
+        self._futures: Dict[str, Future] = {}
+        self._active: Dict[tuple, str] = {}
+        self._lock = threading.Lock()
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        """Cria o pool de processos no primeiro uso"""
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.max_workers,
+                mp_context=multiprocessing.get_context("spawn")
+            )
+        return self._executor
+
+    def _submit_to_pool(self, fn: Callable, *args) -> Future:
+        """Envia ao pool de processos, recriando-o se um filho morreu (chamar com o lock adquirido)"""
+        try:
+            return self._get_executor().submit(fn, *args)
+        except BrokenProcessPool:
+            self._executor = None
+            return self._get_executor().submit(fn, *args)
+
+    def run_in_pool(self, fn: Callable, *args) -> Future:
+        """Executa `fn(*args)` no pool de processos compartilhado pelos treinos"""
+        with self._lock:
+            return self._submit_to_pool(fn, *args)
+
+    def _register(self, kind: str, **fields) -> str:
+        """Cria o registro de um job na fila (chamar com o lock adquirido)"""
+        job_id = uuid.uuid4().hex
+        self._jobs[job_id] = {
+            "id": job_id,
+            "kind": kind,
+            "coin_id": None,
+            "days_ahead": None,
+            "params": None,
+            "status": "queued",
+            "submitted_at": datetime.now().isoformat(),
+            "finished_at": None,
+            "result": None,
+            "error": None,
+            **fields
+        }
+        # Descartar o histórico mais antigo de jobs já finalizados
+        while len(self._jobs) > self.history_size:
+            oldest = next(iter(self._jobs.values()))
+            if oldest["status"] == "queued":
+                break
+            self._jobs.popitem(last=False)
+        return job_id
+
+    def _get_prepare_executor(self) -> ThreadPoolExecutor:
+        """Cria as threads de preparo dos treinos no primeiro uso (chamar com o lock adquirido)"""
+        if self._prepare_executor is None:
+            self._prepare_executor = ThreadPoolExecutor(
+                max_workers=self.max_workers, thread_name_prefix="training-prepare"
+            )
+        return self._prepare_executor
+
+    def submit(self, coin_id: str, days_ahead: int = 7) -> Dict:
+        """Enfileira o treino do modelo ou retorna o job já ativo para ele"""
+        key = (coin_id, days_ahead)
+        with self._lock:
+            job_id = self._active.get(key)
+            if job_id is not None:
+                return self._snapshot(job_id)
+
+            job_id = self._register("training", coin_id=coin_id, days_ahead=days_ahead)
+            self._active[key] = job_id
+            self._get_prepare_executor().submit(self._launch, job_id, coin_id, days_ahead)
+
+        return self.get(job_id)
+
+    def _get_task_executor(self) -> ThreadPoolExecutor:
+        """Cria as threads das tarefas no primeiro uso (chamar com o lock adquirido)"""
+        if self._task_executor is None:
+            self._task_executor = ThreadPoolExecutor(
+                max_workers=self.task_workers, thread_name_prefix="background-task"
+            )
+        return self._task_executor
+
+    def submit_task(self, kind: str, run: Callable[[], Dict], params: Optional[Dict] = None,
+                    max_pending: Optional[int] = None) -> Dict:
+        """Enfileira uma tarefa executada em uma thread do processo da API
+
+        O valor retornado por `run()` fica em `result` do job. Com
+        `max_pending`, levanta `JobQueueFull` se já houver esse número de jobs
+        do tipo na fila ou em execução.
+        """
+        with self._lock:
+            if max_pending is not None and self._pending(kind) >= max_pending:
+                raise JobQueueFull(f"Limite de {max_pending} jobs de {kind} na fila atingido")
+            job_id = self._register(kind, params=params)
+            future = self._get_task_executor().submit(run)
+            self._futures[job_id] = future
+        future.add_done_callback(lambda f: self._finish(job_id, f))
+        return self.get(job_id)
+
+    def _pending(self, kind: str) -> int:
+        """Jobs do tipo `kind` na fila ou em execução (chamar com o lock adquirido)"""
+        return sum(1 for job in self._jobs.values() if job["kind"] == kind and job["finished_at"] is None)
+
+
+    def _launch(self, job_id: str, coin_id: str, days_ahead: int):
+        """Prepara o job no processo da API e o envia ao pool de processos"""
+        try:
+            if self.prepare is not None:
+                self.prepare(coin_id)
+        except Exception as e:
+            failed = Future()
+            failed.set_exception(e)
+            self._finish(job_id, failed)
+            return
+
+        with self._lock:
+            closed = self._prepare_executor is None
+            if not closed:
+                future = self._submit_to_pool(_run_training, coin_id, days_ahead)
+                self._futures[job_id] = future
+
+        if closed:
+            # O gerenciador foi encerrado durante o preparo
+            future = Future()
+            future.cancel()
+        future.add_done_callback(lambda f: self._finish(job_id, f))
+
+    def warm(self) -> Future:
+        """Inicia um processo do pool e carrega nele o scikit-learn antes do primeiro job"""
+        return self.run_in_pool(_warm_worker)
+
+    def _finish(self, job_id: str, future: Future):
+        """Registra o resultado de um job concluído"""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            self._futures.pop(job_id, None)
+            if job is None:
+                return
+            if job["kind"] == "training":
+                self._active.pop((job["coin_id"], job["days_ahead"]), None)
+            job["finished_at"] = datetime.now().isoformat()
+            if future.cancelled():
+                job["status"] = "cancelled"
+            elif future.exception() is not None:
+                job["status"] = "failed"
+                job["error"] = str(future.exception())
+            else:
+                job["status"] = "completed"
+                job["result"] = future.result()
+
+        if job["kind"] != "training":
+            return
+        elapsed = datetime.fromisoformat(job["finished_at"]) - datetime.fromisoformat(job["submitted_at"])
+        TRAINING_JOB_SECONDS.observe(elapsed.total_seconds(), job["status"])
+        # As etapas do treino foram medidas no processo filho; registrá-las aqui
+        for name, seconds in ((job["result"] or {}).get("timings") or {}).items():
+            STAGE_SECONDS.observe(seconds, "ml_engine", name)
+
+        if job["status"] == "completed" and self.on_complete is not None:
+            self.on_complete(job["coin_id"], job["days_ahead"])
+
+    def _snapshot(self, job_id: str) -> Dict:
+        """Cópia do estado do job (chamar com o lock adquirido)"""
+        job = dict(self._jobs[job_id])
+        future = self._futures.get(job_id)
+        if job["status"] == "queued" and future is not None and future.running():
+            job["status"] = "running"
+        return job
+
+    def get(self, job_id: str) -> Optional[Dict]:
+        """Retorna o estado de um job (None se não existir)"""
+        with self._lock:
+            if job_id not in self._jobs:
+                return None
+            return self._snapshot(job_id)
+
+    def queue_depth(self) -> int:
+        """Número de jobs de treinamento na fila ou em execução"""
+        with self._lock:
+            return len(self._active)
+
+    def shutdown(self):
+        """Encerra o pool, cancelando os jobs ainda não iniciados"""
+        if self._prepare_executor is not None:
+            self._prepare_executor.shutdown(wait=False, cancel_futures=True)
+            self._prepare_executor = None
+        if self._task_executor is not None:
+            self._task_executor.shutdown(wait=False, cancel_futures=True)
+            self._task_executor = None
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+# Instância global do gerenciador de jobs
+training_jobs = TrainingJobManager(
+    max_workers=int(os.getenv("TRAINING_WORKERS", 1)),
+    on_complete=ml_predictor.invalidate,
+    prepare=_sync_training_history,
+    task_workers=int(os.getenv("TASK_WORKERS", 1))
+)
+
+metrics.callback("cryptoanalytics_training_queue_depth", "Jobs de treinamento na fila ou em execução",
+                 training_jobs.queue_depth)
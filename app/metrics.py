@@ -0,0 +1,336 @@
+"""
+Métricas em memória (contadores, medidores e histogramas) no formato texto do Prometheus
+"""
+
+import bisect
+import re
+import threading
+import time
+from typing import Callable, Dict, List, Sequence, Tuple, Union
+
+from app.rate_limiter import UpstreamThrottled
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Limites (segundos) dos histogramas de latência: de 0,5 ms a 2 minutos
+LATENCY_BUCKETS = (
+    0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0
+)
+
+_COIN_PATH = re.compile(r"^coins/(?!markets(?:/|$))[^/]+")
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(str(value))}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class _Metric:
+    """Base das métricas com rótulos; os valores ficam por tupla de rótulos"""
+
+    kind = "untyped"
+
+    def __init__(self, name: str, help: str, labels: Sequence[str] = ()):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self._lock = threading.Lock()
+
+    def samples(self) -> List[Tuple[str, str, float]]:
+        raise NotImplementedError
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        lines += [f"{name}{labels} {_format_value(value)}" for name, labels, value in self.samples()]
+        return lines
+
+
+class Counter(_Metric):
+    """Contador monotônico"""
+
+    kind = "counter"
+
+    def __init__(self, name: str, help: str, labels: Sequence[str] = ()):
+        super().__init__(name, help, labels)
+        # Sem rótulos, a série existe (com zero) desde o início
+        self._values: Dict[tuple, float] = {} if self.labels else {(): 0.0}
+
+    def inc(self, *label_values: str, amount: float = 1.0):
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0.0) + amount
+
+    def samples(self) -> List[Tuple[str, str, float]]:
+        with self._lock:
+            items = list(self._values.items())
+        return [(self.name, _format_labels(self.labels, key), value) for key, value in items]
+
+
+class Gauge(Counter):
+    """Valor que sobe e desce (por exemplo, requisições em andamento)"""
+
+    kind = "gauge"
+
+    def set(self, value: float, *label_values: str):
+        with self._lock:
+            self._values[label_values] = value
+
+    def dec(self, *label_values: str, amount: float = 1.0):
+        self.inc(*label_values, amount=-amount)
+
+
+class _Timer:
+    """Mede o bloco e registra a duração no histograma ao sair
+
+    A duração fica em `elapsed` para quem quiser reaproveitá-la.
+    """
+
+    __slots__ = ("histogram", "label_values", "started", "elapsed")
+
+    def __init__(self, histogram: "Histogram", label_values: tuple):
+        self.histogram = histogram
+        self.label_values = label_values
+        self.elapsed = 0.0
+
+    def __enter__(self) -> "_Timer":
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.elapsed = time.perf_counter() - self.started
+        self.histogram.observe(self.elapsed, *self.label_values)
+
+
+class Histogram(_Metric):
+    """Histograma com limites fixos; cada observação custa uma busca binária"""
+
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labels: Sequence[str] = (),
+                 buckets: Sequence[float] = LATENCY_BUCKETS):
+        super().__init__(name, help, labels)
+        self.buckets = tuple(sorted(buckets))
+        # Por tupla de rótulos: contagens por faixa (não acumuladas, +Inf no fim) e soma
+        self._counts: Dict[tuple, List[int]] = {}
+        self._sums: Dict[tuple, float] = {}
+
+    def observe(self, value: float, *label_values: str):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            counts = self._counts.get(label_values)
+            if counts is None:
+                counts = self._counts[label_values] = [0] * (len(self.buckets) + 1)
+                self._sums[label_values] = 0.0
+            counts[index] += 1
+            self._sums[label_values] += value
+
+    def time(self, *label_values: str) -> _Timer:
+        """Gerenciador de contexto que registra a duração do bloco"""
+        return _Timer(self, label_values)
+
+    def samples(self) -> List[Tuple[str, str, float]]:
+        with self._lock:
+            items = [(key, list(counts), self._sums[key]) for key, counts in self._counts.items()]
+        samples = []
+        for key, counts, total in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                le = f'le="{_format_value(bound)}"'
+                samples.append((f"{self.name}_bucket", _format_labels(self.labels, key, le), cumulative))
+            labels = _format_labels(self.labels, key)
+            samples.append((f"{self.name}_sum", labels, total))
+            samples.append((f"{self.name}_count", labels, cumulative))
+        return samples
+
+
+class Callback(_Metric):
+    """Métrica lida na hora da coleta a partir de contadores já mantidos em outro lugar
+
+    `func` retorna um número ou, com rótulos, um dicionário
+    {tupla de valores dos rótulos: número}.
+    """
+
+    def __init__(self, name: str, help: str, kind: str,
+                 func: Callable[[], Union[float, Dict[tuple, float]]], labels: Sequence[str] = ()):
+        super().__init__(name, help, labels)
+        self.kind = kind
+        self.func = func
+
+    def samples(self) -> List[Tuple[str, str, float]]:
+        value = self.func()
+        if not isinstance(value, dict):
+            value = {(): value}
+        return [(self.name, _format_labels(self.labels, key), float(v)) for key, v in value.items()]
+
+
+class MetricsRegistry:
+    """Conjunto de métricas do processo, exposto em `/metrics`
+
+    Cada processo (worker do uvicorn ou do pool de treino) tem o próprio
+    registro; o Prometheus agrega as séries de cada instância coletada.
+    """
+
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+
+    def _register(self, metric: _Metric) -> _Metric:
+        with self._lock:
+            existing = self._metrics.get(metric.name)
+            if existing is not None:
+                return existing
+            self._metrics[metric.name] = metric
+            return metric
+
+    def counter(self, name: str, help: str, labels: Sequence[str] = ()) -> Counter:
+        return self._register(Counter(name, help, labels))
+
+    def gauge(self, name: str, help: str, labels: Sequence[str] = ()) -> Gauge:
+        return self._register(Gauge(name, help, labels))
+
+    def histogram(self, name: str, help: str, labels: Sequence[str] = (),
+                  buckets: Sequence[float] = LATENCY_BUCKETS) -> Histogram:
+        return self._register(Histogram(name, help, labels, buckets))
+
+    def callback(self, name: str, help: str, func: Callable, kind: str = "gauge",
+                 labels: Sequence[str] = ()) -> Callback:
+        """Registra (ou substitui) uma métrica lida de `func` a cada coleta"""
+        metric = Callback(name, help, kind, func, labels)
+        with self._lock:
+            self._metrics[name] = metric
+        return metric
+
+    def render(self) -> str:
+        """Todas as métricas no formato texto de exposição do Prometheus"""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines = []
+        for metric in metrics:
+            lines += metric.render()
+        return "\n".join(lines) + "\n"
+
+
+def endpoint_label(endpoint: str) -> str:
+    """Endpoint da API externa sem o ID da moeda (`coins/{id}/market_chart`)"""
+    return _COIN_PATH.sub("coins/{id}", endpoint.strip("/"))
+
+
+class _UpstreamCall:
+    """Mede uma chamada à API externa e a classifica em ok, throttled ou error"""
+
+    __slots__ = ("endpoint", "started")
+
+    def __init__(self, endpoint: str):
+        self.endpoint = endpoint_label(endpoint)
+
+    def __enter__(self):
+        UPSTREAM_IN_FLIGHT.inc()
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        elapsed = time.perf_counter() - self.started
+        UPSTREAM_IN_FLIGHT.dec()
+        if exc_type is None:
+            status = "ok"
+        elif issubclass(exc_type, UpstreamThrottled):
+            status = "throttled"
+        else:
+            status = "error"
+        UPSTREAM_SECONDS.observe(elapsed, self.endpoint, status)
+
+
+def upstream_call(endpoint: str) -> _UpstreamCall:
+    """Gerenciador de contexto em volta de uma requisição à API externa"""
+    return _UpstreamCall(endpoint)
+
+
+def stage(component: str, name: str) -> _Timer:
+    """Mede uma etapa do caminho crítico (`with stage("ml_engine", "features"):`)"""
+    return STAGE_SECONDS.time(component, name)
+
+
+def route_template(scope) -> str:
+    """Modelo do caminho atendido (`/api/predict/{coin_id}`), com o prefixo do router"""
+    template = getattr(scope.get("route"), "path", None)
+    if template is None:
+        return "unmatched"
+    # Algumas versões do FastAPI guardam na rota só o caminho relativo ao router
+    path = scope["path"]
+    prefix = "/".join(path.split("/")[:path.count("/") - template.count("/") + 1])
+    return prefix + template
+
+
+class MetricsMiddleware:
+    """Middleware ASGI com latência por rota e requisições HTTP em andamento
+
+    A rota é o modelo do caminho (`/api/predict/{coin_id}`), não a URL, para
+    manter baixa a cardinalidade dos rótulos.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status = {"code": 500}
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+            await send(message)
+
+        HTTP_IN_FLIGHT.inc()
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            HTTP_IN_FLIGHT.dec()
+            HTTP_SECONDS.observe(
+                time.perf_counter() - started, scope["method"], route_template(scope), str(status["code"])
+            )
+
+
+# Registro global e métricas compartilhadas pelos módulos
+metrics = MetricsRegistry()
+
+STAGE_SECONDS = metrics.histogram(
+    "cryptoanalytics_stage_seconds",
+    "Duração das etapas do caminho crítico por componente",
+    ("component", "stage")
+)
+UPSTREAM_SECONDS = metrics.histogram(
+    "cryptoanalytics_upstream_request_seconds",
+    "Latência de cada tentativa de requisição à API externa",
+    ("endpoint", "status")
+)
+UPSTREAM_IN_FLIGHT = metrics.gauge(
+    "cryptoanalytics_upstream_requests_in_flight",
+    "Requisições à API externa em andamento"
+)
+HTTP_SECONDS = metrics.histogram(
+    "cryptoanalytics_http_request_seconds",
+    "Latência das requisições HTTP atendidas",
+    ("method", "route", "status")
+)
+HTTP_IN_FLIGHT = metrics.gauge(
+    "cryptoanalytics_http_requests_in_flight",
+    "Requisições HTTP em andamento"
+)
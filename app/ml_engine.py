@@ -3,21 +3,36 @@ Engine de Machine Learning para predição de preços de criptomoedas
 """
 
 import numpy as np
-import pandas as pd
-from sklearn.ensemble import RandomForestRegressor
-from sklearn.model_selection import train_test_split
-from sklearn.metrics import mean_absolute_error, mean_squared_error
-from typing import List, Dict, Tuple
-from app.data_fetcher import coin_gecko
+from numpy.lib.stride_tricks import sliding_window_view
+from typing import List, Dict, Optional, Tuple
+from app.data_fetcher import CoinGeckoAPI, coin_gecko
+from app.price_series import PriceSeries, isoformat
+from app.model_registry import ModelRegistry
+from app.compact_forest import CompactForest
+from app.timeseries_store import validate_coin_id
+from app.metrics import metrics, stage
 import pickle
 import os
 
+# Dias de histórico usados no treino
+TRAINING_HISTORY_DAYS = 90
+
+# As predições valem enquanto a série de 60 dias que as gerou estiver em cache
+PREDICTION_TTL = CoinGeckoAPI._cache_ttl("market_chart")
+
+class ModelNotTrainedError(LookupError):
+    """Não há modelo treinado para a moeda e o horizonte pedidos"""
+
 class MLPredictor:
     """Classe para predição de preços usando Machine Learning"""
     
-    def __init__(self):
-        self.model = None
-        self.models_dir = "models"
+    def __init__(self, feature_dtype=None):
+        self.models_dir = os.getenv("MODELS_DIR", "models")
+        self.registry = ModelRegistry(
+            memory_budget=int(os.getenv("MODEL_CACHE_MB", 256)) * 1024 * 1024
+        )
+        # float32 reduz a memória das features; as árvores já treinam em float32
+        self.feature_dtype = np.dtype(feature_dtype or os.getenv("ML_FEATURE_DTYPE", "float64"))
         os.makedirs(self.models_dir, exist_ok=True)
     
     def _create_features(self, prices: List[float], volumes: List[float] = None) -> np.ndarray:
@@ -43,8 +58,9 @@ class MLPredictor:
         volatility = np.std(prices[-10:]) / np.mean(prices[-10:]) if len(prices) >= 10 else 0
         
         # Features de volume (se disponível)
-        volume_avg = np.mean(volumes[-10:]) if volumes and len(volumes) >= 10 else 0
-        volume_ratio = volumes[-1] / volume_avg if volumes and volume_avg > 0 else 1
+        has_volumes = volumes is not None and len(volumes) > 0
+        volume_avg = np.mean(volumes[-10:]) if has_volumes and len(volumes) >= 10 else 0
+        volume_ratio = volumes[-1] / volume_avg if has_volumes and volume_avg > 0 else 1
         
         features.append([
             current_price,
@@ -61,38 +77,96 @@ class MLPredictor:
         
         return np.array(features)
     
+    def build_feature_matrix(self, prices: List[float], volumes: List[float] = None,
+                             window_size: int = 30, dtype=None) -> np.ndarray:
+        """Cria a matriz de features de todas as janelas de uma só vez
+        
+        A linha `k` corresponde a `_create_features(prices[k:k + window_size], ...)`
+        e tem exatamente os mesmos valores; as estatísticas móveis são
+        calculadas sobre visões deslizantes do array, sem cópias por janela.
+        Também usada pelo backtest walk-forward (`app.backtest`).
+        """
+        dtype = dtype or self.feature_dtype
+        p = np.asarray(prices, dtype=np.float64)
+        n_rows = max(len(p) - window_size + 1, 0)
+        if n_rows == 0 or window_size < 20:
+            return np.zeros((n_rows, 10), dtype=dtype)
+        
+        def rolling(values: np.ndarray, length: int) -> np.ndarray:
+            # Últimos `length` valores de cada janela
+            return sliding_window_view(values, length)[window_size - length:]
+        
+        ends = np.arange(window_size - 1, len(p))
+        current_price = p[ends]
+        price_change_1d = (p[ends] - p[ends - 1]) / p[ends - 1] * 100
+        price_change_3d = (p[ends] - p[ends - 3]) / p[ends - 3] * 100
+        price_change_7d = (p[ends] - p[ends - 7]) / p[ends - 7] * 100
+        
+        sma_5 = rolling(p, 5).mean(axis=-1)
+        sma_10 = rolling(p, 10).mean(axis=-1)
+        sma_20 = rolling(p, 20).mean(axis=-1)
+        volatility = rolling(p, 10).std(axis=-1) / sma_10
+        
+        if volumes is not None and len(volumes):
+            v = np.asarray(volumes, dtype=np.float64)
+            volume_avg = rolling(v, 10).mean(axis=-1)
+            with np.errstate(divide="ignore", invalid="ignore"):
+                volume_ratio = np.where(volume_avg > 0, v[ends] / volume_avg, 1.0)
+        else:
+            volume_avg = np.zeros(n_rows)
+            volume_ratio = np.ones(n_rows)
+        
+        features = np.empty((n_rows, 10), dtype=dtype)
+        for column, values in enumerate((
+            current_price, price_change_1d, price_change_3d, price_change_7d,
+            sma_5, sma_10, sma_20, volatility, volume_avg, volume_ratio
+        )):
+            features[:, column] = values
+        return features
+    
     def _prepare_training_data(self, prices: List[float], volumes: List[float] = None, 
                                days_ahead: int = 7) -> Tuple[np.ndarray, np.ndarray]:
         """Prepara dados para treinamento"""
-        X, y = [], []
-        
         window_size = 30
-        for i in range(window_size, len(prices) - days_ahead):
-            # Features
-            feature_window = prices[i-window_size:i]
-            volume_window = volumes[i-window_size:i] if volumes else None
-            features = self._create_features(feature_window, volume_window)[0]
-            X.append(features)
-            
-            # Target (preço futuro)
-            future_price = prices[i + days_ahead - 1]
-            y.append(future_price)
+        n_samples = len(prices) - days_ahead - window_size
+        if n_samples <= 0:
+            return np.empty((0, 10), dtype=self.feature_dtype), np.empty(0)
+        
+        # Features de cada janela e preço futuro correspondente
+        X = self.build_feature_matrix(prices, volumes, window_size)[:n_samples]
+        first_target = window_size + days_ahead - 1
+        y = np.asarray(prices, dtype=np.float64)[first_target:first_target + n_samples]
         
-        return np.array(X), np.array(y)
+        return X, y
     
-    def train_model(self, coin_id: str, days_ahead: int = 7) -> Dict:
-        """Treina o modelo para uma criptomoeda específica"""
+    def train_model(self, coin_id: str, days_ahead: int = 7, offline: bool = False) -> Dict:
+        """Treina o modelo para uma criptomoeda específica
+        
+        Com `offline=True` o histórico é lido só do armazenamento local, que
+        quem chama deve ter sincronizado antes (é o caso dos jobs de treino).
+        O resultado inclui em `timings` a duração (segundos) de cada etapa.
+        """
+        # O scikit-learn só é importado no treino: a inferência usa `CompactForest`
+        from sklearn.ensemble import RandomForestRegressor
+        from sklearn.metrics import mean_absolute_error, mean_squared_error
+        from sklearn.model_selection import train_test_split
+        
+        timings = {}
         # Buscar dados históricos
-        historical_data = coin_gecko.get_historical_data(coin_id, days=90)
+        with stage("ml_engine", "history") as timer:
+            if offline:
+                series = coin_gecko.get_stored_series(coin_id, days=TRAINING_HISTORY_DAYS)
+            else:
+                series = coin_gecko.get_historical_series(coin_id, days=TRAINING_HISTORY_DAYS)
+        timings["history"] = timer.elapsed
         
-        if len(historical_data) < 50:
+        if len(series) < 50:
             raise ValueError(f"Dados insuficientes para treinar modelo: {coin_id}")
         
-        prices = [item["price"] for item in historical_data]
-        volumes = [item.get("volume", 0) for item in historical_data]
-        
         # Preparar dados
-        X, y = self._prepare_training_data(prices, volumes, days_ahead)
+        with stage("ml_engine", "training_features") as timer:
+            X, y = self._prepare_training_data(series.prices, series.volumes, days_ahead)
+        timings["training_features"] = timer.elapsed
         
         if len(X) < 10:
             raise ValueError("Dados insuficientes para treinamento")
@@ -103,23 +177,31 @@ class MLPredictor:
         )
         
         # Treinar modelo
-        self.model = RandomForestRegressor(
+        model = RandomForestRegressor(
             n_estimators=100,
             max_depth=10,
             random_state=42,
             n_jobs=-1
         )
-        self.model.fit(X_train, y_train)
+        with stage("ml_engine", "fit") as timer:
+            model.fit(X_train, y_train)
+        timings["fit"] = timer.elapsed
         
         # Avaliar modelo
-        y_pred = self.model.predict(X_test)
-        mae = mean_absolute_error(y_test, y_pred)
-        rmse = np.sqrt(mean_squared_error(y_test, y_pred))
+        with stage("ml_engine", "evaluate") as timer:
+            y_pred = model.predict(X_test)
+            mae = mean_absolute_error(y_test, y_pred)
+            rmse = np.sqrt(mean_squared_error(y_test, y_pred))
+        timings["evaluate"] = timer.elapsed
         
-        # Salvar modelo
-        model_path = os.path.join(self.models_dir, f"{coin_id}_{days_ahead}d.pkl")
-        with open(model_path, 'wb') as f:
-            pickle.dump(self.model, f)
+        # Salvar modelo no formato compacto e registrá-lo em memória
+        model_path = self._model_path(coin_id, days_ahead)
+        with stage("ml_engine", "save") as timer:
+            forest = CompactForest.from_estimator(model)
+            forest.save(model_path)
+        timings["save"] = timer.elapsed
+        self.registry.put((coin_id, days_ahead), forest)
+        coin_gecko.cache.invalidate(self._prediction_key(coin_id, days_ahead))
         
         return {
             "coin_id": coin_id,
@@ -128,47 +210,86 @@ class MLPredictor:
             "rmse": round(rmse, 2),
             "training_samples": len(X_train),
             "test_samples": len(X_test),
-            "model_path": model_path
+            "model_path": model_path,
+            "timings": {name: round(elapsed, 4) for name, elapsed in timings.items()}
         }
     
-    def load_model(self, coin_id: str, days_ahead: int = 7) -> bool:
-        """Carrega modelo salvo"""
-        model_path = os.path.join(self.models_dir, f"{coin_id}_{days_ahead}d.pkl")
-        if os.path.exists(model_path):
-            with open(model_path, 'rb') as f:
-                self.model = pickle.load(f)
-            return True
-        return False
-    
-    def predict(self, coin_id: str, days_ahead: int = 7) -> Dict:
-        """Faz predição de preço"""
-        # Tentar carregar modelo existente
-        if not self.load_model(coin_id, days_ahead):
-            # Se não existe, treinar novo modelo
-            self.train_model(coin_id, days_ahead)
-        
-        # Buscar dados recentes
-        historical_data = coin_gecko.get_historical_data(coin_id, days=60)
-        prices = [item["price"] for item in historical_data]
-        volumes = [item.get("volume", 0) for item in historical_data]
-        
-        if len(prices) < 30:
-            raise ValueError(f"Dados insuficientes para predição: {coin_id}")
-        
-        # Criar features
-        features = self._create_features(prices, volumes)
-        
-        # Fazer predição
-        predicted_price = self.model.predict(features)[0]
-        current_price = prices[-1]
+    def _model_path(self, coin_id: str, days_ahead: int) -> str:
+        """Caminho do arquivo do modelo salvo"""
+        return os.path.join(self.models_dir, f"{validate_coin_id(coin_id)}_{days_ahead}d.forest")
+    
+    def _legacy_model_path(self, coin_id: str, days_ahead: int) -> str:
+        """Caminho do modelo salvo com pickle por versões anteriores"""
+        return os.path.join(self.models_dir, f"{validate_coin_id(coin_id)}_{days_ahead}d.pkl")
+    
+    def _read_model(self, coin_id: str, days_ahead: int) -> Optional[CompactForest]:
+        """Lê o modelo salvo do disco (None se não existir)
         
-        # Calcular confiança (baseado na variância das predições das árvores)
-        if hasattr(self.model, 'estimators_'):
-            tree_predictions = np.array([tree.predict(features)[0] for tree in self.model.estimators_])
-            confidence = 1 - (np.std(tree_predictions) / np.mean(tree_predictions)) if np.mean(tree_predictions) > 0 else 0.5
-            confidence = max(0, min(1, confidence))  # Limitar entre 0 e 1
-        else:
-            confidence = 0.7  # Confiança padrão
+        Modelos antigos em pickle são convertidos para o formato compacto
+        na primeira leitura.
+        """
+        model_path = self._model_path(coin_id, days_ahead)
+        if not os.path.exists(model_path):
+            legacy_path = self._legacy_model_path(coin_id, days_ahead)
+            if not os.path.exists(legacy_path):
+                return None
+            with stage("ml_engine", "legacy_convert"), open(legacy_path, 'rb') as f:
+                CompactForest.from_estimator(pickle.load(f)).save(model_path)
+            os.remove(legacy_path)
+        with stage("ml_engine", "model_load"):
+            return CompactForest.load(model_path)
+    
+    @staticmethod
+    def _prediction_key(coin_id: str, days_ahead: int) -> tuple:
+        """Chave da predição no cache compartilhado de requisições"""
+        return ("prediction", coin_id, days_ahead)
+    
+    def invalidate(self, coin_id: str, days_ahead: int):
+        """Descarta o modelo em memória e a predição em cache (após um novo treino)"""
+        self.registry.invalidate((coin_id, days_ahead))
+        coin_gecko.cache.invalidate(self._prediction_key(coin_id, days_ahead))
+    
+    def get_model(self, coin_id: str, days_ahead: int = 7):
+        """Obtém o modelo do registro em memória, carregando do disco se preciso"""
+        return self.registry.get(
+            (coin_id, days_ahead),
+            lambda: self._read_model(coin_id, days_ahead)
+        )
+    
+    def load_model(self, coin_id: str, days_ahead: int = 7) -> bool:
+        """Carrega modelo salvo no registro em memória"""
+        return self.get_model(coin_id, days_ahead) is not None
+    
+    @staticmethod
+    def _tree_predictions(model, features: np.ndarray) -> Optional[np.ndarray]:
+        """Predições de todas as árvores empilhadas em um array (árvores × linhas)"""
+        if isinstance(model, CompactForest):
+            return model.tree_predictions(features)
+        if not hasattr(model, 'estimators_'):
+            return None
+        X = np.ascontiguousarray(features, dtype=np.float32)
+        return np.stack([tree.predict(X, check_input=False) for tree in model.estimators_])
+    
+    @staticmethod
+    def _confidence(tree_predictions: np.ndarray) -> np.ndarray:
+        """Confiança por linha, baseada na dispersão das predições das árvores"""
+        mean = tree_predictions.mean(axis=0)
+        std = tree_predictions.std(axis=0)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            confidence = np.where(mean > 0, 1 - std / mean, 0.5)
+        return np.clip(confidence, 0, 1)  # Limitar entre 0 e 1
+    
+    def _prediction_result(self, coin_id: str, days_ahead: int, model, features: np.ndarray,
+                           current_price: float, prediction_date: str) -> Dict:
+        """Faz a predição de um modelo sobre features já calculadas"""
+        with stage("ml_engine", "predict"):
+            tree_predictions = self._tree_predictions(model, features)
+            if tree_predictions is not None:
+                predicted_price = float(tree_predictions.mean(axis=0)[0])
+                confidence = float(self._confidence(tree_predictions)[0])
+            else:
+                predicted_price = float(model.predict(features)[0])
+                confidence = 0.7  # Confiança padrão
         
         predicted_change = ((predicted_price - current_price) / current_price) * 100
         
@@ -179,13 +300,105 @@ class MLPredictor:
             "predicted_change": round(predicted_change, 2),
             "confidence": round(confidence, 3),
             "days_ahead": days_ahead,
-            "prediction_date": historical_data[-1]["timestamp"],
+            "prediction_date": prediction_date,
             "model_info": {
                 "type": "RandomForestRegressor",
-                "estimators": self.model.n_estimators if hasattr(self.model, 'n_estimators') else 100
+                "estimators": str(model.n_estimators if hasattr(model, "n_estimators") else 100)
             }
         }
+    
+    def _series_features(self, coin_id: str, series: PriceSeries) -> Tuple[np.ndarray, float, str]:
+        """Cria as features de predição a partir de preços e volumes recentes"""
+        if len(series) < 30:
+            raise ValueError(f"Dados insuficientes para predição: {coin_id}")
+        
+        with stage("ml_engine", "features"):
+            features = self._create_features(series.prices, series.volumes)
+        return features, float(series.prices[-1]), isoformat(series.timestamps[-1])
+    
+    def _recent_features(self, coin_id: str) -> Tuple[np.ndarray, float, str]:
+        """Busca os dados recentes e cria as features de predição de uma moeda"""
+        with stage("ml_engine", "history"):
+            series = coin_gecko.get_historical_series(coin_id, days=60)
+        return self._series_features(coin_id, series)
+    
+    def predict(self, coin_id: str, days_ahead: int = 7, train_if_missing: bool = True) -> Dict:
+        """Faz predição de preço
+        
+        Sem modelo salvo, treina um novo na hora ou, com
+        `train_if_missing=False`, levanta `ModelNotTrainedError`. O resultado
+        fica em cache por `PREDICTION_TTL` segundos (o aquecimento o renova).
+        """
+        # Tentar carregar modelo existente
+        model = self.get_model(coin_id, days_ahead)
+        if model is None:
+            if not train_if_missing:
+                raise ModelNotTrainedError(f"Modelo ainda não treinado: {coin_id} ({days_ahead}d)")
+            # Se não existe, treinar novo modelo
+            self.train_model(coin_id, days_ahead)
+            model = self.get_model(coin_id, days_ahead)
+        
+        return coin_gecko.cache.get_or_load(
+            self._prediction_key(coin_id, days_ahead),
+            lambda: self._prediction_result(coin_id, days_ahead, model, *self._recent_features(coin_id)),
+            ttl=PREDICTION_TTL
+        )
+    
+    def predict_series(self, coin_id: str, series: PriceSeries, days_ahead: int = 7) -> Dict:
+        """Faz predição a partir de uma série (timestamp, price, volume) já obtida
+        
+        Levanta `ModelNotTrainedError` se ainda não houver modelo salvo.
+        """
+        model = self.get_model(coin_id, days_ahead)
+        if model is None:
+            raise ModelNotTrainedError(f"Modelo ainda não treinado: {coin_id} ({days_ahead}d)")
+        
+        features, current_price, prediction_date = self._series_features(coin_id, series)
+        return self._prediction_result(
+            coin_id, days_ahead, model, features, current_price, prediction_date
+        )
+    
+    def predict_many(self, coin_ids: List[str], horizons: List[int]) -> Tuple[List[Dict], List[Tuple[str, int]], Dict[str, str]]:
+        """Predições de várias moedas e horizontes
+        
+        As features de cada moeda são calculadas uma única vez e reutilizadas
+        em todos os horizontes. As predições são gravadas no cache lido por
+        `predict`. Retorna as predições, os pares (coin_id, days_ahead) sem
+        modelo treinado e os erros por moeda.
+        """
+        predictions = []
+        missing = []
+        errors = {}
+        for coin_id in coin_ids:
+            try:
+                features, current_price, prediction_date = self._recent_features(coin_id)
+            except Exception as e:
+                errors[coin_id] = str(e)
+                continue
+            
+            for days_ahead in horizons:
+                model = self.get_model(coin_id, days_ahead)
+                if model is None:
+                    missing.append((coin_id, days_ahead))
+                    continue
+                prediction = self._prediction_result(
+                    coin_id, days_ahead, model, features, current_price, prediction_date
+                )
+                coin_gecko.cache.set(self._prediction_key(coin_id, days_ahead), prediction, ttl=PREDICTION_TTL)
+                predictions.append(prediction)
+        
+        return predictions, missing, errors
 
 # Instância global do preditor
 ml_predictor = MLPredictor()
 
+# Contadores do registro de modelos lidos a cada coleta de `/metrics`
+metrics.callback("cryptoanalytics_model_registry_hits_total", "Modelos encontrados em memória",
+                 lambda: ml_predictor.registry.hits, kind="counter")
+metrics.callback("cryptoanalytics_model_registry_misses_total", "Modelos buscados no disco",
+                 lambda: ml_predictor.registry.misses, kind="counter")
+metrics.callback("cryptoanalytics_model_registry_evictions_total", "Modelos despejados da memória",
+                 lambda: ml_predictor.registry.evictions, kind="counter")
+metrics.callback("cryptoanalytics_model_registry_bytes", "Memória estimada dos modelos carregados",
+                 lambda: ml_predictor.registry.total_bytes)
+
@@ -0,0 +1,174 @@
+"""
+Registro em memória de modelos treinados, com despejo LRU por orçamento de memória
+"""
+
+import pickle
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional
+
+from app.cache import Flight
+
+
+def estimate_model_size(model: Any) -> int:
+    """Estima a memória ocupada por um modelo, em bytes"""
+    estimators = getattr(model, "estimators_", None)
+    if estimators is not None:
+        total = 0
+        for estimator in estimators:
+            tree = estimator.tree_
+            total += tree.__getstate__()["nodes"].nbytes + tree.value.nbytes
+        return total
+    nbytes = getattr(model, "nbytes", None)
+    if nbytes is not None:
+        return int(nbytes)
+    return len(pickle.dumps(model))
+
+
+class _Entry:
+    """Modelo carregado e seus contadores"""
+
+    def __init__(self, model: Any, size: int):
+        self.model = model
+        self.size = size
+        self.hits = 0
+        self.loads = 1
+
+
+class ModelRegistry:
+    """Modelos desserializados mantidos em memória, chaveados por (coin_id, days_ahead)
+
+    Thread-safe: carregamentos concorrentes do mesmo modelo são coalescidos
+    em uma única leitura do disco. Cada chave tem uma geração, incrementada
+    por `invalidate` e `put`; um carregamento que termina depois disso não
+    volta a registrar o modelo antigo. Quando a soma dos tamanhos passa de
+    `memory_budget` bytes, os modelos usados há mais tempo são descartados.
+    """
+
+    def __init__(self, memory_budget: int = 256 * 1024 * 1024):
+        self.memory_budget = memory_budget
+        self._entries: "OrderedDict[Hashable, _Entry]" = OrderedDict()
+        self._inflight: Dict[Hashable, Flight] = {}
+        self._generations: Dict[Hashable, int] = {}
+        self._lock = threading.Lock()
+        self.total_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.evictions = 0
+
+    def _insert(self, key: Hashable, model: Any, size: int):
+        """Insere um modelo e aplica o despejo LRU (chamar com o lock adquirido)"""
+        previous = self._entries.pop(key, None)
+        entry = _Entry(model, size)
+        if previous is not None:
+            self.total_bytes -= previous.size
+            entry.hits = previous.hits
+            entry.loads = previous.loads + 1
+        self._entries[key] = entry
+        self.total_bytes += size
+
+        # Sempre mantém ao menos o modelo recém-inserido
+        while self.total_bytes > self.memory_budget and len(self._entries) > 1:
+            _, evicted = self._entries.popitem(last=False)
+            self.total_bytes -= evicted.size
+            self.evictions += 1
+
+    def get(self, key: Hashable, loader: Callable[[], Any]) -> Optional[Any]:
+        """Obtém o modelo da memória ou o carrega com `loader` (uma vez por chave)
+
+        `loader` retorna None quando o modelo não existe; nesse caso nada é
+        registrado e None é retornado.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                entry.hits += 1
+                self.hits += 1
+                return entry.model
+
+            flight = self._inflight.get(key)
+            leader = flight is None
+            if not leader:
+                self.coalesced += 1
+            else:
+                self.misses += 1
+                flight = self._inflight[key] = Flight()
+                generation = self._generations.get(key, 0)
+
+        if not leader:
+            return flight.wait()
+
+        try:
+            model = loader()
+        except BaseException as e:
+            self._land(key, flight)
+            flight.finish(error=e)
+            raise
+        size = estimate_model_size(model) if model is not None else 0
+        with self._lock:
+            # Invalidado durante a leitura: o modelo lido pode ser o antigo
+            if model is not None and self._generations.get(key, 0) == generation:
+                self._insert(key, model, size)
+        self._land(key, flight)
+        flight.finish(model)
+        return model
+
+    def _land(self, key: Hashable, flight: Flight):
+        """Encerra o carregamento em andamento da chave, se ainda for o atual"""
+        with self._lock:
+            if self._inflight.get(key) is flight:
+                del self._inflight[key]
+
+    def _bump(self, key: Hashable):
+        """Nova geração da chave (chamar com o lock adquirido)"""
+        self._generations[key] = self._generations.get(key, 0) + 1
+        # Quem pedir a partir de agora não deve esperar pelo carregamento antigo
+        self._inflight.pop(key, None)
+
+    def put(self, key: Hashable, model: Any, size: Optional[int] = None):
+        """Registra (ou substitui) um modelo, por exemplo logo após o treino"""
+        size = estimate_model_size(model) if size is None else size
+        with self._lock:
+            self._bump(key)
+            self._insert(key, model, size)
+
+    def invalidate(self, key: Hashable):
+        """Remove um modelo da memória (e descarta leituras do disco em andamento)"""
+        with self._lock:
+            self._bump(key)
+            entry = self._entries.pop(key, None)
+            if entry is not None:
+                self.total_bytes -= entry.size
+
+    def __contains__(self, key: Hashable) -> bool:
+        with self._lock:
+            return key in self._entries
+
+    def stats(self) -> Dict:
+        """Retorna tamanho e taxa de acerto por modelo e totais do registro"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            models = []
+            for key, entry in reversed(self._entries.items()):
+                coin_id, days_ahead = key
+                requests = entry.hits + entry.loads
+                models.append({
+                    "coin_id": coin_id,
+                    "days_ahead": days_ahead,
+                    "size_bytes": entry.size,
+                    "hits": entry.hits,
+                    "loads": entry.loads,
+                    "hit_rate": round(entry.hits / requests, 4)
+                })
+            return {
+                "models": models,
+                "total_bytes": self.total_bytes,
+                "memory_budget": self.memory_budget,
+                "hits": self.hits,
+                "misses": self.misses,
+                "coalesced": self.coalesced,
+                "evictions": self.evictions,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0
+            }
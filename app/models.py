@@ -3,8 +3,12 @@ Modelos Pydantic para validação de dados
 """
 
 from pydantic import BaseModel, Field
-from typing import List, Optional, Dict
+from typing import Annotated, Any, List, Optional, Dict
 from datetime import datetime
+from app.timeseries_store import COIN_ID_MAX_LENGTH, COIN_ID_PATTERN
+
+# ID de criptomoeda da CoinGecko (letras minúsculas, dígitos e hífens)
+CoinId = Annotated[str, Field(pattern=COIN_ID_PATTERN, max_length=COIN_ID_MAX_LENGTH)]
 
 class CryptoInfo(BaseModel):
     """Informações básicas de uma criptomoeda"""
@@ -42,6 +46,39 @@ class PredictionResponse(BaseModel):
     prediction_date: str
     model_info: Dict[str, str] = Field(..., description="Informações do modelo")
 
+class TrainingJob(BaseModel):
+    """Job em segundo plano (treinamento de modelo ou backtest)"""
+    id: str
+    kind: str = Field("training", description="training ou backtest")
+    coin_id: Optional[str] = Field(None, description="Moeda do treino")
+    days_ahead: Optional[int] = Field(None, description="Horizonte do treino")
+    params: Optional[Dict] = Field(None, description="Parâmetros do backtest")
+    status: str = Field(..., description="queued, running, completed, failed ou cancelled")
+    submitted_at: str
+    finished_at: Optional[str] = None
+    result: Optional[Dict] = Field(None, description="Métricas do treino ou resultado do backtest concluído")
+    error: Optional[str] = None
+
+class TrainingJobResponse(BaseModel):
+    """Resposta de requisição atendida por um job de treinamento"""
+    status: str = Field(..., description="Situação do pedido")
+    job: TrainingJob
+    status_url: str = Field(..., description="URL para acompanhar o job")
+
+class BatchPredictionRequest(BaseModel):
+    """Requisição de predições em lote"""
+    coin_ids: List[CoinId] = Field(..., min_length=1, max_length=100, description="IDs das criptomoedas")
+    horizons: List[Annotated[int, Field(ge=1, le=30)]] = Field(
+        [7], min_length=1, max_length=30, description="Números de dias à frente"
+    )
+
+class BatchPredictionResponse(BaseModel):
+    """Resultado das predições em lote"""
+    total: int
+    predictions: List[PredictionResponse]
+    training: List[TrainingJob] = Field(default_factory=list, description="Jobs de modelos ainda não treinados")
+    errors: Dict[str, str] = Field(default_factory=dict, description="Erros por criptomoeda")
+
 class TechnicalAnalysis(BaseModel):
     """Análise técnica de uma criptomoeda"""
     coin_id: str
@@ -56,10 +93,83 @@ class TechnicalAnalysis(BaseModel):
     resistance_level: float = Field(..., description="Nível de resistência")
     trend: str = Field(..., description="Tendência (alta/baixa/lateral)")
 
+class DashboardResponse(BaseModel):
+    """Dados de uma criptomoeda para o dashboard, em uma única resposta"""
+    coin_id: str
+    info: CryptoInfo
+    analysis: Optional[TechnicalAnalysis] = None
+    prediction: Optional[PredictionResponse] = None
+    training: Optional[TrainingJobResponse] = Field(None, description="Job de treino quando ainda não há modelo")
+    historical: Optional[HistoricalData] = None
+    errors: Dict[str, str] = Field(default_factory=dict, description="Erros por seção")
+
+class BatchAnalysisRequest(BaseModel):
+    """Requisição de análise técnica em lote"""
+    coin_ids: List[CoinId] = Field(..., min_length=1, max_length=250, description="IDs das criptomoedas")
+    days: int = Field(60, ge=1, le=365, description="Número de dias de histórico")
+
+class BatchAnalysisResponse(BaseModel):
+    """Resultado da análise técnica em lote"""
+    total: int
+    results: List[TechnicalAnalysis]
+    errors: Dict[str, str] = Field(default_factory=dict, description="Erros por criptomoeda")
+
+class BacktestRequest(BaseModel):
+    """Requisição de backtest sobre o histórico armazenado"""
+    coin_ids: List[CoinId] = Field(..., min_length=1, max_length=100, description="IDs das criptomoedas")
+    granularity: str = Field("daily", pattern="^(daily|hourly)$", description="Granularidade das barras")
+    days: Optional[int] = Field(None, ge=2, description="Últimos N dias do histórico (padrão: todo)")
+    horizons: List[Annotated[int, Field(ge=1, le=30)]] = Field(
+        default_factory=list, max_length=5, description="Horizontes de ML em dias (vazio: só sinais)"
+    )
+    train_days: float = Field(90, gt=0, description="Janela de treino do walk-forward, em dias")
+    retrain_days: float = Field(7, gt=0, description="Intervalo entre retreinos, em dias")
+    sync: bool = Field(False, description="Atualiza as séries pela API antes do backtest")
+
+class StrategyStats(BaseModel):
+    """Desempenho de uma estratégia comprada/fora"""
+    total_return: float = Field(..., description="Retorno da estratégia (%)")
+    buy_and_hold_return: float = Field(..., description="Retorno de comprar e manter (%)")
+    max_drawdown: float = Field(..., description="Maior queda a partir de um pico (%)")
+    trades: int
+    hit_rate: Optional[float] = Field(None, description="Fração das operações com lucro")
+    exposure: float = Field(..., description="Fração das barras com posição")
+
+class MLBacktest(StrategyStats):
+    """Desempenho walk-forward do modelo de ML em um horizonte"""
+    days_ahead: int
+    predictions: int
+    retrains: int
+    mae: Optional[float] = None
+    direction_hit_rate: Optional[float] = Field(None, description="Fração das predições com a direção certa")
+
+class CoinBacktest(BaseModel):
+    """Resultado do backtest de uma criptomoeda"""
+    coin_id: str
+    bars: int
+    start: str
+    end: str
+    signals: StrategyStats
+    ml: List[MLBacktest] = Field(default_factory=list)
+
+class BacktestResponse(BaseModel):
+    """Resultado do backtest"""
+    total: int
+    granularity: str
+    duration: float
+    results: List[CoinBacktest]
+    errors: Dict[str, str] = Field(default_factory=dict, description="Erros por criptomoeda")
+
 class CryptoListResponse(BaseModel):
     """Lista de criptomoedas disponíveis"""
     total: int
-    cryptos: List[Dict[str, str]]
+    cryptos: List[Dict[str, Any]]
+
+class CryptoInfoListResponse(BaseModel):
+    """Dados de mercado de várias criptomoedas"""
+    total: int
+    cryptos: List[CryptoInfo]
+    missing: List[str] = Field(default_factory=list, description="IDs não encontrados")
 
 class ErrorResponse(BaseModel):
     """Resposta de erro"""
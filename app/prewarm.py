@@ -0,0 +1,181 @@
+"""
+Aquecimento periódico de dados, análises e predições das principais criptomoedas
+"""
+
+import asyncio
+import logging
+import os
+import time
+from typing import Dict, List, Optional, Sequence
+
+from app.data_fetcher import CoinGeckoAPI, AsyncCoinGeckoAPI, async_coin_gecko
+from app.jobs import TrainingJobManager, training_jobs
+from app.ml_engine import MLPredictor, ml_predictor
+from app.profiling import run_in_threadpool
+from app.rate_limiter import BACKGROUND, upstream_priority
+from app.technical_analysis import TechnicalAnalyzer, analyzer
+from app.timeseries_store import granularity_for
+
+logger = logging.getLogger(__name__)
+
+
+def _env_list(name: str, default: str) -> List[str]:
+    return [item.strip() for item in os.getenv(name, default).split(",") if item.strip()]
+
+
+class PrewarmScheduler:
+    """Mantém aquecidas as top-N moedas em segundo plano
+
+    A cada `interval` segundos: atualiza a lista das top-N (mais as moedas
+    fixas de `extra_coins`), sincroniza as séries históricas usadas pelo
+    dashboard, atualiza o estado incremental da análise técnica, renova as
+    predições em cache lidas por `/predict` (carregando os modelos no
+    registro) e enfileira o treino dos que faltam. Cada ciclo faz
+    no máximo `request_budget` requisições à API externa; as moedas são
+    processadas por ordem de ranking até o orçamento acabar.
+    """
+
+    def __init__(self, client: AsyncCoinGeckoAPI, analyzer: TechnicalAnalyzer,
+                 predictor: MLPredictor, jobs: TrainingJobManager,
+                 top_n: int = 20, interval: float = 300, request_budget: int = 30,
+                 history_days: Sequence[int] = (60, 30), horizons: Sequence[int] = (7,),
+                 extra_coins: Sequence[str] = (), train_missing: bool = True):
+        self.client = client
+        self.analyzer = analyzer
+        self.predictor = predictor
+        self.jobs = jobs
+        self.top_n = top_n
+        self.interval = interval
+        self.request_budget = request_budget
+        self.history_days = list(history_days)
+        self.horizons = list(horizons)
+        self.extra_coins = list(extra_coins)
+        self.train_missing = train_missing
+        self._task: Optional[asyncio.Task] = None
+        self.runs = 0
+        self.last_run: Optional[Dict] = None
+
+    def _sync_cost(self, coin_id: str, days: int) -> int:
+        """Requisições externas necessárias para atualizar uma série (0 ou 1)"""
+        plan = self.client.store.plan_sync(
+            coin_id, granularity_for(days), days,
+            max_age=CoinGeckoAPI._cache_ttl("market_chart")
+        )
+        return 0 if plan is None else 1
+
+    async def run_once(self) -> Dict:
+        """Executa um ciclo de aquecimento e retorna o seu resumo"""
+        started = time.time()
+        budget = self.request_budget
+        warmed: List[str] = []
+        skipped: List[str] = []
+        errors: Dict[str, str] = {}
+        training = 0
+
+        coin_ids = list(self.extra_coins)
+        if budget > 0:
+            budget -= 1
+            try:
+                top = await self.client.get_top_cryptos(limit=self.top_n)
+                coin_ids += [crypto["id"] for crypto in top]
+            except Exception as e:
+                errors["top_cryptos"] = str(e)
+        coin_ids = list(dict.fromkeys(coin_ids))
+
+        # Séries e análise técnica, por ordem de ranking
+        for position, coin_id in enumerate(coin_ids):
+            cost = sum(self._sync_cost(coin_id, days) for days in self.history_days)
+            if cost > budget:
+                skipped = coin_ids[position:]
+                break
+            budget -= cost
+            try:
+                for days in self.history_days:
+                    series = await self.client.get_historical_series(coin_id, days=days)
+                    # Janela usada por /analysis
+                    if days == 60:
+                        self.analyzer.analyze_incremental(coin_id, series)
+                warmed.append(coin_id)
+            except Exception as e:
+                errors[coin_id] = str(e)
+
+        # Predições em cache; os modelos que faltam vão para a fila de treino
+        predicted = 0
+        if warmed and self.horizons:
+            predictions, missing, prediction_errors = await run_in_threadpool(
+                self.predictor.predict_many, warmed, self.horizons
+            )
+            predicted = len(predictions)
+            errors.update(prediction_errors)
+            if self.train_missing:
+                for coin_id, days_ahead in missing:
+                    if budget <= 0:
+                        break
+                    budget -= 1
+                    self.jobs.submit(coin_id, days_ahead)
+                    training += 1
+
+        self.runs += 1
+        self.last_run = {
+            "started_at": started,
+            "duration": round(time.time() - started, 3),
+            "coins": warmed,
+            "skipped": skipped,
+            "predictions": predicted,
+            "training_submitted": training,
+            "requests_used": self.request_budget - budget,
+            "errors": errors
+        }
+        return self.last_run
+
+    async def _loop(self):
+        # As requisições do aquecimento cedem a vez às dos usuários
+        with upstream_priority(BACKGROUND):
+            while True:
+                try:
+                    await self.run_once()
+                except Exception:
+                    logger.exception("Falha no ciclo de aquecimento")
+                await asyncio.sleep(self.interval)
+
+    def start(self):
+        """Inicia o agendador no event loop atual"""
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._loop())
+
+    async def stop(self):
+        """Interrompe o agendador"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def stats(self) -> Dict:
+        """Configuração e resumo do último ciclo"""
+        return {
+            "running": self._task is not None and not self._task.done(),
+            "top_n": self.top_n,
+            "interval": self.interval,
+            "request_budget": self.request_budget,
+            "runs": self.runs,
+            "last_run": self.last_run
+        }
+
+
+# Instância global do agendador
+prewarmer = PrewarmScheduler(
+    client=async_coin_gecko,
+    analyzer=analyzer,
+    predictor=ml_predictor,
+    jobs=training_jobs,
+    top_n=int(os.getenv("PREWARM_TOP_N", 20)),
+    interval=float(os.getenv("PREWARM_INTERVAL", 300)),
+    request_budget=int(os.getenv("PREWARM_REQUEST_BUDGET", 30)),
+    history_days=[int(days) for days in _env_list("PREWARM_HISTORY_DAYS", "60,30")],
+    horizons=[int(days) for days in _env_list("PREWARM_HORIZONS", "7")],
+    extra_coins=_env_list("PREWARM_COINS", ""),
+    train_missing=os.getenv("PREWARM_TRAIN", "true").lower() == "true"
+)
@@ -0,0 +1,104 @@
+"""
+Série de preços em colunas NumPy contíguas (timestamp, preço, volume)
+"""
+
+from datetime import datetime
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from app.downsampling import lttb_indices
+from app.timeseries_store import SERIES_DTYPE, points_from_market_chart
+
+
+def isoformat(timestamp_ms: int) -> str:
+    """Timestamp em milissegundos no formato ISO usado pela API"""
+    return datetime.fromtimestamp(int(timestamp_ms) / 1000).isoformat()
+
+
+class PriceSeries:
+    """Série histórica de uma moeda em três arrays alinhados
+
+    `timestamps` (int64, epoch em ms), `prices` e `volumes` (float64) são
+    contíguos e podem ser passados diretamente ao NumPy, sem cópias. Fatias
+    (`series[a:b]`, `since`) são views das mesmas colunas. As séries vindas
+    do cache são somente leitura, pois são compartilhadas entre requisições.
+    Timestamps só viram texto ISO na borda da API (`to_points`).
+    """
+
+    __slots__ = ("timestamps", "prices", "volumes")
+
+    def __init__(self, timestamps: np.ndarray, prices: np.ndarray,
+                 volumes: Optional[np.ndarray] = None):
+        self.timestamps = np.ascontiguousarray(timestamps, dtype=np.int64)
+        self.prices = np.ascontiguousarray(prices, dtype=np.float64)
+        if volumes is None:
+            volumes = np.zeros(len(self.prices))
+        self.volumes = np.ascontiguousarray(volumes, dtype=np.float64)
+        if not len(self.timestamps) == len(self.prices) == len(self.volumes):
+            raise ValueError("Colunas da série com tamanhos diferentes")
+
+    @classmethod
+    def empty(cls) -> "PriceSeries":
+        return cls(np.empty(0, dtype=np.int64), np.empty(0))
+
+    @classmethod
+    def from_records(cls, records: np.ndarray) -> "PriceSeries":
+        """Cria a série a partir de um array estruturado (`SERIES_DTYPE`)
+
+        Copia cada campo uma única vez para uma coluna contígua própria, que
+        fica somente leitura.
+        """
+        series = cls(
+            np.array(records["timestamp"], dtype=np.int64),
+            np.array(records["price"], dtype=np.float64),
+            np.array(records["volume"], dtype=np.float64)
+        )
+        for column in (series.timestamps, series.prices, series.volumes):
+            column.flags.writeable = False
+        return series
+
+    @classmethod
+    def from_market_chart(cls, data: Dict) -> "PriceSeries":
+        """Cria a série a partir da resposta JSON de `market_chart`"""
+        return cls.from_records(points_from_market_chart(data))
+
+    def to_records(self) -> np.ndarray:
+        """Array estruturado (`SERIES_DTYPE`) com os mesmos pontos"""
+        records = np.empty(len(self), dtype=SERIES_DTYPE)
+        records["timestamp"] = self.timestamps
+        records["price"] = self.prices
+        records["volume"] = self.volumes
+        return records
+
+    def __len__(self) -> int:
+        return len(self.timestamps)
+
+    def __getitem__(self, key) -> "PriceSeries":
+        """Fatia, máscara ou índices aplicados às três colunas"""
+        if isinstance(key, (int, np.integer)):
+            key = slice(key, key + 1 or None)
+        return PriceSeries(self.timestamps[key], self.prices[key], self.volumes[key])
+
+    def since(self, timestamp_ms: int) -> "PriceSeries":
+        """Pontos a partir de `timestamp_ms` (view, sem cópia)"""
+        start = int(np.searchsorted(self.timestamps, timestamp_ms, side="left"))
+        return self[start:]
+
+    def downsample(self, max_points: int) -> "PriceSeries":
+        """Reduz a série a `max_points` pontos com LTTB"""
+        if len(self) <= max_points:
+            return self
+        return self[lttb_indices(self.timestamps, self.prices, max_points)]
+
+    def isoformat_timestamps(self) -> List[str]:
+        return [isoformat(ts) for ts in self.timestamps.tolist()]
+
+    def to_points(self) -> List[Dict]:
+        """Lista de pontos `{timestamp ISO, price, volume}` para respostas da API"""
+        return [
+            {"timestamp": timestamp, "price": price, "volume": volume}
+            for timestamp, price, volume in zip(
+                self.isoformat_timestamps(), self.prices.tolist(), self.volumes.tolist()
+            )
+        ]
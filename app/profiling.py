@@ -0,0 +1,317 @@
+"""
+Perfil por amostragem de requisições individuais, gravado no formato do speedscope
+"""
+
+import asyncio
+import contextvars
+import glob
+import hmac
+import json
+import os
+import re
+import sys
+import threading
+import time
+import uuid
+import weakref
+from datetime import datetime
+from typing import Callable, Dict, List, Optional
+from urllib.parse import parse_qs
+
+from fastapi.concurrency import run_in_threadpool as _run_in_threadpool
+
+SPEEDSCOPE_SCHEMA = "https://www.speedscope.app/file-format-schema.json"
+PROFILE_SUFFIX = ".speedscope.json"
+# Quadro usado quando nenhuma tarefa da requisição está rodando no event loop
+WAITING_FRAME = ("(aguardando: I/O, outras tarefas ou threads)", "", 0)
+
+# Token de administrador exigido para perfilar sob demanda e baixar os perfis
+PROFILE_TOKEN = os.getenv("PROFILE_TOKEN") or None
+
+_current: contextvars.ContextVar = contextvars.ContextVar("request_profile", default=None)
+
+
+def authorized(supplied: Optional[str], token: Optional[str] = PROFILE_TOKEN) -> bool:
+    """Confere o token de administrador (sempre falso se nenhum estiver configurado)"""
+    return bool(token) and supplied is not None and hmac.compare_digest(supplied, token)
+
+
+class RequestProfile:
+    """Amostrador de uma requisição: pilhas do event loop e das threads a seu serviço
+
+    Uma thread de amostragem lê as pilhas a cada `interval` segundos. No
+    event loop, entram só as amostras em que a tarefa em execução é da
+    requisição (ou criada por ela); nos demais instantes registra-se
+    `WAITING_FRAME`, de modo que o perfil cobre o tempo total. Threads entram
+    enquanto executam trabalho da requisição via `run_in_threadpool`.
+    """
+
+    def __init__(self, name: str, interval: float = 0.001):
+        self.name = name
+        self.interval = interval
+        self.loop = asyncio.get_running_loop()
+        self.loop_thread = threading.get_ident()
+        self.tasks: "weakref.WeakSet[asyncio.Task]" = weakref.WeakSet()
+        # Threads trabalhando agora para a requisição, e o nome de todas que já trabalharam
+        self.threads: Dict[int, str] = {}
+        self.thread_names: Dict[int, str] = {}
+        self._frames: List[tuple] = []
+        self._frame_index: Dict[tuple, int] = {}
+        # Por thread: [(pilha como tupla de índices, peso em ms)], em ordem de tempo
+        self._samples: Dict[int, List[list]] = {}
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.started = 0.0
+        self.finished = 0.0
+
+    def _frame_id(self, key: tuple) -> int:
+        index = self._frame_index.get(key)
+        if index is None:
+            index = self._frame_index[key] = len(self._frames)
+            self._frames.append(key)
+        return index
+
+    def _stack(self, frame) -> tuple:
+        """Índices dos quadros da pilha, da base para o topo"""
+        stack = []
+        while frame is not None:
+            code = frame.f_code
+            # `co_qualname` (com a classe) só existe a partir do Python 3.11
+            name = getattr(code, "co_qualname", code.co_name)
+            stack.append(self._frame_id((name, code.co_filename, code.co_firstlineno)))
+            frame = frame.f_back
+        stack.reverse()
+        return tuple(stack)
+
+    def _record(self, thread_id: int, stack: tuple, weight: float):
+        samples = self._samples.setdefault(thread_id, [])
+        # Amostras seguidas com a mesma pilha viram uma só, com o peso somado
+        if samples and samples[-1][0] == stack:
+            samples[-1][1] += weight
+        else:
+            samples.append([stack, weight])
+
+    def _sample(self, weight: float):
+        frames = sys._current_frames()
+        task = asyncio.current_task(self.loop)
+        if task is not None and task in self.tasks and self.loop_thread in frames:
+            stack = self._stack(frames[self.loop_thread])
+        else:
+            stack = (self._frame_id(WAITING_FRAME),)
+        self._record(self.loop_thread, stack, weight)
+        for thread_id in list(self.threads):
+            frame = frames.get(thread_id)
+            if frame is not None:
+                self._record(thread_id, self._stack(frame), weight)
+
+    def _run(self):
+        last = time.perf_counter()
+        while not self._stop.wait(self.interval):
+            now = time.perf_counter()
+            self._sample((now - last) * 1000)
+            last = now
+
+    def start(self):
+        self.tasks.add(asyncio.current_task())
+        self.started = time.perf_counter()
+        self._thread = threading.Thread(target=self._run, name="request-profiler", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        self.finished = time.perf_counter()
+
+    def speedscope(self) -> Dict:
+        """Perfil no formato de arquivo do speedscope (um perfil por thread)"""
+        profiles = []
+        for thread_id, samples in self._samples.items():
+            label = "event loop" if thread_id == self.loop_thread else self.thread_names.get(thread_id, str(thread_id))
+            weights = [round(weight, 3) for _, weight in samples]
+            profiles.append({
+                "type": "sampled",
+                "name": f"{self.name} [{label}]",
+                "unit": "milliseconds",
+                "startValue": 0,
+                "endValue": round(sum(weights), 3),
+                "samples": [list(stack) for stack, _ in samples],
+                "weights": weights
+            })
+        return {
+            "$schema": SPEEDSCOPE_SCHEMA,
+            "name": self.name,
+            "activeProfileIndex": 0,
+            "exporter": "cryptoanalytics-profiler",
+            "shared": {"frames": [
+                {"name": name, "file": file, "line": line} for name, file, line in self._frames
+            ]},
+            "profiles": profiles
+        }
+
+
+def _task_factory(previous: Optional[Callable]):
+    """Fábrica de tarefas que associa ao perfil ativo as tarefas criadas durante ele"""
+    def factory(loop, coro, **kwargs):
+        if previous is not None:
+            task = previous(loop, coro, **kwargs)
+        else:
+            task = asyncio.Task(coro, loop=loop, **kwargs)
+        profile = _current.get()
+        if profile is not None:
+            profile.tasks.add(task)
+        return task
+    factory.profiling = True
+    return factory
+
+
+def _install_task_factory(loop: asyncio.AbstractEventLoop):
+    current = loop.get_task_factory()
+    if not getattr(current, "profiling", False):
+        loop.set_task_factory(_task_factory(current))
+
+
+async def run_in_threadpool(func: Callable, *args, **kwargs):
+    """`run_in_threadpool` do FastAPI, incluindo a thread no perfil ativo da requisição"""
+    profile = _current.get()
+    if profile is None:
+        return await _run_in_threadpool(func, *args, **kwargs)
+
+    def call():
+        thread = threading.current_thread()
+        profile.threads[thread.ident] = profile.thread_names[thread.ident] = thread.name
+        try:
+            return func(*args, **kwargs)
+        finally:
+            profile.threads.pop(thread.ident, None)
+
+    return await _run_in_threadpool(call)
+
+
+class ProfileStore:
+    """Diretório de perfis com rotação: mantém apenas os `max_files` mais recentes"""
+
+    def __init__(self, directory: str, max_files: int = 100):
+        self.directory = directory
+        self.max_files = max_files
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def profile_name(method: str, path: str) -> str:
+        slug = re.sub(r"[^A-Za-z0-9]+", "-", path).strip("-")[:60] or "root"
+        return f"{datetime.now():%Y%m%d-%H%M%S}-{method.lower()}-{slug}-{uuid.uuid4().hex[:6]}{PROFILE_SUFFIX}"
+
+    def path(self, name: str) -> Optional[str]:
+        """Caminho de um perfil gravado (None se o nome for inválido ou não existir)"""
+        if os.path.basename(name) != name or not name.endswith(PROFILE_SUFFIX):
+            return None
+        path = os.path.join(self.directory, name)
+        return path if os.path.exists(path) else None
+
+    def _files(self) -> List[str]:
+        """Perfis gravados, do mais antigo ao mais recente"""
+        def mtime(path: str) -> float:
+            try:
+                return os.path.getmtime(path)
+            except OSError:  # removido por outro worker durante a listagem
+                return 0.0
+        return sorted(glob.glob(os.path.join(self.directory, f"*{PROFILE_SUFFIX}")), key=mtime)
+
+    def list(self) -> List[Dict]:
+        files = self._files()[::-1]
+        return [{"name": os.path.basename(f), "size": os.path.getsize(f)} for f in files if os.path.exists(f)]
+
+    def save(self, name: str, profile: Dict):
+        os.makedirs(self.directory, exist_ok=True)
+        path = os.path.join(self.directory, name)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(profile, f, separators=(",", ":"))
+        os.replace(tmp_path, path)
+        with self._lock:
+            files = self._files()
+            for old in files[:max(len(files) - self.max_files, 0)]:
+                try:
+                    os.remove(old)
+                except OSError:
+                    pass
+
+
+class ProfilingMiddleware:
+    """Middleware ASGI que perfila requisições de `/api/*` sob demanda ou por amostragem
+
+    - Sob demanda: cabeçalho `X-Profile` ou parâmetro `?profile=` com o token
+      de `PROFILE_TOKEN` (sem token configurado, o modo fica desligado).
+    - Amostragem: com `PROFILE_SAMPLE_EVERY=N`, uma a cada N requisições.
+
+    O perfil vai para `PROFILE_DIR` e o nome do arquivo volta no cabeçalho
+    `X-Profile-File` (baixe com `GET /api/profiles/{nome}`).
+    """
+
+    def __init__(self, app, store: Optional[ProfileStore] = None, token: Optional[str] = None,
+                 sample_every: Optional[int] = None, interval: Optional[float] = None,
+                 prefix: str = "/api"):
+        self.app = app
+        self.store = store if store is not None else profile_store
+        self.token = token if token is not None else PROFILE_TOKEN
+        self.sample_every = sample_every if sample_every is not None else int(
+            os.getenv("PROFILE_SAMPLE_EVERY", 0)
+        )
+        self.interval = interval if interval is not None else float(
+            os.getenv("PROFILE_INTERVAL_MS", 1)
+        ) / 1000
+        self.prefix = prefix
+        self._count = 0
+
+    def _requested(self, scope) -> bool:
+        if not self.token:
+            return False
+        supplied = None
+        for key, value in scope["headers"]:
+            if key == b"x-profile":
+                supplied = value.decode("latin-1")
+                break
+        if supplied is None and b"profile=" in scope.get("query_string", b""):
+            supplied = parse_qs(scope["query_string"].decode("latin-1")).get("profile", [None])[0]
+        return authorized(supplied, self.token)
+
+    def _sampled(self) -> bool:
+        if not self.sample_every:
+            return False
+        self._count += 1
+        return self._count % self.sample_every == 0
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not scope["path"].startswith(self.prefix):
+            await self.app(scope, receive, send)
+            return
+        if not (self._requested(scope) or self._sampled()):
+            await self.app(scope, receive, send)
+            return
+
+        name = self.store.profile_name(scope["method"], scope["path"])
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                message["headers"] = list(message.get("headers", [])) + [
+                    (b"x-profile-file", name.encode("latin-1"))
+                ]
+            await send(message)
+
+        _install_task_factory(asyncio.get_running_loop())
+        profile = RequestProfile(f"{scope['method']} {scope['path']}", self.interval)
+        token = _current.set(profile)
+        profile.start()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            profile.stop()
+            _current.reset(token)
+            await _run_in_threadpool(self.store.save, name, profile.speedscope())
+
+
+# Diretório global de perfis
+profile_store = ProfileStore(
+    os.getenv("PROFILE_DIR", os.path.join(os.getenv("DATA_DIR", "data"), "profiles")),
+    max_files=int(os.getenv("PROFILE_MAX_FILES", 100))
+)
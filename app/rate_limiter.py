@@ -0,0 +1,242 @@
+"""
+Agendador de requisições à API externa com limite de taxa, prioridades e backoff
+"""
+
+import asyncio
+import contextvars
+import random
+import threading
+import time
+from contextlib import contextmanager
+from email.utils import parsedate_to_datetime
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+# Classes de prioridade (menor valor = atendido primeiro)
+INTERACTIVE = 0
+BACKGROUND = 1
+PRIORITY_NAMES = {INTERACTIVE: "interactive", BACKGROUND: "background"}
+
+# Intervalo máximo entre verificações de quem espera por uma ficha
+POLL_INTERVAL = 0.05
+
+_priority: contextvars.ContextVar = contextvars.ContextVar("upstream_priority", default=INTERACTIVE)
+
+
+@contextmanager
+def upstream_priority(level: int):
+    """Define a prioridade das requisições externas feitas dentro do bloco"""
+    token = _priority.set(level)
+    try:
+        yield
+    finally:
+        _priority.reset(token)
+
+
+def current_priority() -> int:
+    return _priority.get()
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Converte o cabeçalho `Retry-After` (segundos ou data HTTP) em segundos"""
+    if not value:
+        return None
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        pass
+    try:
+        return max(parsedate_to_datetime(value).timestamp() - time.time(), 0.0)
+    except (TypeError, ValueError):
+        return None
+
+
+class UpstreamThrottled(Exception):
+    """A API externa respondeu 429 (Too Many Requests)"""
+
+    def __init__(self, retry_after: Optional[float] = None):
+        super().__init__("Limite de requisições da API externa atingido")
+        self.retry_after = retry_after
+
+
+class RateLimitError(Exception):
+    """A requisição não pôde ser feita dentro do limite de taxa da API externa"""
+
+    def __init__(self, message: str, retry_after: float = 1.0):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class RequestScheduler:
+    """Token bucket compartilhado por todas as chamadas à API externa
+
+    Cada chamada consome uma ficha; as fichas são repostas a `rate` por
+    segundo até `burst`. Enquanto houver chamadas interativas esperando,
+    as de segundo plano não recebem fichas. Uma resposta 429 esvazia o
+    balde e pausa todas as chamadas pelo `Retry-After` (ou por um backoff
+    exponencial com jitter), e a chamada é repetida até `max_retries` vezes.
+    Quem esperaria mais que `max_wait[prioridade]`, ou chega com a fila
+    cheia, recebe `RateLimitError` em vez de acumular atraso.
+
+    Funciona tanto em threads (`call`) quanto no event loop (`acall`).
+    """
+
+    def __init__(self, rate: float = 0.5, burst: int = 10, max_queue: int = 100,
+                 max_wait: Optional[Dict[int, float]] = None, max_retries: int = 3,
+                 backoff_base: float = 1.0, backoff_max: float = 60.0):
+        self.rate = rate
+        self.burst = max(1, burst)
+        self.max_queue = max_queue
+        self.max_wait = max_wait or {INTERACTIVE: 10.0, BACKGROUND: 120.0}
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self._tokens = float(burst)
+        self._updated = time.monotonic()
+        self._blocked_until = 0.0
+        self._waiting = {level: 0 for level in PRIORITY_NAMES}
+        self._lock = threading.Lock()
+        self.granted = {level: 0 for level in PRIORITY_NAMES}
+        self.rejected = {level: 0 for level in PRIORITY_NAMES}
+        self.throttled = 0
+        self.retries = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+
+    def _refill(self, now: float):
+        """Repõe as fichas pelo tempo decorrido (chamar com o lock adquirido)"""
+        self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def _try_take(self, level: int) -> float:
+        """Tenta pegar uma ficha; retorna 0 se conseguiu ou o tempo a esperar"""
+        now = time.monotonic()
+        with self._lock:
+            self._refill(now)
+            if now < self._blocked_until:
+                return self._blocked_until - now
+            if any(self._waiting[other] for other in self._waiting if other < level):
+                return POLL_INTERVAL
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return 0.0
+            return (1 - self._tokens) / self.rate
+
+    def _enter(self, level: int):
+        with self._lock:
+            if sum(self._waiting.values()) >= self.max_queue:
+                self.rejected[level] += 1
+                raise RateLimitError(
+                    "Fila de requisições à API externa cheia",
+                    retry_after=max(1.0, 1 / self.rate)
+                )
+            self._waiting[level] += 1
+
+    def _leave(self, level: int, waited: float, granted: bool):
+        with self._lock:
+            self._waiting[level] -= 1
+            if granted:
+                self.granted[level] += 1
+                self.wait_total += waited
+                self.wait_max = max(self.wait_max, waited)
+            else:
+                self.rejected[level] += 1
+
+    def _wait_time(self, level: int, started: float, delay: float) -> float:
+        """Tempo a dormir antes de tentar de novo (`RateLimitError` se passar do prazo)"""
+        if time.monotonic() - started + delay > self.max_wait[level]:
+            raise RateLimitError(
+                "Limite de requisições à API externa atingido; tente novamente em instantes",
+                retry_after=max(1.0, delay)
+            )
+        return min(delay, POLL_INTERVAL * 4)
+
+    def acquire(self):
+        """Aguarda (bloqueando a thread) uma ficha na prioridade do contexto atual"""
+        level = current_priority()
+        started = time.monotonic()
+        self._enter(level)
+        granted = False
+        try:
+            while True:
+                delay = self._try_take(level)
+                if delay == 0:
+                    granted = True
+                    return
+                time.sleep(self._wait_time(level, started, delay))
+        finally:
+            self._leave(level, time.monotonic() - started, granted)
+
+    async def aacquire(self):
+        """Versão assíncrona de `acquire`"""
+        level = current_priority()
+        started = time.monotonic()
+        self._enter(level)
+        granted = False
+        try:
+            while True:
+                delay = self._try_take(level)
+                if delay == 0:
+                    granted = True
+                    return
+                await asyncio.sleep(self._wait_time(level, started, delay))
+        finally:
+            self._leave(level, time.monotonic() - started, granted)
+
+    def _throttled(self, attempt: int, error: UpstreamThrottled) -> float:
+        """Registra um 429 e pausa o balde; retorna a pausa aplicada"""
+        if error.retry_after is not None:
+            delay = error.retry_after
+        else:
+            delay = self.backoff_base * (2 ** attempt) * (1 + random.random())
+        delay = min(delay, self.backoff_max)
+        with self._lock:
+            self.throttled += 1
+            self._tokens = 0.0
+            self._blocked_until = max(self._blocked_until, time.monotonic() + delay)
+        return delay
+
+    def call(self, fn: Callable[[], Any]) -> Any:
+        """Executa `fn` dentro do limite de taxa, repetindo em caso de 429"""
+        for attempt in range(self.max_retries + 1):
+            self.acquire()
+            try:
+                return fn()
+            except UpstreamThrottled as e:
+                delay = self._throttled(attempt, e)
+                if attempt == self.max_retries:
+                    raise RateLimitError(str(e), retry_after=delay)
+                with self._lock:
+                    self.retries += 1
+
+    async def acall(self, fn: Callable[[], Awaitable[Any]]) -> Any:
+        """Versão assíncrona de `call`"""
+        for attempt in range(self.max_retries + 1):
+            await self.aacquire()
+            try:
+                return await fn()
+            except UpstreamThrottled as e:
+                delay = self._throttled(attempt, e)
+                if attempt == self.max_retries:
+                    raise RateLimitError(str(e), retry_after=delay)
+                with self._lock:
+                    self.retries += 1
+
+    def stats(self) -> Dict:
+        """Fichas disponíveis, profundidade da fila e contadores por prioridade"""
+        now = time.monotonic()
+        with self._lock:
+            self._refill(now)
+            granted = sum(self.granted.values())
+            return {
+                "rate_per_second": self.rate,
+                "burst": self.burst,
+                "tokens": round(self._tokens, 3),
+                "blocked_for": round(max(self._blocked_until - now, 0.0), 3),
+                "queue_depth": {PRIORITY_NAMES[level]: count for level, count in self._waiting.items()},
+                "granted": {PRIORITY_NAMES[level]: count for level, count in self.granted.items()},
+                "rejected": {PRIORITY_NAMES[level]: count for level, count in self.rejected.items()},
+                "throttled": self.throttled,
+                "retries": self.retries,
+                "avg_wait": round(self.wait_total / granted, 4) if granted else 0.0,
+                "max_wait": round(self.wait_max, 4)
+            }
@@ -0,0 +1,155 @@
+"""
+Respostas JSON serializadas com orjson, comprimidas e condicionais (ETag/304)
+"""
+
+import gzip
+import hashlib
+from typing import Any, Dict, Optional
+
+import numpy as np
+import orjson
+from fastapi import Request, Response
+
+try:
+    import brotli
+except ImportError:  # brotli é opcional; sem ele, apenas gzip é oferecido
+    brotli = None
+
+try:
+    import pyarrow
+    import pyarrow.ipc
+except ImportError:  # pyarrow é opcional; sem ele, o formato Arrow fica indisponível
+    pyarrow = None
+
+ARROW_AVAILABLE = pyarrow is not None
+ARROW_MEDIA_TYPE = "application/vnd.apache.arrow.stream"
+
+# Corpos menores que isso não compensam a compressão
+MIN_COMPRESS_SIZE = 1024
+
+
+def dumps(content: Any) -> bytes:
+    """Serializa para JSON com orjson (aceita arrays e escalares NumPy)"""
+    return orjson.dumps(content, option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS)
+
+
+def packed_float64(columns: Dict[str, np.ndarray]) -> bytes:
+    """Colunas float64 little-endian gravadas uma após a outra"""
+    return b"".join(np.ascontiguousarray(values, dtype="<f8").tobytes() for values in columns.values())
+
+
+def arrow_ipc(columns: Dict[str, np.ndarray]) -> bytes:
+    """Colunas em uma tabela Arrow serializada no formato IPC stream"""
+    if pyarrow is None:
+        raise RuntimeError("Formato Arrow indisponível: pyarrow não está instalado")
+    table = pyarrow.table({name: np.ascontiguousarray(values) for name, values in columns.items()})
+    sink = pyarrow.BufferOutputStream()
+    with pyarrow.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.getvalue().to_pybytes()
+
+
+def make_etag(*parts: Any) -> str:
+    """ETag fraca derivada de valores que identificam a versão dos dados"""
+    digest = hashlib.blake2b(repr(parts).encode("utf-8"), digest_size=12).hexdigest()
+    return f'W/"{digest}"'
+
+
+def _accepted_encodings(accept_encoding: str) -> Dict[str, float]:
+    """Codificações aceitas pelo cliente e seus pesos (q)"""
+    accepted = {}
+    for item in accept_encoding.split(","):
+        name, _, params = item.strip().partition(";")
+        if not name:
+            continue
+        quality = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        accepted[name.strip().lower()] = quality
+    return accepted
+
+
+def negotiate_encoding(accept_encoding: Optional[str]) -> Optional[str]:
+    """Escolhe `br` ou `gzip` conforme o `Accept-Encoding` do cliente"""
+    accepted = _accepted_encodings(accept_encoding or "")
+    candidates = (["br"] if brotli is not None else []) + ["gzip"]
+    best = max(candidates, key=lambda name: accepted.get(name, accepted.get("*", 0.0)))
+    return best if accepted.get(best, accepted.get("*", 0.0)) > 0 else None
+
+
+def compress(body: bytes, encoding: str) -> bytes:
+    if encoding == "br":
+        return brotli.compress(body, quality=5)
+    return gzip.compress(body, compresslevel=6)
+
+
+def _etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Compara `If-None-Match` com a ETag (comparação fraca, aceita `*`)"""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    opaque = etag[2:] if etag.startswith("W/") else etag
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if candidate == opaque:
+            return True
+    return False
+
+
+def _cache_headers(etag: Optional[str], max_age: int) -> Dict[str, str]:
+    headers = {
+        "Cache-Control": f"public, max-age={max_age}",
+        "Vary": "Accept-Encoding"
+    }
+    if etag is not None:
+        headers["ETag"] = etag
+    return headers
+
+
+def not_modified(request: Request, etag: str, max_age: int = 0) -> Optional[Response]:
+    """Resposta 304 se o cliente já tem a versão `etag`; senão None
+
+    Permite pular a montagem do corpo quando os dados não mudaram.
+    """
+    if _etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=_cache_headers(etag, max_age))
+    return None
+
+
+def encoded_response(request: Request, body: bytes, media_type: str, etag: Optional[str] = None,
+                     max_age: int = 0, status_code: int = 200,
+                     headers: Optional[Dict[str, str]] = None) -> Response:
+    """Resposta com compressão negociada, ETag e `Cache-Control`
+
+    Sem `etag`, ela é derivada do próprio corpo.
+    """
+    if etag is None:
+        etag = make_etag(body)
+    cached = not_modified(request, etag, max_age)
+    if cached is not None:
+        return cached
+
+    response_headers = _cache_headers(etag, max_age)
+    response_headers.update(headers or {})
+    if len(body) >= MIN_COMPRESS_SIZE:
+        encoding = negotiate_encoding(request.headers.get("accept-encoding"))
+        if encoding is not None:
+            body = compress(body, encoding)
+            response_headers["Content-Encoding"] = encoding
+    return Response(content=body, status_code=status_code, media_type=media_type, headers=response_headers)
+
+
+def json_response(request: Request, content: Any, etag: Optional[str] = None,
+                  max_age: int = 0, status_code: int = 200) -> Response:
+    """Resposta JSON (orjson) com compressão negociada, ETag e `Cache-Control`"""
+    return encoded_response(
+        request, dumps(content), "application/json",
+        etag=etag, max_age=max_age, status_code=status_code
+    )
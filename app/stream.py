@@ -0,0 +1,258 @@
+"""
+Canal de atualizações ao vivo de preço e indicadores via WebSocket
+"""
+
+import asyncio
+import json
+import logging
+import os
+import time
+from typing import Dict, Iterable, Set
+
+from fastapi import WebSocket, WebSocketDisconnect
+
+from app.data_fetcher import AsyncCoinGeckoAPI, CoinNotFound, async_coin_gecko
+from app.technical_analysis import TechnicalAnalyzer, analyzer
+from app.timeseries_store import validate_coin_id
+
+logger = logging.getLogger(__name__)
+
+# Código de fechamento "Try Again Later" (RFC 6455) para conexões acima do limite
+_CLOSE_OVERLOADED = 1013
+
+
+class _Subscriber:
+    """Conexão inscrita e sua fila limitada de mensagens pendentes"""
+
+    def __init__(self, max_queue: int):
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=max_queue)
+        self.coins: Set[str] = set()
+        self.dropped = 0
+
+    def offer(self, message: str):
+        """Enfileira uma mensagem, descartando a mais antiga se a fila estiver cheia"""
+        if self.queue.full():
+            self.queue.get_nowait()
+            self.dropped += 1
+        self.queue.put_nowait(message)
+
+
+class StreamHub:
+    """Distribui uma única atualização por moeda a todos os inscritos
+
+    Cada moeda com ao menos um inscrito tem uma tarefa que, a cada
+    `interval` segundos, busca dados de mercado e série histórica (via cache
+    compartilhado), atualiza a análise incremental e envia a mesma mensagem,
+    serializada uma única vez, para todas as conexões. Clientes lentos não
+    seguram os demais: cada um tem uma fila de `max_queue` mensagens e as
+    mais antigas são descartadas quando ela enche.
+
+    O hub aceita no máximo `max_connections` conexões e acompanha no máximo
+    `max_coins` moedas distintas. IDs inválidos são recusados na inscrição e
+    IDs que a CoinGecko não conhece são removidos na primeira atualização.
+    """
+
+    def __init__(self, client: AsyncCoinGeckoAPI, analyzer: TechnicalAnalyzer,
+                 interval: float = 30, max_queue: int = 32, max_coins_per_client: int = 20,
+                 max_connections: int = 500, max_coins: int = 200):
+        self.client = client
+        self.analyzer = analyzer
+        self.interval = interval
+        self.max_queue = max_queue
+        self.max_coins_per_client = max_coins_per_client
+        self.max_connections = max_connections
+        self.max_coins = max_coins
+        self._subscribers: Dict[str, Set[_Subscriber]] = {}
+        self._tasks: Dict[str, asyncio.Task] = {}
+        self._last: Dict[str, str] = {}
+        self.connections = 0
+        self.messages_sent = 0
+        self.refreshes = 0
+        self.rejected_connections = 0
+
+    async def _snapshot(self, coin_id: str) -> Dict:
+        """Preço e indicadores atuais da moeda"""
+        market, series = await asyncio.gather(
+            self.client.get_market_data(coin_id),
+            self.client.get_historical_series(coin_id, days=60),
+            return_exceptions=True
+        )
+        # ID desconhecido prevalece sobre a falha da série, que pode chegar antes
+        errors = [result for result in (market, series) if isinstance(result, BaseException)]
+        if errors:
+            raise next((e for e in errors if isinstance(e, CoinNotFound)), errors[0])
+        return {
+            "type": "update",
+            "coin_id": coin_id,
+            "timestamp": time.time(),
+            "market": market,
+            "analysis": self.analyzer.analyze_incremental(coin_id, series)
+        }
+
+    async def _refresh_loop(self, coin_id: str):
+        while True:
+            try:
+                message = await self._snapshot(coin_id)
+            except asyncio.CancelledError:
+                raise
+            except CoinNotFound as e:
+                self._drop(coin_id, str(e))
+                return
+            except Exception as e:
+                message = {"type": "error", "coin_id": coin_id, "detail": str(e)}
+            self.refreshes += 1
+            encoded = json.dumps(message)
+            if message["type"] == "update":
+                self._last[coin_id] = encoded
+            for subscriber in list(self._subscribers.get(coin_id, ())):
+                subscriber.offer(encoded)
+            await asyncio.sleep(self.interval)
+
+    def _drop(self, coin_id: str, detail: str):
+        """Encerra o acompanhamento da moeda, avisando e desinscrevendo todos os inscritos"""
+        encoded = json.dumps({"type": "error", "coin_id": coin_id, "detail": detail})
+        for subscriber in self._subscribers.pop(coin_id, ()):
+            subscriber.coins.discard(coin_id)
+            subscriber.offer(encoded)
+        self._last.pop(coin_id, None)
+        self._tasks.pop(coin_id, None)
+
+    def _refusal(self, subscriber: _Subscriber, coin_id: str):
+        """Motivo para recusar a inscrição, ou None se ela é aceita"""
+        try:
+            validate_coin_id(coin_id)
+        except ValueError as e:
+            return str(e)
+        if len(subscriber.coins) >= self.max_coins_per_client:
+            return f"Limite de {self.max_coins_per_client} moedas por conexão"
+        if coin_id not in self._subscribers and len(self._subscribers) >= self.max_coins:
+            return f"Limite de {self.max_coins} moedas acompanhadas pelo servidor"
+        return None
+
+    def subscribe(self, subscriber: _Subscriber, coin_ids: Iterable[str]):
+        """Inscreve a conexão nas moedas, iniciando a atualização das que ainda não têm"""
+        for coin_id in coin_ids:
+            if coin_id in subscriber.coins:
+                continue
+            refusal = self._refusal(subscriber, coin_id)
+            if refusal is not None:
+                subscriber.offer(json.dumps({"type": "error", "coin_id": coin_id, "detail": refusal}))
+                continue
+            subscriber.coins.add(coin_id)
+            self._subscribers.setdefault(coin_id, set()).add(subscriber)
+            if coin_id in self._last:
+                subscriber.offer(self._last[coin_id])
+            if coin_id not in self._tasks:
+                self._tasks[coin_id] = asyncio.get_running_loop().create_task(
+                    self._refresh_loop(coin_id)
+                )
+
+    def unsubscribe(self, subscriber: _Subscriber, coin_ids: Iterable[str]):
+        """Remove a inscrição; a atualização da moeda para quando não há mais inscritos"""
+        for coin_id in list(coin_ids):
+            subscriber.coins.discard(coin_id)
+            subscribers = self._subscribers.get(coin_id)
+            if subscribers is None:
+                continue
+            subscribers.discard(subscriber)
+            if not subscribers:
+                del self._subscribers[coin_id]
+                self._last.pop(coin_id, None)
+                task = self._tasks.pop(coin_id, None)
+                if task is not None:
+                    task.cancel()
+
+    async def _send(self, websocket: WebSocket, subscriber: _Subscriber):
+        while True:
+            message = await subscriber.queue.get()
+            await websocket.send_text(message)
+            self.messages_sent += 1
+
+    async def serve(self, websocket: WebSocket):
+        """Atende uma conexão WebSocket
+
+        O cliente envia `{"action": "subscribe" | "unsubscribe", "coins": [...]}`
+        e recebe mensagens `{"type": "update" | "error", "coin_id": ...}`.
+        Acima de `max_connections`, a conexão recebe um erro e é fechada
+        com o código 1013.
+        """
+        await websocket.accept()
+        if self.connections >= self.max_connections:
+            self.rejected_connections += 1
+            await websocket.send_text(json.dumps({
+                "type": "error",
+                "detail": f"Limite de {self.max_connections} conexões atingido; tente novamente mais tarde"
+            }))
+            await websocket.close(code=_CLOSE_OVERLOADED)
+            return
+        subscriber = _Subscriber(self.max_queue)
+        self.connections += 1
+        sender = asyncio.create_task(self._send(websocket, subscriber))
+        try:
+            while True:
+                try:
+                    request = json.loads(await websocket.receive_text())
+                    action = request.get("action")
+                    coins = request.get("coins", [])
+                    # Uma string vale como um único ID (e não é percorrida letra
+                    # a letra); outros tipos que não sejam lista são recusados
+                    if isinstance(coins, str):
+                        coins = [coins]
+                    if not isinstance(coins, list):
+                        action, coins = None, []
+                    coins = [str(coin).strip().lower() for coin in coins]
+                except (ValueError, AttributeError, TypeError):
+                    action, coins = None, []
+                if action == "subscribe":
+                    self.subscribe(subscriber, coins)
+                elif action == "unsubscribe":
+                    self.unsubscribe(subscriber, coins)
+                else:
+                    subscriber.offer(json.dumps({"type": "error", "detail": "Mensagem inválida"}))
+        except WebSocketDisconnect:
+            pass
+        finally:
+            self.unsubscribe(subscriber, list(subscriber.coins))
+            self.connections -= 1
+            sender.cancel()
+            try:
+                await sender
+            except (asyncio.CancelledError, WebSocketDisconnect):
+                pass
+            except Exception:
+                logger.warning("Falha ao enviar atualizações ao cliente", exc_info=True)
+
+    async def close(self):
+        """Cancela as tarefas de atualização"""
+        tasks = list(self._tasks.values())
+        self._tasks.clear()
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    def stats(self) -> Dict:
+        """Conexões, moedas acompanhadas e mensagens enviadas"""
+        subscribers = set().union(*self._subscribers.values()) if self._subscribers else set()
+        return {
+            "connections": self.connections,
+            "rejected_connections": self.rejected_connections,
+            "coins": {coin_id: len(subs) for coin_id, subs in self._subscribers.items()},
+            "refreshes": self.refreshes,
+            "messages_sent": self.messages_sent,
+            "messages_dropped": sum(subscriber.dropped for subscriber in subscribers),
+            "interval": self.interval,
+            "max_queue": self.max_queue,
+            "max_connections": self.max_connections,
+            "max_coins": self.max_coins
+        }
+
+
+# Instância global do hub de streaming
+stream_hub = StreamHub(
+    client=async_coin_gecko,
+    analyzer=analyzer,
+    interval=float(os.getenv("STREAM_INTERVAL", 30)),
+    max_queue=int(os.getenv("STREAM_MAX_QUEUE", 32)),
+    max_connections=int(os.getenv("STREAM_MAX_CONNECTIONS", 500)),
+    max_coins=int(os.getenv("STREAM_MAX_COINS", 200))
+)
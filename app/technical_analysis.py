@@ -2,78 +2,124 @@
 Módulo de análise técnica para criptomoedas
 """
 
+import json
+import os
+import threading
 import numpy as np
-from typing import List, Dict
+from typing import List, Dict, Optional, Tuple
 from app.data_fetcher import coin_gecko
+from app.metrics import stage
+from app.price_series import PriceSeries
+from app.timeseries_store import GRANULARITY_MS, granularity_for
+from app.indicators import (
+    IndicatorState, compute_indicators, ema_series, macd_series, rsi_series, sma_series
+)
+
+class IndicatorStreams:
+    """Estados incrementais de indicadores por moeda, persistíveis em disco"""
+    
+    def __init__(self, step_ms: int = GRANULARITY_MS["daily"]):
+        self.step_ms = step_ms
+        self._states: Dict[str, IndicatorState] = {}
+        self._lock = threading.Lock()
+    
+    def ingest(self, coin_id: str, series: PriceSeries) -> IndicatorState:
+        """Incorpora ao estado da moeda apenas os pontos novos da série"""
+        timestamps = series.timestamps
+        prices = series.prices
+        with self._lock:
+            state = self._states.get(coin_id)
+            if state is None:
+                state = IndicatorState(self.step_ms)
+                self._states[coin_id] = state
+                start = 0
+            else:
+                start = int(np.searchsorted(timestamps, state.last_ts, side="right"))
+            for i in range(start, len(timestamps)):
+                state.update(timestamps[i], prices[i])
+            return state
+    
+    def get(self, coin_id: str) -> Optional[IndicatorState]:
+        """Retorna o estado atual da moeda, se existir"""
+        return self._states.get(coin_id)
+    
+    def save(self, path: str):
+        """Grava todos os estados em um arquivo JSON"""
+        with self._lock:
+            data = {coin_id: state.to_dict() for coin_id, state in self._states.items()}
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(data, f)
+        os.replace(tmp_path, path)
+    
+    def load(self, path: str) -> int:
+        """Restaura os estados gravados com `save`; retorna quantos foram lidos"""
+        if not os.path.exists(path):
+            return 0
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return 0
+        # Estados gravados antes da regra de abertura + preço atual (sem "tail")
+        # são descartados e reconstruídos a partir da série
+        data = {coin_id: state for coin_id, state in data.items() if "tail" in state}
+        with self._lock:
+            for coin_id, state in data.items():
+                self._states[coin_id] = IndicatorState.from_dict(state)
+        return len(data)
 
 class TechnicalAnalyzer:
     """Classe para análise técnica de criptomoedas"""
     
+    def __init__(self):
+        self.streams = IndicatorStreams()
+        self.state_path = os.path.join(os.getenv("DATA_DIR", "data"), "indicator_state.json")
+    
     @staticmethod
     def calculate_sma(prices: List[float], period: int) -> float:
         """Calcula Média Móvel Simples (SMA)"""
-        if len(prices) < period:
-            return np.mean(prices) if prices else 0
-        return np.mean(prices[-period:])
+        if len(prices) == 0:
+            return 0
+        return float(sma_series(prices, period)[-1])
     
     @staticmethod
     def calculate_ema(prices: List[float], period: int) -> float:
         """Calcula Média Móvel Exponencial (EMA)"""
-        if not prices:
+        if len(prices) == 0:
             return 0
-        
-        if len(prices) < period:
-            return np.mean(prices)
-        
-        multiplier = 2 / (period + 1)
-        ema = prices[0]
-        
-        for price in prices[1:]:
-            ema = (price * multiplier) + (ema * (1 - multiplier))
-        
-        return ema
+        return float(ema_series(prices, period)[-1])
     
     @staticmethod
     def calculate_rsi(prices: List[float], period: int = 14) -> float:
-        """Calcula RSI (Relative Strength Index)"""
+        """Calcula RSI (Relative Strength Index) com suavização de Wilder"""
         if len(prices) < period + 1:
             return 50.0  # Valor neutro
-        
-        deltas = np.diff(prices[-period-1:])
-        gains = np.where(deltas > 0, deltas, 0)
-        losses = np.where(deltas < 0, -deltas, 0)
-        
-        avg_gain = np.mean(gains)
-        avg_loss = np.mean(losses)
-        
-        if avg_loss == 0:
-            return 100.0
-        
-        rs = avg_gain / avg_loss
-        rsi = 100 - (100 / (1 + rs))
-        
-        return round(rsi, 2)
+        return round(float(rsi_series(prices, period)[-1]), 2)
     
     @staticmethod
     def calculate_macd(prices: List[float], fast: int = 12, slow: int = 26) -> float:
         """Calcula MACD (Moving Average Convergence Divergence)"""
         if len(prices) < slow:
             return 0
-        
-        ema_fast = TechnicalAnalyzer.calculate_ema(prices, fast)
-        ema_slow = TechnicalAnalyzer.calculate_ema(prices, slow)
-        
-        return round(ema_fast - ema_slow, 2)
+        return round(float(macd_series(prices, fast, slow)["macd"][-1]), 2)
+    
+    @staticmethod
+    def indicator_series(prices: List[float]) -> Dict[str, np.ndarray]:
+        """Calcula as séries completas de todos os indicadores"""
+        with stage("technical_analysis", "indicators"):
+            return compute_indicators(prices)
     
     @staticmethod
     def find_support_resistance(prices: List[float]) -> tuple:
         """Encontra níveis de suporte e resistência"""
-        if not prices:
+        if not len(prices):
             return 0, 0
         
-        recent_prices = prices[-30:] if len(prices) > 30 else prices
-        support = min(recent_prices)
-        resistance = max(recent_prices)
+        recent_prices = np.asarray(prices[-30:], dtype=np.float64)
+        support = float(recent_prices.min())
+        resistance = float(recent_prices.max())
         
         return round(support, 2), round(resistance, 2)
     
@@ -130,22 +176,199 @@ class TechnicalAnalyzer:
         else:
             return "manutenção"
     
+    @staticmethod
+    def determine_trends(prices: np.ndarray, sma_20: np.ndarray, sma_50: np.ndarray) -> np.ndarray:
+        """Versão vetorizada de `determine_trend` (elemento a elemento)"""
+        return np.select(
+            [(prices > sma_20) & (sma_20 > sma_50), (prices < sma_20) & (sma_20 < sma_50)],
+            ["alta", "baixa"],
+            default="lateral"
+        )
+    
+    @staticmethod
+    def generate_signals(rsi: np.ndarray, macd: np.ndarray, trend: np.ndarray,
+                         current_price: np.ndarray, sma_20: np.ndarray) -> np.ndarray:
+        """Versão vetorizada de `generate_signal` (elemento a elemento)"""
+        buy_signals = (
+            (rsi < 30).astype(np.int8)
+            + (macd > 0)
+            + (trend == "alta")
+            + (current_price > sma_20)
+        )
+        sell_signals = (
+            (rsi > 70).astype(np.int8)
+            + (macd < 0)
+            + (trend == "baixa")
+            + (current_price <= sma_20)
+        )
+        return np.select(
+            [buy_signals >= 3, sell_signals >= 3],
+            ["compra", "venda"],
+            default="manutenção"
+        )
+    
+    @staticmethod
+    def align_series(series_by_coin: Dict[str, PriceSeries], step_ms: int) -> Tuple[List[str], np.ndarray]:
+        """Alinha séries (timestamp, price) de várias moedas em uma matriz moedas × tempo
+        
+        As colunas são a união dos intervalos de `step_ms` presentes nas séries.
+        Lacunas repetem o último preço conhecido; antes do primeiro ponto de
+        cada moeda o valor é NaN.
+        """
+        coin_ids = [coin_id for coin_id, series in series_by_coin.items() if len(series)]
+        if not coin_ids:
+            return [], np.empty((0, 0))
+        
+        with stage("technical_analysis", "align"):
+            buckets = [series_by_coin[c].timestamps // step_ms for c in coin_ids]
+            grid = np.unique(np.concatenate(buckets))
+            
+            matrix = np.full((len(coin_ids), len(grid)), np.nan)
+            for row, (coin_id, coin_buckets) in enumerate(zip(coin_ids, buckets)):
+                matrix[row, np.searchsorted(grid, coin_buckets)] = series_by_coin[coin_id].prices
+            
+            # Preencher lacunas internas com o último valor conhecido
+            valid = ~np.isnan(matrix)
+            last_valid = np.maximum.accumulate(np.where(valid, np.arange(len(grid)), 0), axis=1)
+            return coin_ids, np.take_along_axis(matrix, last_valid, axis=1)
+    
+    def analyze_matrix(self, coin_ids: List[str], matrix: np.ndarray) -> List[Dict]:
+        """Análise técnica completa de várias moedas (uma por linha da matriz)
+        
+        Linhas que começam na mesma coluna são calculadas juntas, de forma
+        vetorizada, sobre o trecho em que todas têm dados.
+        """
+        starts = np.isnan(matrix).argmin(axis=1)
+        results = [None] * len(coin_ids)
+        for start in np.unique(starts):
+            rows = np.flatnonzero(starts == start)
+            group = [coin_ids[i] for i in rows]
+            for row, analysis in zip(rows, self._analyze_block(group, matrix[rows, start:])):
+                results[row] = analysis
+        return results
+    
+    def _analyze_block(self, coin_ids: List[str], matrix: np.ndarray) -> List[Dict]:
+        """Análise técnica de um bloco de moedas com o mesmo número de pontos"""
+        series = self.indicator_series(matrix)
+        current_price = matrix[:, -1]
+        sma_20 = series["sma_20"][:, -1]
+        sma_50 = series["sma_50"][:, -1]
+        rsi = np.round(series["rsi"][:, -1], 2)
+        macd = np.round(series["macd"][:, -1], 2)
+        
+        if matrix.shape[1] < 2:
+            trend = np.full(len(coin_ids), "lateral")
+        else:
+            trend = self.determine_trends(current_price, sma_20, sma_50)
+        signal = self.generate_signals(rsi, macd, trend, current_price, sma_20)
+        
+        recent = matrix[:, -30:]
+        support = recent.min(axis=1)
+        resistance = recent.max(axis=1)
+        
+        return [
+            {
+                "coin_id": coin_id,
+                "sma_20": round(float(sma_20[i]), 2),
+                "sma_50": round(float(sma_50[i]), 2),
+                "ema_12": round(float(series["ema_12"][i, -1]), 2),
+                "ema_26": round(float(series["ema_26"][i, -1]), 2),
+                "rsi": round(float(rsi[i]), 2),
+                "macd": round(float(macd[i]), 2),
+                "signal": str(signal[i]),
+                "support_level": round(float(support[i]), 2),
+                "resistance_level": round(float(resistance[i]), 2),
+                "trend": str(trend[i])
+            }
+            for i, coin_id in enumerate(coin_ids)
+        ]
+    
+    def analyze_many_series(self, series_by_coin: Dict[str, PriceSeries],
+                            days: int = 60) -> Tuple[List[Dict], Dict[str, str]]:
+        """Análise técnica em lote sobre séries já obtidas
+        
+        Retorna as análises e um dicionário de erros das moedas sem dados.
+        """
+        errors = {
+            coin_id: f"Não foi possível obter dados para {coin_id}"
+            for coin_id, series in series_by_coin.items() if not len(series)
+        }
+        coin_ids, matrix = self.align_series(
+            series_by_coin, GRANULARITY_MS[granularity_for(days)]
+        )
+        if not coin_ids:
+            return [], errors
+        return self.analyze_matrix(coin_ids, matrix), errors
+    
+    def analyze_many(self, coin_ids: List[str], days: int = 60) -> Tuple[List[Dict], Dict[str, str]]:
+        """Realiza análise técnica completa de várias moedas de uma só vez"""
+        series_by_coin = {}
+        errors = {}
+        for coin_id in coin_ids:
+            try:
+                with stage("technical_analysis", "history"):
+                    series_by_coin[coin_id] = coin_gecko.get_historical_series(coin_id, days=days)
+            except Exception as e:
+                errors[coin_id] = str(e)
+        results, missing = self.analyze_many_series(series_by_coin, days)
+        errors.update(missing)
+        return results, errors
+    
+    def analyze_incremental(self, coin_id: str, series: PriceSeries) -> Dict:
+        """Análise técnica a partir do estado incremental da moeda
+        
+        Apenas os pontos posteriores ao último já processado são incorporados
+        (custo constante por ponto); a resposta sai do estado atual.
+        """
+        if not len(series):
+            raise ValueError(f"Não foi possível obter dados para {coin_id}")
+        
+        with stage("technical_analysis", "ingest"):
+            state = self.streams.ingest(coin_id, series)
+            values = state.values()
+        sma_20 = values["sma_20"]
+        sma_50 = values["sma_50"]
+        rsi = round(values["rsi"], 2)
+        macd = round(values["macd"], 2)
+        current_price = values["price"]
+        
+        trend = self.determine_trend(list(state.window)[-2:], sma_20, sma_50)
+        signal = self.generate_signal(rsi, macd, trend, current_price, sma_20)
+        
+        return {
+            "coin_id": coin_id,
+            "sma_20": round(sma_20, 2),
+            "sma_50": round(sma_50, 2),
+            "ema_12": round(values["ema_12"], 2),
+            "ema_26": round(values["ema_26"], 2),
+            "rsi": rsi,
+            "macd": macd,
+            "signal": signal,
+            "support_level": round(values["support"], 2),
+            "resistance_level": round(values["resistance"], 2),
+            "trend": trend
+        }
+    
     def analyze(self, coin_id: str) -> Dict:
         """Realiza análise técnica completa"""
         # Buscar dados históricos
-        historical_data = coin_gecko.get_historical_data(coin_id, days=60)
-        prices = [item["price"] for item in historical_data]
-        
-        if not prices:
+        with stage("technical_analysis", "history"):
+            series = coin_gecko.get_historical_series(coin_id, days=60)
+        return self.analyze_historical(coin_id, series.prices)
+    
+    def analyze_historical(self, coin_id: str, prices: np.ndarray) -> Dict:
+        """Realiza análise técnica completa sobre preços históricos já obtidos"""
+        if not len(prices):
             raise ValueError(f"Não foi possível obter dados para {coin_id}")
         
-        # Calcular indicadores
-        sma_20 = self.calculate_sma(prices, 20)
-        sma_50 = self.calculate_sma(prices, 50)
-        ema_12 = self.calculate_ema(prices, 12)
-        ema_26 = self.calculate_ema(prices, 26)
-        rsi = self.calculate_rsi(prices)
-        macd = self.calculate_macd(prices)
+        # Calcular indicadores (séries completas, usando o último valor)
+        series = self.indicator_series(prices)
+        sma_20 = float(series["sma_20"][-1])
+        sma_50 = float(series["sma_50"][-1])
+        ema_12 = float(series["ema_12"][-1])
+        ema_26 = float(series["ema_26"][-1])
+        rsi = round(float(series["rsi"][-1]), 2)
+        macd = round(float(series["macd"][-1]), 2)
         
         # Suporte e resistência
         support, resistance = self.find_support_resistance(prices)
@@ -154,7 +377,7 @@ class TechnicalAnalyzer:
         trend = self.determine_trend(prices, sma_20, sma_50)
         
         # Sinal
-        current_price = prices[-1]
+        current_price = float(prices[-1])
         signal = self.generate_signal(rsi, macd, trend, current_price, sma_20)
         
         return {
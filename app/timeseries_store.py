@@ -0,0 +1,215 @@
+"""
+Armazenamento local persistente de séries temporais de preço e volume
+"""
+
+import json
+import os
+import re
+import threading
+import time
+from typing import Dict, List, Optional
+
+import numpy as np
+
+# Formato de cada ponto armazenado (timestamp em milissegundos)
+SERIES_DTYPE = np.dtype([
+    ("timestamp", "<i8"),
+    ("price", "<f8"),
+    ("volume", "<f8")
+])
+
+# Tamanho do intervalo de cada granularidade em milissegundos
+GRANULARITY_MS = {
+    "hourly": 3_600_000,
+    "daily": 86_400_000
+}
+
+DAY_MS = 86_400_000
+
+# IDs aceitos da CoinGecko; o ID vira nome de arquivo, então nada de `/` ou `..`
+COIN_ID_PATTERN = r"^[a-z0-9-]+$"
+COIN_ID_MAX_LENGTH = 100
+_COIN_ID = re.compile(COIN_ID_PATTERN)
+
+
+def validate_coin_id(coin_id: str) -> str:
+    """Retorna o ID se for válido; senão levanta ValueError"""
+    if not isinstance(coin_id, str) or len(coin_id) > COIN_ID_MAX_LENGTH or _COIN_ID.match(coin_id) is None:
+        raise ValueError(f"ID de criptomoeda inválido: {coin_id!r}")
+    return coin_id
+
+
+def granularity_for(days: int) -> str:
+    """Granularidade usada para uma janela de `days` dias"""
+    return "daily" if days > 30 else "hourly"
+
+
+def _pairs(values) -> np.ndarray:
+    """Converte uma lista `[[timestamp, valor], ...]` em matriz n × 2 (None vira NaN)"""
+    if not values:
+        return np.empty((0, 2))
+    return np.array(values, dtype=np.float64).reshape(len(values), -1)[:, :2]
+
+
+def points_from_market_chart(data: Dict) -> np.ndarray:
+    """Converte a resposta de `market_chart` em um array de pontos
+
+    A conversão é vetorizada e os pontos saem em ordem cronológica. Cada
+    preço recebe o volume do mesmo timestamp (0 quando não há volume).
+    """
+    prices = _pairs(data.get("prices"))
+    volumes = _pairs(data.get("total_volumes"))
+
+    timestamps = prices[:, 0].astype(np.int64)
+    order = np.argsort(timestamps, kind="stable")
+    points = np.zeros(len(prices), dtype=SERIES_DTYPE)
+    points["timestamp"] = timestamps[order]
+    points["price"] = prices[order, 1]
+
+    if len(volumes):
+        volume_ts = volumes[:, 0].astype(np.int64)
+        volume_order = np.argsort(volume_ts, kind="stable")
+        volume_ts = volume_ts[volume_order]
+        volume_values = np.nan_to_num(volumes[volume_order, 1])
+        # Volume correspondente ao mesmo timestamp
+        idx = np.minimum(np.searchsorted(volume_ts, points["timestamp"]), len(volume_ts) - 1)
+        matched = volume_ts[idx] == points["timestamp"]
+        points["volume"] = np.where(matched, volume_values[idx], 0.0)
+
+    return points
+
+
+class TimeSeriesStore:
+    """Séries de preço/volume por moeda e granularidade em arquivos `.npy`
+
+    Cada série guarda um ponto por intervalo da granularidade, o de abertura
+    (o primeiro observado no intervalo), como nas séries diárias da
+    CoinGecko; o ponto mais recente fica no fim como preço atual. A série é
+    lida via memory-map. Um arquivo de metadados
+    ao lado registra a última sincronização e o início da janela coberta,
+    permitindo buscar na API apenas os pontos novos.
+    """
+
+    def __init__(self, data_dir: str = "data"):
+        self.data_dir = data_dir
+        self._locks: Dict[tuple, threading.Lock] = {}
+        self._locks_guard = threading.Lock()
+
+    def _series_path(self, coin_id: str, granularity: str) -> str:
+        return os.path.join(self.data_dir, granularity, f"{validate_coin_id(coin_id)}.npy")
+
+    def _meta_path(self, coin_id: str, granularity: str) -> str:
+        return os.path.join(self.data_dir, granularity, f"{validate_coin_id(coin_id)}.json")
+
+    def _lock_for(self, coin_id: str, granularity: str) -> threading.Lock:
+        with self._locks_guard:
+            return self._locks.setdefault((coin_id, granularity), threading.Lock())
+
+    def load(self, coin_id: str, granularity: str) -> np.ndarray:
+        """Carrega a série armazenada (somente leitura, via memory-map)"""
+        path = self._series_path(coin_id, granularity)
+        if not os.path.exists(path):
+            return np.empty(0, dtype=SERIES_DTYPE)
+        return np.load(path, mmap_mode="r")
+
+    def read_meta(self, coin_id: str, granularity: str) -> Dict:
+        """Lê os metadados de sincronização da série"""
+        path = self._meta_path(coin_id, granularity)
+        if not os.path.exists(path):
+            return {}
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def window(self, coin_id: str, granularity: str, days: int) -> np.ndarray:
+        """Retorna os pontos dos últimos `days` dias"""
+        series = self.load(coin_id, granularity)
+        since = int(time.time() * 1000) - days * DAY_MS
+        start = np.searchsorted(series["timestamp"], since, side="left")
+        return series[start:]
+
+    def plan_sync(self, coin_id: str, granularity: str, days: int,
+                  max_age: float) -> Optional[Dict]:
+        """Decide qual busca é necessária para servir a janela pedida
+
+        Retorna None quando a série está atualizada, `{"type": "full"}` quando
+        a janela ainda não está coberta e `{"type": "range", ...}` com o
+        intervalo (em segundos) dos pontos novos desde o último armazenado.
+        """
+        now = time.time()
+        since = int(now * 1000) - days * DAY_MS
+        step = GRANULARITY_MS[granularity]
+        meta = self.read_meta(coin_id, granularity)
+        series = self.load(coin_id, granularity)
+
+        covered_since = meta.get("covered_since")
+        if not len(series) or covered_since is None or covered_since > since + step:
+            return {"type": "full", "since": since}
+
+        if now - meta.get("last_sync", 0) < max_age:
+            return None
+
+        from_ts = int(series["timestamp"][-1]) // 1000 + 1
+        if from_ts >= int(now):
+            return None
+        return {"type": "range", "from": from_ts, "to": int(now)}
+
+    def merge(self, coin_id: str, granularity: str, points: np.ndarray,
+              covered_since: Optional[int] = None) -> np.ndarray:
+        """Incorpora novos pontos à série e persiste o resultado
+
+        Os pontos são reduzidos ao de abertura de cada intervalo da
+        granularidade, de modo que intervalos sincronizados por deltas (pontos
+        de 5 minutos ou de hora em hora) têm a mesma definição dos que vieram da
+        série completa. O ponto mais recente é mantido no fim. A escrita é
+        atômica (arquivo temporário + rename).
+        """
+        step = GRANULARITY_MS[granularity]
+        with self._lock_for(coin_id, granularity):
+            existing = self.load(coin_id, granularity)
+            if len(points):
+                # Pontos novos primeiro: no mesmo timestamp, prevalece o valor novo
+                combined = np.concatenate([points.astype(SERIES_DTYPE), existing])
+                combined = combined[np.argsort(combined["timestamp"], kind="stable")]
+                # Primeiro ponto de cada intervalo (abertura), em ordem cronológica
+                _, first_idx = np.unique(combined["timestamp"] // step, return_index=True)
+                merged = combined[first_idx]
+                # Mais o último ponto observado, como preço atual
+                if combined["timestamp"][-1] > merged["timestamp"][-1]:
+                    merged = np.concatenate([merged, combined[-1:]])
+            else:
+                merged = np.array(existing)
+
+            meta = self.read_meta(coin_id, granularity)
+            if covered_since is not None:
+                previous = meta.get("covered_since")
+                meta["covered_since"] = covered_since if previous is None else min(previous, covered_since)
+            meta["last_sync"] = time.time()
+
+            self._write(coin_id, granularity, merged, meta)
+        return merged
+
+    def _write(self, coin_id: str, granularity: str, series: np.ndarray, meta: Dict):
+        """Grava série e metadados de forma atômica"""
+        path = self._series_path(coin_id, granularity)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "wb") as f:
+            np.save(f, np.ascontiguousarray(series, dtype=SERIES_DTYPE))
+        os.replace(tmp_path, path)
+
+        meta_path = self._meta_path(coin_id, granularity)
+        tmp_meta = f"{meta_path}.{os.getpid()}.tmp"
+        with open(tmp_meta, "w", encoding="utf-8") as f:
+            json.dump(meta, f)
+        os.replace(tmp_meta, meta_path)
+
+    def coins(self, granularity: str) -> List[str]:
+        """Lista as moedas com série armazenada na granularidade"""
+        directory = os.path.join(self.data_dir, granularity)
+        if not os.path.isdir(directory):
+            return []
+        return sorted(name[:-4] for name in os.listdir(directory) if name.endswith(".npy"))
@@ -0,0 +1,344 @@
+"""
+Transportes das requisições à API externa: HTTP real, gravação, reprodução e injeção de falhas
+"""
+
+import asyncio
+import glob
+import hashlib
+import json
+import os
+import random
+import re
+import threading
+import time
+from typing import Dict, Optional
+
+import aiohttp
+import requests
+
+from app.rate_limiter import UpstreamThrottled, parse_retry_after
+
+COINGECKO_URL = "https://api.coingecko.com/api/v3"
+
+HEADERS = {
+    "Accept": "application/json",
+    "User-Agent": "CryptoAnalytics-Pro/1.0"
+}
+
+
+class Transport:
+    """Executa uma requisição `GET endpoint?params` e retorna o JSON da resposta
+
+    Uma resposta 429 vira `UpstreamThrottled`; as demais falhas levantam
+    `Exception` com a mensagem "Erro ao buscar dados da API: ...".
+    """
+
+    def get(self, endpoint: str, params: Optional[Dict] = None):
+        raise NotImplementedError
+
+    async def aget(self, endpoint: str, params: Optional[Dict] = None):
+        raise NotImplementedError
+
+    async def aclose(self):
+        """Libera conexões abertas"""
+
+    def stats(self) -> Dict:
+        return {"type": type(self).__name__}
+
+
+class HttpTransport(Transport):
+    """Requisições HTTP reais (requests no cliente síncrono, aiohttp com pool no assíncrono)"""
+
+    def __init__(self, base_url: str = COINGECKO_URL, timeout: float = 10,
+                 max_connections: int = 100, max_per_host: int = 20):
+        self.base_url = base_url.rstrip("/")
+        self.timeout = timeout
+        self.max_connections = max_connections
+        self.max_per_host = max_per_host
+        self.session = requests.Session()
+        self.session.headers.update(HEADERS)
+        self._session: Optional[aiohttp.ClientSession] = None
+
+    def get(self, endpoint: str, params: Optional[Dict] = None):
+        url = f"{self.base_url}/{endpoint}"
+        try:
+            response = self.session.get(url, params=params, timeout=self.timeout)
+            if response.status_code == 429:
+                raise UpstreamThrottled(parse_retry_after(response.headers.get("Retry-After")))
+            response.raise_for_status()
+            return response.json()
+        except requests.exceptions.RequestException as e:
+            raise Exception(f"Erro ao buscar dados da API: {str(e)}")
+
+    def _get_session(self) -> aiohttp.ClientSession:
+        """Cria a sessão HTTP (e o pool de conexões) no primeiro uso"""
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(
+                limit=self.max_connections,
+                limit_per_host=self.max_per_host,
+                ttl_dns_cache=300
+            )
+            self._session = aiohttp.ClientSession(
+                connector=connector,
+                timeout=aiohttp.ClientTimeout(total=self.timeout),
+                headers=HEADERS
+            )
+        return self._session
+
+    async def aget(self, endpoint: str, params: Optional[Dict] = None):
+        url = f"{self.base_url}/{endpoint}"
+        try:
+            async with self._get_session().get(url, params=params) as response:
+                if response.status == 429:
+                    raise UpstreamThrottled(parse_retry_after(response.headers.get("Retry-After")))
+                response.raise_for_status()
+                return await response.json()
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            raise Exception(f"Erro ao buscar dados da API: {str(e)}")
+
+    async def aclose(self):
+        """Fecha a sessão HTTP e libera as conexões do pool"""
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+
+    def stats(self) -> Dict:
+        return {"type": "http", "base_url": self.base_url}
+
+
+def fixture_name(endpoint: str, params: Optional[Dict] = None) -> str:
+    """Nome do arquivo de fixture de uma requisição (endpoint legível + hash dos parâmetros)"""
+    canonical = json.dumps(sorted((str(k), str(v)) for k, v in (params or {}).items()))
+    digest = hashlib.blake2b(canonical.encode("utf-8"), digest_size=6).hexdigest()
+    slug = re.sub(r"[^A-Za-z0-9._-]+", "_", endpoint).strip("_")
+    return f"{slug}__{digest}.json"
+
+
+class RecordingTransport(Transport):
+    """Repassa as requisições a outro transporte e grava cada resposta em `directory`"""
+
+    def __init__(self, inner: Transport, directory: str):
+        self.inner = inner
+        self.directory = directory
+        self.recorded = 0
+        os.makedirs(directory, exist_ok=True)
+
+    def _save(self, endpoint: str, params: Optional[Dict], body):
+        path = os.path.join(self.directory, fixture_name(endpoint, params))
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({
+                "endpoint": endpoint,
+                "params": {str(k): v for k, v in (params or {}).items()},
+                "recorded_at": time.time(),
+                "body": body
+            }, f)
+        os.replace(tmp_path, path)
+        self.recorded += 1
+
+    def get(self, endpoint: str, params: Optional[Dict] = None):
+        body = self.inner.get(endpoint, params)
+        self._save(endpoint, params, body)
+        return body
+
+    async def aget(self, endpoint: str, params: Optional[Dict] = None):
+        body = await self.inner.aget(endpoint, params)
+        self._save(endpoint, params, body)
+        return body
+
+    async def aclose(self):
+        await self.inner.aclose()
+
+    def stats(self) -> Dict:
+        return {"type": "record", "directory": self.directory, "recorded": self.recorded,
+                "inner": self.inner.stats()}
+
+
+class ReplayTransport(Transport):
+    """Responde com as fixtures gravadas por `RecordingTransport`, sem rede
+
+    A busca é pelo endpoint e parâmetros exatos. Sem correspondência exata,
+    usa a gravação mais recente do mesmo endpoint: `coins/markets` junta as
+    linhas de todas as gravações e filtra pelos `ids` pedidos, e
+    `market_chart/range` recorta os pontos ao intervalo `from`/`to`. Com
+    `shift_time`, os timestamps de `market_chart` são deslocados para que a
+    gravação termine no momento da reprodução, mantendo as janelas de
+    `days` dias preenchidas.
+    """
+
+    def __init__(self, directory: str, shift_time: bool = True):
+        self.directory = directory
+        self.shift_time = shift_time
+        self._exact: Dict[str, Dict] = {}
+        self._by_endpoint: Dict[str, Dict] = {}
+        self._markets: Dict[str, Dict] = {}
+        self.hits = 0
+        self.misses = 0
+        self.load()
+
+    def load(self) -> int:
+        """(Re)carrega as fixtures do diretório; retorna quantas foram lidas"""
+        fixtures = []
+        for path in glob.glob(os.path.join(self.directory, "*.json")):
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    fixtures.append(json.load(f))
+            except (OSError, ValueError):
+                continue
+        fixtures.sort(key=lambda fixture: fixture.get("recorded_at", 0))
+        for fixture in fixtures:
+            endpoint = fixture["endpoint"]
+            self._exact[fixture_name(endpoint, fixture.get("params"))] = fixture
+            self._by_endpoint[endpoint] = fixture
+            if endpoint == "coins/markets" and isinstance(fixture["body"], list):
+                for row in fixture["body"]:
+                    self._markets[row.get("id")] = row
+        return len(fixtures)
+
+    def _shifted(self, body):
+        """Desloca os timestamps de `market_chart` para terminar no instante atual"""
+        if not self.shift_time or not isinstance(body, dict) or not body.get("prices"):
+            return body
+        offset = int(time.time() * 1000) - int(body["prices"][-1][0])
+        return {
+            key: [[point[0] + offset] + list(point[1:]) for point in values]
+            for key, values in body.items()
+        }
+
+    def _lookup(self, endpoint: str, params: Dict):
+        fixture = self._exact.get(fixture_name(endpoint, params))
+        if fixture is not None:
+            return self._shifted(fixture["body"])
+
+        if endpoint == "coins/markets" and params.get("ids"):
+            ids = str(params["ids"]).split(",")
+            return [self._markets[coin_id] for coin_id in ids if coin_id in self._markets]
+
+        if endpoint.endswith("/market_chart/range"):
+            fixture = self._by_endpoint.get(endpoint) or self._by_endpoint.get(endpoint[:-len("/range")])
+            if fixture is None:
+                return None
+            body = self._shifted(fixture["body"])
+            start, end = int(params["from"]) * 1000, int(params["to"]) * 1000
+            return {
+                key: [point for point in values if start <= point[0] <= end]
+                for key, values in body.items()
+            }
+
+        fixture = self._by_endpoint.get(endpoint)
+        if fixture is None:
+            return None
+        return self._shifted(fixture["body"])
+
+    def get(self, endpoint: str, params: Optional[Dict] = None):
+        body = self._lookup(endpoint, params or {})
+        if body is None:
+            self.misses += 1
+            raise Exception(f"Erro ao buscar dados da API: sem fixture gravada para {endpoint}")
+        self.hits += 1
+        return body
+
+    async def aget(self, endpoint: str, params: Optional[Dict] = None):
+        return self.get(endpoint, params)
+
+    def stats(self) -> Dict:
+        return {"type": "replay", "directory": self.directory, "fixtures": len(self._exact),
+                "hits": self.hits, "misses": self.misses}
+
+
+class FaultInjectingTransport(Transport):
+    """Acrescenta latência e falhas (erros e 429) às respostas de outro transporte
+
+    A latência de cada chamada é `latency` mais um valor uniforme em
+    `[0, jitter]` segundos; em seguida a chamada falha com probabilidade
+    `error_rate` ou responde 429 com probabilidade `throttle_rate`.
+    """
+
+    def __init__(self, inner: Transport, latency: float = 0.0, jitter: float = 0.0,
+                 error_rate: float = 0.0, throttle_rate: float = 0.0,
+                 retry_after: float = 1.0, seed: Optional[int] = None):
+        self.inner = inner
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.throttle_rate = throttle_rate
+        self.retry_after = retry_after
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.errors = 0
+        self.throttled = 0
+
+    def _draw(self) -> tuple:
+        """Sorteia a latência e a falha da próxima chamada"""
+        with self._lock:
+            self.calls += 1
+            delay = self.latency + self._random.uniform(0, self.jitter)
+            roll = self._random.random()
+            if roll < self.error_rate:
+                self.errors += 1
+                return delay, "error"
+            if roll < self.error_rate + self.throttle_rate:
+                self.throttled += 1
+                return delay, "throttle"
+            return delay, None
+
+    def _fail(self, fault: str):
+        if fault == "error":
+            raise Exception("Erro ao buscar dados da API: falha injetada")
+        if fault == "throttle":
+            raise UpstreamThrottled(self.retry_after)
+
+    def get(self, endpoint: str, params: Optional[Dict] = None):
+        delay, fault = self._draw()
+        if delay > 0:
+            time.sleep(delay)
+        self._fail(fault)
+        return self.inner.get(endpoint, params)
+
+    async def aget(self, endpoint: str, params: Optional[Dict] = None):
+        delay, fault = self._draw()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        self._fail(fault)
+        return await self.inner.aget(endpoint, params)
+
+    async def aclose(self):
+        await self.inner.aclose()
+
+    def stats(self) -> Dict:
+        return {"type": "faults", "latency": self.latency, "jitter": self.jitter,
+                "error_rate": self.error_rate, "throttle_rate": self.throttle_rate,
+                "calls": self.calls, "errors": self.errors, "throttled": self.throttled,
+                "inner": self.inner.stats()}
+
+
+def transport_from_env(max_connections: int = 100, max_per_host: int = 20) -> Transport:
+    """Monta o transporte configurado pelas variáveis `UPSTREAM_*`
+
+    `UPSTREAM_TRANSPORT`: `http` (padrão), `record` (HTTP gravando em
+    `UPSTREAM_FIXTURES`) ou `replay` (somente as fixtures). `UPSTREAM_BASE_URL`
+    troca o servidor (por exemplo, o servidor local de `benchmarks.stub_server`).
+    Latência e falhas são injetadas com `UPSTREAM_LATENCY_MS`,
+    `UPSTREAM_JITTER_MS`, `UPSTREAM_ERROR_RATE` e `UPSTREAM_THROTTLE_RATE`.
+    """
+    mode = os.getenv("UPSTREAM_TRANSPORT", "http").lower()
+    fixtures = os.getenv("UPSTREAM_FIXTURES", os.path.join("fixtures", "upstream"))
+    if mode == "replay":
+        transport: Transport = ReplayTransport(fixtures)
+    else:
+        transport = HttpTransport(
+            base_url=os.getenv("UPSTREAM_BASE_URL", COINGECKO_URL),
+            max_connections=max_connections,
+            max_per_host=max_per_host
+        )
+        if mode == "record":
+            transport = RecordingTransport(transport, fixtures)
+
+    latency = float(os.getenv("UPSTREAM_LATENCY_MS", 0)) / 1000
+    jitter = float(os.getenv("UPSTREAM_JITTER_MS", 0)) / 1000
+    error_rate = float(os.getenv("UPSTREAM_ERROR_RATE", 0))
+    throttle_rate = float(os.getenv("UPSTREAM_THROTTLE_RATE", 0))
+    if latency or jitter or error_rate or throttle_rate:
+        transport = FaultInjectingTransport(transport, latency, jitter, error_rate, throttle_rate)
+    return transport
@@ -0,0 +1,153 @@
+"""
+Aquecimento de inicialização em segundo plano e estado de prontidão (`/ready`)
+"""
+
+import asyncio
+import glob
+import logging
+import os
+import re
+import time
+from typing import Awaitable, Callable, Dict, Optional
+
+import numpy as np
+
+from app.indicators import compute_indicators
+from app.jobs import TrainingJobManager, training_jobs
+from app.metrics import STAGE_SECONDS, metrics
+from app.ml_engine import MLPredictor, ml_predictor
+from app.prewarm import PrewarmScheduler, prewarmer
+from app.profiling import run_in_threadpool
+
+logger = logging.getLogger(__name__)
+
+_MODEL_FILE = re.compile(r"^(?P<coin_id>[a-z0-9-]+)_(?P<days_ahead>\d+)d\.forest$")
+
+
+class StartupWarmup:
+    """Aquece em segundo plano o que a inicialização deixou para depois
+
+    O processo atende (`/health`) logo após importar os módulos; as
+    dependências pesadas e os dados são carregados depois, em paralelo:
+
+    - `indicators`: importa o SciPy e calcula os indicadores uma vez;
+    - `models`: carrega no registro os `max_models` modelos salvos mais
+      recentes, parando se o orçamento de memória do registro encher;
+    - `training_pool`: inicia um processo de treino com o scikit-learn carregado;
+    - `caches`: espera o primeiro ciclo do aquecimento das top-N moedas.
+
+    `ready` fica verdadeiro quando todas as etapas terminaram. Uma etapa que
+    falha ou passa de `timeout` segundos não bloqueia a prontidão: o erro
+    aparece em `status()` e a etapa é refeita sob demanda no primeiro uso.
+    """
+
+    def __init__(self, predictor: MLPredictor, jobs: TrainingJobManager, scheduler: PrewarmScheduler,
+                 max_models: int = 20, warm_training_pool: bool = True, timeout: float = 120):
+        self.predictor = predictor
+        self.jobs = jobs
+        self.scheduler = scheduler
+        self.max_models = max_models
+        self.warm_training_pool = warm_training_pool
+        self.timeout = timeout
+        self.components: Dict[str, Dict] = {}
+        self.started: Optional[float] = None
+        self.finished: Optional[float] = None
+        self._task: Optional[asyncio.Task] = None
+
+    def _warm_indicators(self) -> Dict:
+        compute_indicators(np.linspace(1.0, 2.0, 64))
+        return {}
+
+    def _preload_models(self) -> Dict:
+        registry = self.predictor.registry
+        paths = glob.glob(os.path.join(self.predictor.models_dir, "*.forest"))
+        paths.sort(key=os.path.getmtime, reverse=True)
+        loaded = 0
+        for path in paths[:self.max_models]:
+            match = _MODEL_FILE.match(os.path.basename(path))
+            if match is None:
+                continue
+            evictions = registry.evictions
+            if self.predictor.get_model(match["coin_id"], int(match["days_ahead"])) is not None:
+                loaded += 1
+            if registry.evictions > evictions:
+                break
+        return {"models": loaded, "bytes": registry.total_bytes}
+
+    async def _warm_training_pool(self) -> Dict:
+        seconds = await asyncio.wrap_future(self.jobs.warm())
+        return {"import_seconds": round(seconds, 3)}
+
+    async def _wait_prewarm(self) -> Dict:
+        while self.scheduler.runs == 0:
+            await asyncio.sleep(0.1)
+        return {"coins": len(self.scheduler.last_run["coins"])}
+
+    async def _step(self, name: str, func: Callable[[], Awaitable[Dict]]):
+        self.components[name]["status"] = "running"
+        started = time.perf_counter()
+        try:
+            detail = await asyncio.wait_for(func(), self.timeout)
+            status = "ready"
+        except asyncio.TimeoutError:
+            detail, status = {}, "timeout"
+        except Exception as e:
+            logger.exception("Falha no aquecimento: %s", name)
+            detail, status = {"error": str(e)}, "failed"
+        elapsed = time.perf_counter() - started
+        STAGE_SECONDS.observe(elapsed, "warmup", name)
+        self.components[name] = {"status": status, "seconds": round(elapsed, 3), **detail}
+
+    async def run(self):
+        """Executa todas as etapas e marca o processo como pronto"""
+        steps = {"indicators": lambda: run_in_threadpool(self._warm_indicators)}
+        if self.max_models > 0:
+            steps["models"] = lambda: run_in_threadpool(self._preload_models)
+        if self.warm_training_pool:
+            steps["training_pool"] = self._warm_training_pool
+        if self.scheduler.stats()["running"]:
+            steps["caches"] = self._wait_prewarm
+        self.components = {name: {"status": "pending"} for name in steps}
+        await asyncio.gather(*(self._step(name, func) for name, func in steps.items()))
+        self.finished = time.time()
+
+    def start(self):
+        """Inicia o aquecimento no event loop atual (chamar depois do agendador de aquecimento)"""
+        if self._task is None:
+            self.started = time.time()
+            self._task = asyncio.get_running_loop().create_task(self.run())
+
+    async def stop(self):
+        """Interrompe o aquecimento, se ainda estiver em andamento"""
+        if self._task is not None and not self._task.done():
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+
+    @property
+    def ready(self) -> bool:
+        return self.finished is not None
+
+    def status(self) -> Dict:
+        """Prontidão e situação de cada etapa do aquecimento"""
+        return {
+            "ready": self.ready,
+            "warmup_seconds": round(self.finished - self.started, 3) if self.ready else None,
+            "components": self.components
+        }
+
+
+# Instância global do aquecimento de inicialização
+warmup = StartupWarmup(
+    predictor=ml_predictor,
+    jobs=training_jobs,
+    scheduler=prewarmer,
+    max_models=int(os.getenv("WARMUP_MODELS", 20)),
+    warm_training_pool=os.getenv("WARMUP_TRAINING_POOL", "true").lower() == "true",
+    timeout=float(os.getenv("WARMUP_TIMEOUT", 120))
+)
+
+metrics.callback("cryptoanalytics_ready", "1 quando o aquecimento de inicialização terminou",
+                 lambda: 1 if warmup.ready else 0)
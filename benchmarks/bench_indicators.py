@@ -0,0 +1,70 @@
+"""
+Benchmark: indicadores em laço Python (implementação anterior) vs engine vetorizada
+
+Uso:
+    python -m benchmarks.bench_indicators [n_pontos ...]
+"""
+
+import sys
+import timeit
+
+import numpy as np
+
+from app.indicators import compute_indicators
+
+
+def synthetic_prices(n: int, seed: int = 42) -> np.ndarray:
+    """Gera uma série de preços sintética (passeio aleatório geométrico)"""
+    rng = np.random.default_rng(seed)
+    return 100.0 * np.exp(np.cumsum(rng.normal(0, 0.02, n)))
+
+
+def legacy_ema(prices, period):
+    """EMA em laço Python, como na implementação anterior"""
+    if len(prices) < period:
+        return np.mean(prices)
+    multiplier = 2 / (period + 1)
+    ema = prices[0]
+    for price in prices[1:]:
+        ema = (price * multiplier) + (ema * (1 - multiplier))
+    return ema
+
+
+def legacy_last_values(prices):
+    """Último valor de cada indicador, no caminho anterior de `analyze()`"""
+    return (
+        np.mean(prices[-20:]),
+        np.mean(prices[-50:]),
+        legacy_ema(prices, 12),
+        legacy_ema(prices, 26),
+        legacy_ema(prices, 12) - legacy_ema(prices, 26)
+    )
+
+
+def legacy_full_series(prices):
+    """Série completa de EMA-12 no caminho anterior (um cálculo por prefixo)"""
+    return [legacy_ema(prices[:i + 1], 12) for i in range(len(prices))]
+
+
+def run(sizes):
+    print(f"{'pontos':>8} | {'laço (último valor)':>20} | {'laço (série EMA)':>17} | "
+          f"{'vetorizado (todas)':>19} | {'ganho':>7}")
+    for n in sizes:
+        prices = synthetic_prices(n)
+        prices_list = prices.tolist()
+        repeat = max(3, 20_000 // n)
+
+        t_legacy = min(timeit.repeat(lambda: legacy_last_values(prices_list), number=1, repeat=repeat))
+        t_vector = min(timeit.repeat(lambda: compute_indicators(prices), number=1, repeat=repeat))
+        if n <= 10_000:
+            t_series = min(timeit.repeat(lambda: legacy_full_series(prices_list), number=1, repeat=1))
+            series_txt = f"{t_series * 1e3:14.1f} ms"
+        else:
+            series_txt = f"{'-':>17}"
+
+        print(f"{n:>8} | {t_legacy * 1e3:17.3f} ms | {series_txt} | "
+              f"{t_vector * 1e3:16.3f} ms | {t_legacy / t_vector:6.1f}x")
+
+
+if __name__ == "__main__":
+    run([int(arg) for arg in sys.argv[1:]] or [1_000, 10_000, 100_000])
@@ -0,0 +1,112 @@
+"""
+Benchmark: modelos em pickle vs formato compacto mapeado em memória
+
+Cada formato é medido em um processo novo, que carrega todos os modelos e
+faz uma predição com cada um. A memória anônima (RssAnon) é a parte privada
+do processo; as páginas mapeadas dos arquivos compactos aparecem em RssFile
+e são compartilhadas entre os workers.
+
+Uso:
+    python -m benchmarks.bench_model_format [n_modelos]
+"""
+
+import json
+import os
+import pickle
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+from sklearn.ensemble import RandomForestRegressor
+
+from app.compact_forest import CompactForest
+
+
+def memory_kb() -> dict:
+    """RSS total, anônima e de arquivos do processo atual (Linux), em kB"""
+    usage = {}
+    with open("/proc/self/status") as f:
+        for line in f:
+            key, _, value = line.partition(":")
+            if key in ("VmRSS", "RssAnon", "RssFile"):
+                usage[key] = int(value.split()[0])
+    return usage
+
+
+def synthetic_model(seed: int) -> RandomForestRegressor:
+    """Floresta com os mesmos hiperparâmetros de `MLPredictor.train_model`"""
+    rng = np.random.default_rng(seed)
+    X = rng.normal(size=(2_000, 10)).astype(np.float32)
+    y = X @ rng.normal(size=10) + rng.normal(0, 0.1, len(X))
+    return RandomForestRegressor(n_estimators=100, max_depth=10, random_state=seed, n_jobs=-1).fit(X, y)
+
+
+def child(fmt: str, directory: str):
+    """Carrega e usa todos os modelos de um formato; imprime as medições em JSON"""
+    paths = sorted(os.path.join(directory, name) for name in os.listdir(directory) if name.endswith(fmt))
+    row = np.random.default_rng(0).normal(size=(1, 10)).astype(np.float32)
+    before = memory_kb()
+
+    start = time.perf_counter()
+    if fmt == ".pkl":
+        models = []
+        for path in paths:
+            with open(path, "rb") as f:
+                models.append(pickle.load(f))
+    else:
+        models = [CompactForest.load(path) for path in paths]
+    load_time = time.perf_counter() - start
+    loaded = memory_kb()
+
+    start = time.perf_counter()
+    for model in models:
+        if fmt == ".pkl":
+            np.stack([tree.predict(row, check_input=False) for tree in model.estimators_])
+        else:
+            model.tree_predictions(row)
+    predict_time = (time.perf_counter() - start) / len(models)
+    used = memory_kb()
+
+    print(json.dumps({
+        "load_ms": load_time * 1e3,
+        "predict_ms": predict_time * 1e3,
+        "anon_kb": used["RssAnon"] - before["RssAnon"],
+        "file_kb": used["RssFile"] - before["RssFile"],
+        "load_anon_kb": loaded["RssAnon"] - before["RssAnon"]
+    }))
+
+
+def run(n_models: int):
+    with tempfile.TemporaryDirectory() as directory:
+        disk = {".pkl": 0, ".forest": 0}
+        for seed in range(n_models):
+            model = synthetic_model(seed)
+            pkl_path = os.path.join(directory, f"model_{seed}.pkl")
+            with open(pkl_path, "wb") as f:
+                pickle.dump(model, f)
+            forest_path = os.path.join(directory, f"model_{seed}.forest")
+            CompactForest.from_estimator(model).save(forest_path)
+            disk[".pkl"] += os.path.getsize(pkl_path)
+            disk[".forest"] += os.path.getsize(forest_path)
+
+        print(f"{n_models} modelos (100 árvores, profundidade 10)")
+        print(f"{'formato':>8} | {'disco':>9} | {'carga':>10} | {'predição':>10} | "
+              f"{'RSS privada':>11} | {'RSS arquivo':>11}")
+        for fmt in (".pkl", ".forest"):
+            output = subprocess.run(
+                [sys.executable, "-m", "benchmarks.bench_model_format", "--child", fmt, directory],
+                check=True, capture_output=True, text=True
+            ).stdout
+            result = json.loads(output.strip().splitlines()[-1])
+            print(f"{fmt:>8} | {disk[fmt] / 2**20:6.1f} MB | {result['load_ms']:7.1f} ms | "
+                  f"{result['predict_ms']:7.2f} ms | {result['anon_kb'] / 1024:8.1f} MB | "
+                  f"{result['file_kb'] / 1024:8.1f} MB")
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] == "--child":
+        child(sys.argv[2], sys.argv[3])
+    else:
+        run(int(sys.argv[1]) if len(sys.argv) > 1 else 20)
@@ -0,0 +1,252 @@
+"""
+Teste de carga de ponta a ponta dos endpoints `/api/*`
+
+Sobe o servidor local da CoinGecko (`benchmarks.stub_server`) e, para cada
+número de workers pedido, a aplicação com `uvicorn --workers N` apontada para
+ele; depois dispara requisições em malha aberta na taxa alvo (a chegada não
+espera as respostas) e relata vazão, latências p50/p95/p99 e taxa de erros por
+endpoint. Com `--url`, mede uma aplicação já em execução.
+
+Uso:
+    python -m benchmarks.load_test [--rps 50] [--duration 30] [--workers 1 2 4]
+                                   [--coins bitcoin ethereum] [--stub-latency-ms 50]
+                                   [--stub-error-rate 0.01] [--json resultado.json]
+    python -m benchmarks.load_test --url http://127.0.0.1:8000 --rps 100
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Dict, List, Optional
+
+import aiohttp
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Endpoints exercitados, com o peso de cada um na mistura de requisições
+ENDPOINTS = {
+    "/api/crypto/{coin}": 4,
+    "/api/crypto?ids={coins}": 1,
+    "/api/cryptos?limit=50": 1,
+    "/api/analysis/{coin}": 3,
+    "/api/historical/{coin}?days=30": 3,
+    "/api/historical/{coin}?days=90&format=columnar": 1,
+    "/api/dashboard/{coin}": 2
+}
+DEFAULT_COINS = ["bitcoin", "ethereum", "solana", "cardano", "ripple", "dogecoin", "polkadot", "litecoin"]
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _wait_ready(url: str, process: Optional[subprocess.Popen], timeout: float = 60.0):
+    """Espera `url` responder 200 (ou o processo terminar)"""
+    import requests
+
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process is not None and process.poll() is not None:
+            raise RuntimeError(f"Processo encerrou com código {process.returncode} antes de ficar pronto")
+        try:
+            if requests.get(url, timeout=1).status_code == 200:
+                return
+        except requests.RequestException:
+            pass
+        time.sleep(0.2)
+    raise TimeoutError(f"{url} não respondeu em {timeout:.0f}s")
+
+
+def _stop(process: subprocess.Popen):
+    process.terminate()
+    try:
+        process.wait(timeout=15)
+    except subprocess.TimeoutExpired:
+        process.kill()
+        process.wait()
+
+
+def start_stub(args) -> tuple:
+    port = _free_port()
+    command = [
+        sys.executable, "-m", "benchmarks.stub_server", "--port", str(port),
+        "--latency-ms", str(args.stub_latency_ms), "--jitter-ms", str(args.stub_jitter_ms),
+        "--error-rate", str(args.stub_error_rate), "--throttle-rate", str(args.stub_throttle_rate)
+    ]
+    if args.fixtures:
+        command += ["--fixtures", args.fixtures]
+    process = subprocess.Popen(command, cwd=ROOT)
+    _wait_ready(f"http://127.0.0.1:{port}/stats", process)
+    return process, f"http://127.0.0.1:{port}/api/v3"
+
+
+def start_app(workers: int, upstream_url: str, data_dir: str, args) -> tuple:
+    port = _free_port()
+    env = dict(
+        os.environ,
+        UPSTREAM_BASE_URL=upstream_url,
+        UPSTREAM_TRANSPORT="http",
+        UPSTREAM_RATE_PER_MIN=str(args.upstream_rate),
+        PREWARM_ENABLED="false",
+        DATA_DIR=data_dir,
+        # Modelos treinados sobre o stub não podem se misturar aos reais
+        MODELS_DIR=os.path.join(data_dir, "models")
+    )
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--host", "127.0.0.1", "--port", str(port),
+         "--workers", str(workers), "--log-level", "warning", "--no-access-log"],
+        cwd=ROOT, env=env
+    )
+    _wait_ready(f"http://127.0.0.1:{port}/health", process)
+    return process, f"http://127.0.0.1:{port}"
+
+
+def request_plan(total: int, coins: List[str], seed: int) -> List[tuple]:
+    """Sequência (endpoint, caminho) sorteada conforme os pesos de `ENDPOINTS`"""
+    rng = random.Random(seed)
+    templates = list(ENDPOINTS)
+    chosen = rng.choices(templates, weights=list(ENDPOINTS.values()), k=total)
+    return [
+        (template, template.format(coin=rng.choice(coins), coins=",".join(rng.sample(coins, min(3, len(coins))))))
+        for template in chosen
+    ]
+
+
+async def _request(session: aiohttp.ClientSession, url: str, timeout: float) -> tuple:
+    started = time.perf_counter()
+    try:
+        async with session.get(url, timeout=aiohttp.ClientTimeout(total=timeout)) as response:
+            await response.read()
+            status = response.status
+    except (aiohttp.ClientError, asyncio.TimeoutError):
+        status = 0
+    return status, time.perf_counter() - started
+
+
+async def drive(base_url: str, rps: float, duration: float, coins: List[str],
+                timeout: float, seed: int) -> List[tuple]:
+    """Dispara `rps * duration` requisições em malha aberta
+
+    Cada requisição sai no seu horário agendado, independentemente das
+    anteriores terem respondido, para que a fila da aplicação apareça na
+    latência em vez de reduzir a taxa (omissão coordenada).
+    """
+    plan = request_plan(int(rps * duration), coins, seed)
+    connector = aiohttp.TCPConnector(limit=0)
+    results = []
+    async with aiohttp.ClientSession(connector=connector) as session:
+        async def fire(template: str, path: str):
+            status, latency = await _request(session, base_url + path, timeout)
+            results.append((template, status, latency))
+
+        tasks = []
+        started = time.perf_counter()
+        for i, (template, path) in enumerate(plan):
+            delay = started + i / rps - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            tasks.append(asyncio.create_task(fire(template, path)))
+        await asyncio.gather(*tasks)
+    return results
+
+
+def summarize(results: List[tuple], duration: float) -> Dict[str, Dict]:
+    """Vazão, percentis de latência e taxa de erros por endpoint e no total"""
+    groups: Dict[str, List[tuple]] = {}
+    for template, status, latency in results:
+        groups.setdefault(template, []).append((status, latency))
+        groups.setdefault("total", []).append((status, latency))
+    summary = {}
+    for name, rows in groups.items():
+        statuses = np.array([status for status, _ in rows])
+        latencies = np.array([latency for _, latency in rows]) * 1000
+        ok = (statuses >= 200) & (statuses < 400)
+        p50, p95, p99 = np.percentile(latencies, [50, 95, 99])
+        summary[name] = {
+            "requests": len(rows),
+            "throughput": float(ok.sum() / duration),
+            "p50_ms": float(p50),
+            "p95_ms": float(p95),
+            "p99_ms": float(p99),
+            "error_rate": float(1 - ok.mean()),
+            "status": {str(code): int(count) for code, count in zip(*np.unique(statuses, return_counts=True))}
+        }
+    return summary
+
+
+def print_summary(label: str, summary: Dict[str, Dict]):
+    print(f"\n== {label} ==")
+    print(f"{'endpoint':<48} {'req':>6} {'req/s':>8} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'erros':>7}")
+    for name in sorted(summary, key=lambda key: (key == "total", key)):
+        row = summary[name]
+        print(f"{name:<48} {row['requests']:>6} {row['throughput']:>8.1f} {row['p50_ms']:>9.1f} "
+              f"{row['p95_ms']:>9.1f} {row['p99_ms']:>9.1f} {row['error_rate']:>6.1%}")
+
+
+def run_load(base_url: str, args) -> Dict[str, Dict]:
+    if args.warmup > 0:
+        asyncio.run(drive(base_url, args.rps, args.warmup, args.coins, args.timeout, args.seed + 1))
+    results = asyncio.run(drive(base_url, args.rps, args.duration, args.coins, args.timeout, args.seed))
+    return summarize(results, args.duration)
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(prog="benchmarks.load_test", description="Teste de carga dos endpoints /api/*")
+    parser.add_argument("--url", help="Aplicação já em execução (não sobe stub nem workers)")
+    parser.add_argument("--rps", type=float, default=50, help="Taxa alvo de requisições por segundo")
+    parser.add_argument("--duration", type=float, default=30, help="Duração da medição, em segundos")
+    parser.add_argument("--warmup", type=float, default=5, help="Aquecimento não medido, em segundos")
+    parser.add_argument("--workers", type=int, nargs="*", default=[1, 2, 4], help="Números de workers do uvicorn")
+    parser.add_argument("--coins", nargs="*", default=DEFAULT_COINS)
+    parser.add_argument("--timeout", type=float, default=30, help="Timeout por requisição, em segundos")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--fixtures", help="Fixtures gravadas servidas pelo stub (padrão: dados sintéticos)")
+    parser.add_argument("--stub-latency-ms", type=float, default=0)
+    parser.add_argument("--stub-jitter-ms", type=float, default=0)
+    parser.add_argument("--stub-error-rate", type=float, default=0)
+    parser.add_argument("--stub-throttle-rate", type=float, default=0)
+    parser.add_argument("--upstream-rate", type=float, default=100_000,
+                        help="UPSTREAM_RATE_PER_MIN repassado à aplicação")
+    parser.add_argument("--json", help="Grava o relatório completo neste arquivo")
+    args = parser.parse_args(argv)
+
+    report = {"rps": args.rps, "duration": args.duration, "runs": {}}
+    if args.url:
+        _wait_ready(args.url.rstrip("/") + "/health", None)
+        summary = run_load(args.url.rstrip("/"), args)
+        print_summary(args.url, summary)
+        report["runs"][args.url] = summary
+    else:
+        stub, upstream_url = start_stub(args)
+        try:
+            for workers in args.workers:
+                with tempfile.TemporaryDirectory(prefix="loadtest-") as data_dir:
+                    app, base_url = start_app(workers, upstream_url, data_dir, args)
+                    try:
+                        summary = run_load(base_url, args)
+                    finally:
+                        _stop(app)
+                label = f"{workers} worker(s)"
+                print_summary(label, summary)
+                report["runs"][label] = summary
+        finally:
+            _stop(stub)
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=1)
+        print(f"\nRelatório gravado em {args.json}")
+
+
+if __name__ == "__main__":
+    main()
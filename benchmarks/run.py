@@ -0,0 +1,278 @@
+"""
+Executa a suíte de `benchmarks/suite.py` e compara resultados entre commits
+
+Os resultados vão para `benchmarks/results/<commit>.json` (um arquivo por
+commit, com os dados da máquina), e `compare` mostra a razão entre dois
+arquivos, sinalizando regressões acima do fator tolerado.
+
+Uso:
+    python -m benchmarks.run [--bench REGEX] [--points 1000 10000] [--source synthetic]
+                             [--repeat 5] [--no-peakmem] [--output arquivo.json]
+    python -m benchmarks.run compare base.json novo.json [--factor 1.1]
+"""
+
+import argparse
+import inspect
+import itertools
+import json
+import os
+import platform
+import re
+import statistics
+import subprocess
+import sys
+import time
+import timeit
+from datetime import datetime
+from typing import Dict, List, Optional
+
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results")
+# Duração mínima de cada amostra de tempo (o número de chamadas é ajustado até atingi-la)
+MIN_SAMPLE_TIME = 0.05
+# Orçamento de tempo por benchmark; amostras além dele são descartadas
+MAX_BENCH_TIME = 10.0
+
+
+def _suite():
+    from benchmarks import suite
+    return suite
+
+
+def discover(pattern: Optional[str] = None) -> List[tuple]:
+    """Pares (classe, nome do método) da suíte, filtrados por `pattern`"""
+    found = []
+    for _, cls in inspect.getmembers(_suite(), inspect.isclass):
+        if not hasattr(cls, "params") or cls.__module__ != _suite().__name__:
+            continue
+        for name, _ in inspect.getmembers(cls, inspect.isfunction):
+            if not name.startswith(("time_", "peakmem_")):
+                continue
+            if pattern and not re.search(pattern, f"{cls.__name__}.{name}"):
+                continue
+            found.append((cls, name))
+    return found
+
+
+def _memory_kb() -> Dict[str, int]:
+    """VmRSS e VmHWM (pico) do processo atual, em kB (Linux)"""
+    usage = {}
+    with open("/proc/self/status") as f:
+        for line in f:
+            key, _, value = line.partition(":")
+            if key in ("VmRSS", "VmHWM"):
+                usage[key] = int(value.split()[0])
+    return usage
+
+
+def _reset_peak() -> bool:
+    """Zera o pico de RSS do processo (Linux); False se não for possível"""
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+        return True
+    except OSError:
+        return False
+
+
+def measure_time(bench, method: str, params: tuple, repeat: int) -> Dict:
+    """Mediana, mínimo e máximo do tempo por chamada, em segundos"""
+    func = getattr(bench, method)
+    timer = timeit.Timer(lambda: func(*params))
+    number = 1
+    while True:
+        elapsed = timer.timeit(number)
+        if elapsed >= MIN_SAMPLE_TIME or number >= 1_000_000:
+            break
+        number *= 10
+    samples = [elapsed / number]
+    budget = max(1, min(repeat - 1, int(MAX_BENCH_TIME / max(elapsed, 1e-9))))
+    samples += [value / number for value in timer.repeat(repeat=budget, number=number)]
+    return {
+        "median": statistics.median(samples),
+        "min": min(samples),
+        "max": max(samples),
+        "number": number,
+        "samples": len(samples)
+    }
+
+
+def measure_peakmem(bench, method: str, params: tuple) -> Dict:
+    """Pico de memória do processo durante a chamada, acima do RSS após o `setup`"""
+    reset = _reset_peak()
+    before = _memory_kb()
+    getattr(bench, method)(*params)
+    after = _memory_kb()
+    return {
+        "peak": (after["VmHWM"] - before["VmRSS"]) * 1024 if reset else None,
+        "process_peak": after["VmHWM"] * 1024
+    }
+
+
+def _setup(cls, params: tuple):
+    bench = cls()
+    if hasattr(bench, "setup"):
+        bench.setup(*params)
+    return bench
+
+
+def child(name: str, params: List[str]):
+    """Mede um `peakmem_*` em um processo novo e imprime o resultado em JSON"""
+    class_name, method = name.split(".")
+    cls = getattr(_suite(), class_name)
+    typed = tuple(type(values[0])(value) for values, value in zip(cls.params, params))
+    print(json.dumps(measure_peakmem(_setup(cls, typed), method, typed)))
+
+
+def run_peakmem(name: str, params: tuple) -> Dict:
+    output = subprocess.run(
+        [sys.executable, "-m", "benchmarks.run", "--child", name, *map(str, params)],
+        check=True, capture_output=True, text=True
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def _git(*args: str) -> str:
+    try:
+        return subprocess.run(
+            ["git", *args], check=True, capture_output=True, text=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return ""
+
+
+def machine_info() -> Dict:
+    import numpy
+    import sklearn
+    return {
+        "hostname": platform.node(),
+        "platform": platform.platform(),
+        "processor": platform.processor() or platform.machine(),
+        "cpu_count": os.cpu_count(),
+        "python": platform.python_version(),
+        "numpy": numpy.__version__,
+        "sklearn": sklearn.__version__
+    }
+
+
+def run(args) -> Dict:
+    commit = _git("rev-parse", "--short", "HEAD") or "unknown"
+    if _git("status", "--porcelain", "--untracked-files=no"):
+        commit += "-dirty"
+    results = {}
+    for cls, method in discover(args.bench):
+        if method.startswith("peakmem_") and args.no_peakmem:
+            continue
+        name = f"{cls.__name__}.{method}"
+        values = {}
+        for params in itertools.product(*cls.params):
+            if args.points and params[0] not in args.points:
+                continue
+            if args.source and params[1] not in args.source:
+                continue
+            key = ",".join(map(str, params))
+            try:
+                if method.startswith("time_"):
+                    value = measure_time(_setup(cls, params), method, params, args.repeat)
+                    shown = f"{value['median'] * 1e3:12.3f} ms"
+                else:
+                    value = run_peakmem(name, params)
+                    peak = value["peak"] if value["peak"] is not None else value["process_peak"]
+                    shown = f"{peak / 2**20:12.1f} MB"
+            except NotImplementedError:
+                value, shown = None, f"{'ignorado':>15}"
+            except subprocess.CalledProcessError as e:
+                if "SkipBenchmark" not in e.stderr:
+                    raise
+                value, shown = None, f"{'ignorado':>15}"
+            values[key] = value
+            print(f"{name:<45} {key:<20} {shown}", flush=True)
+        results[name] = {
+            "unit": "seconds" if method.startswith("time_") else "bytes",
+            "param_names": list(cls.param_names),
+            "values": values
+        }
+
+    report = {
+        "commit": commit,
+        "date": datetime.now().isoformat(),
+        "machine": machine_info(),
+        "results": results
+    }
+    output = args.output or os.path.join(RESULTS_DIR, f"{commit}.json")
+    os.makedirs(os.path.dirname(output) or ".", exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=1, sort_keys=True)
+    print(f"Resultados gravados em {output}")
+    return report
+
+
+def _headline(value: Dict, unit: str) -> Optional[float]:
+    if value is None:
+        return None
+    if unit == "seconds":
+        return value["median"]
+    return value["peak"] if value["peak"] is not None else value["process_peak"]
+
+
+def compare(base_path: str, new_path: str, factor: float) -> int:
+    """Mostra a razão novo/base de cada medição; retorna 1 se houver regressão"""
+    with open(base_path, "r", encoding="utf-8") as f:
+        base = json.load(f)
+    with open(new_path, "r", encoding="utf-8") as f:
+        new = json.load(f)
+    if base.get("machine", {}).get("hostname") != new.get("machine", {}).get("hostname"):
+        print("Aviso: resultados de máquinas diferentes", file=sys.stderr)
+
+    print(f"{base['commit']} -> {new['commit']} (tolerância {factor:.2f}x)")
+    regressions = 0
+    for name in sorted(set(base["results"]) & set(new["results"])):
+        unit = new["results"][name]["unit"]
+        old_values = base["results"][name]["values"]
+        for key, value in new["results"][name]["values"].items():
+            before = _headline(old_values.get(key), unit)
+            after = _headline(value, unit)
+            if before is None or after is None or before <= 0:
+                continue
+            ratio = after / before
+            if ratio > factor:
+                mark = "PIOR"
+                regressions += 1
+            elif ratio < 1 / factor:
+                mark = "melhor"
+            else:
+                mark = ""
+            scale, suffix = (1e3, "ms") if unit == "seconds" else (1 / 2**20, "MB")
+            print(f"{mark:>6} {ratio:6.2f}x  {name:<45} {key:<20} "
+                  f"{before * scale:10.3f} -> {after * scale:10.3f} {suffix}")
+    print(f"{regressions} regressões")
+    return 1 if regressions else 0
+
+
+def main(argv: Optional[List[str]] = None):
+    argv = sys.argv[1:] if argv is None else argv
+    if argv and argv[0] == "--child":
+        child(argv[1], argv[2:])
+        return
+    if argv and argv[0] == "compare":
+        parser = argparse.ArgumentParser(prog="benchmarks.run compare")
+        parser.add_argument("base")
+        parser.add_argument("new")
+        parser.add_argument("--factor", type=float, default=1.1, help="Razão a partir da qual é regressão")
+        args = parser.parse_args(argv[1:])
+        sys.exit(compare(args.base, args.new, args.factor))
+
+    parser = argparse.ArgumentParser(prog="benchmarks.run", description="Suíte de micro-benchmarks")
+    parser.add_argument("--bench", help="Expressão regular sobre Classe.método")
+    parser.add_argument("--points", type=int, nargs="*", help="Tamanhos de série (padrão: todos)")
+    parser.add_argument("--source", nargs="*", help="synthetic e/ou recorded (padrão: ambas)")
+    parser.add_argument("--repeat", type=int, default=5, help="Amostras por medição de tempo")
+    parser.add_argument("--no-peakmem", action="store_true", help="Não mede pico de memória")
+    parser.add_argument("--output", help="Arquivo de resultados (padrão: results/<commit>.json)")
+    args = parser.parse_args(argv)
+    started = time.perf_counter()
+    run(args)
+    print(f"Concluído em {time.perf_counter() - started:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,185 @@
+"""
+Tempo de inicialização: import da aplicação, `/health` e `/ready`
+
+Cada medição roda em um processo novo (interpretador frio, com os `.pyc` já
+compilados):
+
+- `import`: tempo de `import main`, e os pacotes que mais pesam nele
+  (tempo próprio somado por pacote, a partir de `python -X importtime`);
+- `health` e `ready`: do lançamento do `uvicorn` até `/health` e `/ready`
+  responderem 200, com a aplicação apontada para o servidor local da
+  CoinGecko (`benchmarks.stub_server`).
+
+Rode no commit base e no da mudança para comparar.
+
+Uso:
+    python -m benchmarks.startup [--repeat 5] [--top 10] [--no-server]
+                                 [--models-dir models] [--no-prewarm] [--json resultado.json]
+"""
+
+import argparse
+import json
+import os
+import re
+import subprocess
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from benchmarks.load_test import ROOT, _free_port, _stop, start_stub
+
+_IMPORT_SNIPPET = "import time; t = time.perf_counter(); import main; print(time.perf_counter() - t)"
+_IMPORTTIME_LINE = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \|(\s*)(\S+)$")
+
+
+def _distribution(values: List[float]) -> Optional[Dict]:
+    if not values:
+        return None
+    return {
+        "median": round(float(np.median(values)), 4),
+        "min": round(min(values), 4),
+        "max": round(max(values), 4),
+        "samples": [round(value, 4) for value in values]
+    }
+
+
+def measure_import(repeat: int) -> Dict:
+    """Tempo de `import main` em `repeat` interpretadores novos"""
+    values = []
+    for _ in range(repeat):
+        output = subprocess.run(
+            [sys.executable, "-c", _IMPORT_SNIPPET], cwd=ROOT, capture_output=True, text=True, check=True
+        ).stdout
+        values.append(float(output.strip().splitlines()[-1]))
+    return _distribution(values)
+
+
+def import_breakdown(top: int) -> List[Dict]:
+    """Pacotes com mais tempo próprio de import (segundos), do maior para o menor"""
+    stderr = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import main"], cwd=ROOT, capture_output=True, text=True, check=True
+    ).stderr
+    totals: Dict[str, int] = defaultdict(int)
+    for line in stderr.splitlines():
+        match = _IMPORTTIME_LINE.match(line)
+        if match is not None:
+            totals[match.group(4).split(".")[0]] += int(match.group(1))
+    ranked = sorted(totals.items(), key=lambda item: item[1], reverse=True)[:top]
+    return [{"package": package, "seconds": round(us / 1e6, 4)} for package, us in ranked]
+
+
+def _poll(base_url: str, process: subprocess.Popen, launched: float, timeout: float) -> Dict[str, float]:
+    """Segundos desde o lançamento até `/health` e `/ready` responderem 200
+
+    Versões sem `/ready` (404) ficam com None.
+    """
+    import requests
+
+    reached: Dict[str, Optional[float]] = {}
+    deadline = time.monotonic() + timeout
+    while len(reached) < 2 and time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"Aplicação encerrou com código {process.returncode}")
+        for path in ("health", "ready"):
+            if path in reached:
+                continue
+            try:
+                status = requests.get(f"{base_url}/{path}", timeout=1).status_code
+                if status == 200:
+                    reached[path] = time.monotonic() - launched
+                elif status == 404:
+                    reached[path] = None
+            except requests.RequestException:
+                pass
+        time.sleep(0.02)
+    if len(reached) < 2:
+        raise TimeoutError(f"A aplicação não ficou pronta em {timeout:.0f}s")
+    return reached
+
+
+def measure_server(upstream_url: str, args) -> Dict:
+    """Tempo até `/health` e `/ready` com um worker do uvicorn, `repeat` vezes"""
+    samples: Dict[str, List[float]] = {"health": [], "ready": []}
+    warmup: Optional[Dict] = None
+    for _ in range(args.repeat):
+        with tempfile.TemporaryDirectory(prefix="startup-") as data_dir:
+            port = _free_port()
+            env = dict(
+                os.environ,
+                UPSTREAM_BASE_URL=upstream_url,
+                UPSTREAM_TRANSPORT="http",
+                UPSTREAM_RATE_PER_MIN="100000",
+                PREWARM_ENABLED="false" if args.no_prewarm else "true",
+                DATA_DIR=data_dir,
+                MODELS_DIR=args.models_dir or os.path.join(data_dir, "models")
+            )
+            launched = time.monotonic()
+            process = subprocess.Popen(
+                [sys.executable, "-m", "uvicorn", "main:app", "--host", "127.0.0.1", "--port", str(port),
+                 "--log-level", "warning", "--no-access-log"],
+                cwd=ROOT, env=env
+            )
+            try:
+                reached = _poll(f"http://127.0.0.1:{port}", process, launched, args.timeout)
+                if reached["ready"] is not None:
+                    import requests
+                    warmup = requests.get(f"http://127.0.0.1:{port}/ready", timeout=5).json()
+            finally:
+                _stop(process)
+        for path, seconds in reached.items():
+            if seconds is not None:
+                samples[path].append(seconds)
+    return {
+        "health": _distribution(samples["health"]),
+        "ready": _distribution(samples["ready"]),
+        "last_warmup": warmup
+    }
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(prog="benchmarks.startup", description="Tempo de inicialização da aplicação")
+    parser.add_argument("--repeat", type=int, default=5, help="Processos medidos por métrica")
+    parser.add_argument("--top", type=int, default=10, help="Pacotes listados no detalhamento do import")
+    parser.add_argument("--no-server", action="store_true", help="Mede só o import (sem uvicorn)")
+    parser.add_argument("--no-prewarm", action="store_true", help="Desliga o aquecimento das top-N moedas")
+    parser.add_argument("--models-dir", help="Modelos carregados no aquecimento (padrão: diretório vazio)")
+    parser.add_argument("--timeout", type=float, default=180, help="Limite por inicialização, em segundos")
+    parser.add_argument("--json", help="Grava o relatório completo neste arquivo")
+    args = parser.parse_args(argv)
+
+    report = {"python": sys.version.split()[0], "import": measure_import(args.repeat),
+              "import_breakdown": import_breakdown(args.top)}
+    print(f"import main: mediana {report['import']['median'] * 1000:.0f} ms "
+          f"(mín {report['import']['min'] * 1000:.0f} ms, {args.repeat} processos)")
+    for entry in report["import_breakdown"]:
+        print(f"  {entry['package']:<24} {entry['seconds'] * 1000:8.1f} ms")
+
+    if not args.no_server:
+        stub, upstream_url = start_stub(argparse.Namespace(
+            stub_latency_ms=0, stub_jitter_ms=0, stub_error_rate=0, stub_throttle_rate=0, fixtures=None
+        ))
+        try:
+            report["server"] = measure_server(upstream_url, args)
+        finally:
+            _stop(stub)
+        for path in ("health", "ready"):
+            value = report["server"][path]
+            if value is None:
+                print(f"/{path}: indisponível nesta versão")
+                continue
+            print(f"/{path}: mediana {value['median'] * 1000:.0f} ms "
+                  f"(mín {value['min'] * 1000:.0f} ms, máx {value['max'] * 1000:.0f} ms)")
+        for name, component in ((report["server"]["last_warmup"] or {}).get("components") or {}).items():
+            print(f"  {name:<24} {component['status']:<8} {component['seconds'] * 1000:8.0f} ms")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
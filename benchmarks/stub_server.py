@@ -0,0 +1,170 @@
+"""
+Servidor local que imita os endpoints da CoinGecko usados pela aplicação
+
+Responde com fixtures gravadas (`--fixtures`, ver `UPSTREAM_TRANSPORT=record`)
+ou com dados sintéticos determinísticos, com latência, erros e 429 injetados
+conforme as opções. Aponte a aplicação para ele com
+`UPSTREAM_BASE_URL=http://127.0.0.1:8765/api/v3`.
+
+Uso:
+    python -m benchmarks.stub_server [--port 8765] [--fixtures DIR] [--latency-ms 50]
+                                     [--jitter-ms 20] [--error-rate 0.01] [--throttle-rate 0.01]
+"""
+
+import argparse
+import time
+import zlib
+from typing import Dict, Optional
+
+import numpy as np
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+
+from app.rate_limiter import UpstreamThrottled
+from app.transport import FaultInjectingTransport, ReplayTransport, Transport
+
+DAY_MS = 86_400_000
+HOUR_MS = 3_600_000
+
+UNIVERSE = [
+    "bitcoin", "ethereum", "tether", "binancecoin", "solana", "ripple", "usd-coin",
+    "cardano", "dogecoin", "tron", "avalanche-2", "polkadot", "chainlink", "litecoin",
+    "polygon", "uniswap", "stellar", "monero", "cosmos", "near"
+]
+
+
+class SyntheticTransport(Transport):
+    """Dados de mercado sintéticos e determinísticos para qualquer moeda
+
+    O preço de cada moeda é uma função do timestamp (ondas de 30 e 7 dias e
+    ruído derivado do intervalo), de modo que janelas diferentes e buscas
+    incrementais (`market_chart/range`) enxergam a mesma série.
+    """
+
+    @staticmethod
+    def _seed(coin_id: str) -> int:
+        return zlib.crc32(coin_id.encode("utf-8"))
+
+    def _prices(self, coin_id: str, timestamps: np.ndarray) -> np.ndarray:
+        seed = self._seed(coin_id)
+        base = 1 + seed % 50_000
+        phase = (seed % 360) * np.pi / 180
+        t = timestamps / DAY_MS
+        noise = np.modf(np.sin(timestamps // HOUR_MS * 12.9898 + seed) * 43758.5453)[0]
+        return base * np.exp(
+            0.3 * np.sin(2 * np.pi * t / 30 + phase) + 0.1 * np.sin(2 * np.pi * t / 7) + 0.02 * noise
+        )
+
+    def _chart(self, coin_id: str, start_ms: int, end_ms: int, step_ms: int) -> Dict:
+        timestamps = np.arange(start_ms - start_ms % step_ms + step_ms, end_ms, step_ms, dtype=np.int64)
+        timestamps = np.append(timestamps, end_ms)
+        prices = self._prices(coin_id, timestamps)
+        volumes = prices * 1e6 * (1 + (self._seed(coin_id) % 7))
+        stamps = timestamps.tolist()
+        return {
+            "prices": list(zip(stamps, prices.tolist())),
+            "market_caps": list(zip(stamps, (prices * 1e7).tolist())),
+            "total_volumes": list(zip(stamps, volumes.tolist()))
+        }
+
+    def _market_row(self, coin_id: str, rank: int) -> Dict:
+        now = int(time.time() * 1000)
+        prices = self._prices(coin_id, np.array([now - DAY_MS, now]))
+        return {
+            "id": coin_id,
+            "symbol": coin_id[:4],
+            "name": coin_id.replace("-", " ").title(),
+            "current_price": float(prices[-1]),
+            "market_cap": float(prices[-1] * 1e7),
+            "market_cap_rank": rank,
+            "total_volume": float(prices[-1] * 1e6),
+            "high_24h": float(prices.max()),
+            "low_24h": float(prices.min()),
+            "price_change_percentage_24h": float((prices[-1] / prices[0] - 1) * 100),
+            "last_updated": time.strftime("%Y-%m-%dT%H:%M:%S.000Z", time.gmtime())
+        }
+
+    def get(self, endpoint: str, params: Optional[Dict] = None):
+        params = params or {}
+        now = int(time.time() * 1000)
+        parts = endpoint.strip("/").split("/")
+        if endpoint == "coins/markets":
+            if params.get("ids"):
+                ids = str(params["ids"]).split(",")
+            else:
+                ids = UNIVERSE[:int(params.get("per_page", 100))]
+            return [self._market_row(coin_id, rank + 1) for rank, coin_id in enumerate(ids)]
+        if endpoint == "search/trending":
+            return {"coins": [
+                {"item": {"id": coin_id, "name": coin_id.title(), "symbol": coin_id[:4],
+                          "market_cap_rank": rank + 1}}
+                for rank, coin_id in enumerate(UNIVERSE[:15])
+            ]}
+        if len(parts) == 3 and parts[0] == "coins" and parts[2] == "market_chart":
+            days = int(params.get("days", 30))
+            step = DAY_MS if params.get("interval") == "daily" or days > 90 else HOUR_MS
+            return self._chart(parts[1], now - days * DAY_MS, now, step)
+        if len(parts) == 4 and parts[0] == "coins" and parts[2:] == ["market_chart", "range"]:
+            start, end = int(params["from"]) * 1000, min(int(params["to"]) * 1000, now)
+            return self._chart(parts[1], start, end, HOUR_MS)
+        if len(parts) == 2 and parts[0] == "coins":
+            row = self._market_row(parts[1], 1)
+            return {"id": row["id"], "symbol": row["symbol"], "name": row["name"],
+                    "market_data": {"current_price": {"usd": row["current_price"]}}}
+        raise Exception(f"Erro ao buscar dados da API: endpoint desconhecido {endpoint}")
+
+    async def aget(self, endpoint: str, params: Optional[Dict] = None):
+        return self.get(endpoint, params)
+
+    def stats(self) -> Dict:
+        return {"type": "synthetic"}
+
+
+def create_app(source: Transport) -> FastAPI:
+    """Aplicação que expõe `source` como a API da CoinGecko (`/api/v3/...`)"""
+    app = FastAPI(title="CoinGecko stub")
+
+    @app.get("/api/v3/{endpoint:path}")
+    async def upstream(endpoint: str, request: Request):
+        try:
+            return await source.aget(endpoint, dict(request.query_params))
+        except UpstreamThrottled as e:
+            return JSONResponse(
+                {"status": {"error_code": 429, "error_message": "rate limited"}},
+                status_code=429, headers={"Retry-After": str(int(e.retry_after or 1))}
+            )
+        except Exception as e:
+            status_code = 404 if "sem fixture" in str(e) or "desconhecido" in str(e) else 500
+            return JSONResponse({"error": str(e)}, status_code=status_code)
+
+    @app.get("/stats")
+    async def stats():
+        return source.stats()
+
+    return app
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Servidor local no lugar da API da CoinGecko")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--fixtures", help="Diretório de fixtures gravadas (padrão: dados sintéticos)")
+    parser.add_argument("--latency-ms", type=float, default=0)
+    parser.add_argument("--jitter-ms", type=float, default=0)
+    parser.add_argument("--error-rate", type=float, default=0)
+    parser.add_argument("--throttle-rate", type=float, default=0)
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args()
+
+    source: Transport = ReplayTransport(args.fixtures) if args.fixtures else SyntheticTransport()
+    if args.latency_ms or args.jitter_ms or args.error_rate or args.throttle_rate:
+        source = FaultInjectingTransport(
+            source, args.latency_ms / 1000, args.jitter_ms / 1000,
+            args.error_rate, args.throttle_rate, seed=args.seed
+        )
+    uvicorn.run(create_app(source), host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
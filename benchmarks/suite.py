@@ -0,0 +1,199 @@
+"""
+Suíte de micro-benchmarks (no estilo asv): indicadores, features, treino e inferência
+
+Cada classe declara `params`/`param_names`, prepara os dados em `setup` e
+expõe métodos `time_*` (tempo por chamada) e `peakmem_*` (pico de memória
+do processo). Tudo roda offline, sobre séries sintéticas ou sobre uma série
+gravada (`BENCH_RECORDED`: resposta JSON de `market_chart` ou `.npy` do
+armazenamento local), estendida até o número de pontos pedido.
+
+Execute com `python -m benchmarks.run`.
+"""
+
+import json
+import os
+from functools import lru_cache
+
+import numpy as np
+from sklearn.ensemble import RandomForestRegressor
+
+from app.compact_forest import CompactForest
+from app.indicators import compute_indicators, ema_series, macd_series, rsi_series, sma_series
+from app.ml_engine import MLPredictor
+from app.price_series import PriceSeries
+from app.technical_analysis import TechnicalAnalyzer
+
+POINTS = [1_000, 10_000, 100_000]
+SOURCES = ["synthetic", "recorded"]
+
+
+class SkipBenchmark(NotImplementedError):
+    """Combinação de parâmetros indisponível (como `NotImplementedError` no asv)"""
+
+
+def synthetic_series(n: int, seed: int = 42) -> PriceSeries:
+    """Passeio aleatório geométrico diário com volume correlacionado ao movimento"""
+    rng = np.random.default_rng(seed)
+    returns = rng.normal(0, 0.02, n)
+    prices = 100.0 * np.exp(np.cumsum(returns))
+    volumes = 1e6 * (1 + 20 * np.abs(returns)) * rng.uniform(0.8, 1.2, n)
+    timestamps = 1_500_000_000_000 + np.arange(n, dtype=np.int64) * 86_400_000
+    return PriceSeries(timestamps, prices, volumes)
+
+
+@lru_cache(maxsize=1)
+def _recording() -> PriceSeries:
+    path = os.getenv("BENCH_RECORDED")
+    if not path or not os.path.exists(path):
+        raise SkipBenchmark("Defina BENCH_RECORDED com uma série gravada")
+    if path.endswith(".npy"):
+        return PriceSeries.from_records(np.load(path))
+    with open(path, "r", encoding="utf-8") as f:
+        return PriceSeries.from_market_chart(json.load(f))
+
+
+def recorded_series(n: int) -> PriceSeries:
+    """Série gravada repetida até `n` pontos
+
+    Os retornos logarítmicos e os volumes gravados são reaplicados em
+    sequência, preservando a volatilidade real da série.
+    """
+    recording = _recording()
+    if len(recording) < 2:
+        raise SkipBenchmark("Série gravada com menos de 2 pontos")
+    log_returns = np.diff(np.log(recording.prices))
+    reps = -(-(n - 1) // len(log_returns))
+    prices = recording.prices[0] * np.exp(np.concatenate([[0.0], np.cumsum(np.tile(log_returns, reps)[:n - 1])]))
+    volumes = np.resize(recording.volumes, n)
+    step = int(np.median(np.diff(recording.timestamps)))
+    timestamps = int(recording.timestamps[0]) + np.arange(n, dtype=np.int64) * step
+    return PriceSeries(timestamps, prices, volumes)
+
+
+def load_series(points: int, source: str) -> PriceSeries:
+    if source == "recorded":
+        return recorded_series(points)
+    return synthetic_series(points)
+
+
+class Indicators:
+    """Séries completas de cada indicador e a análise técnica sobre o histórico"""
+
+    params = (POINTS, SOURCES)
+    param_names = ["points", "source"]
+
+    def setup(self, points, source):
+        self.prices = load_series(points, source).prices
+        self.analyzer = TechnicalAnalyzer()
+
+    def time_sma_20(self, points, source):
+        sma_series(self.prices, 20)
+
+    def time_sma_50(self, points, source):
+        sma_series(self.prices, 50)
+
+    def time_ema_12(self, points, source):
+        ema_series(self.prices, 12)
+
+    def time_ema_26(self, points, source):
+        ema_series(self.prices, 26)
+
+    def time_rsi_14(self, points, source):
+        rsi_series(self.prices, 14)
+
+    def time_macd(self, points, source):
+        macd_series(self.prices, 12, 26, 9)
+
+    def time_compute_indicators(self, points, source):
+        compute_indicators(self.prices)
+
+    def time_analyze_historical(self, points, source):
+        self.analyzer.analyze_historical("bench", self.prices)
+
+    def peakmem_compute_indicators(self, points, source):
+        compute_indicators(self.prices)
+
+
+class Features:
+    """Matriz de features do treino e features da última janela (predição)"""
+
+    params = (POINTS, SOURCES)
+    param_names = ["points", "source"]
+
+    def setup(self, points, source):
+        series = load_series(points, source)
+        self.prices = series.prices
+        self.volumes = series.volumes
+        self.predictor = MLPredictor()
+
+    def timebuild_feature_matrix(self, points, source):
+        self.predictor.build_feature_matrix(self.prices, self.volumes, 30)
+
+    def time_create_features(self, points, source):
+        self.predictor._create_features(self.prices[-60:], self.volumes[-60:])
+
+    def time_prepare_training_data(self, points, source):
+        self.predictor._prepare_training_data(self.prices, self.volumes, 7)
+
+    def peakmembuild_feature_matrix(self, points, source):
+        self.predictor.build_feature_matrix(self.prices, self.volumes, 30)
+
+
+class Training:
+    """Treino da floresta com os hiperparâmetros de `train_model`"""
+
+    params = (POINTS, SOURCES)
+    param_names = ["points", "source"]
+    timeout = 600
+
+    def setup(self, points, source):
+        series = load_series(points, source)
+        self.X, self.y = MLPredictor()._prepare_training_data(series.prices, series.volumes, 7)
+
+    def _fit(self):
+        return RandomForestRegressor(
+            n_estimators=100, max_depth=10, random_state=42, n_jobs=-1
+        ).fit(self.X, self.y)
+
+    def time_fit(self, points, source):
+        self._fit()
+
+    def peakmem_fit(self, points, source):
+        self._fit()
+
+
+class Inference:
+    """Latência de predição de uma linha e vazão sobre todas as linhas"""
+
+    params = (POINTS, SOURCES)
+    param_names = ["points", "source"]
+
+    def setup(self, points, source):
+        series = load_series(points, source)
+        predictor = MLPredictor()
+        X, y = predictor._prepare_training_data(series.prices, series.volumes, 7)
+        # O custo da predição depende da profundidade das árvores, não do tamanho do treino
+        self.model = RandomForestRegressor(
+            n_estimators=100, max_depth=10, random_state=42, n_jobs=-1
+        ).fit(X[-5_000:], y[-5_000:])
+        self.forest = CompactForest.from_estimator(self.model)
+        self.X = np.ascontiguousarray(X, dtype=np.float32)
+        self.latest = predictor._create_features(series.prices[-60:], series.volumes[-60:])
+
+    def time_to_compact(self, points, source):
+        CompactForest.from_estimator(self.model)
+
+    def time_predict_latest_sklearn(self, points, source):
+        self.model.predict(self.latest)
+
+    def time_predict_latest_compact(self, points, source):
+        self.forest.tree_predictions(self.latest)
+
+    def time_predict_all_sklearn(self, points, source):
+        self.model.predict(self.X)
+
+    def time_predict_all_compact(self, points, source):
+        self.forest.predict(self.X)
+
+    def peakmem_predict_all_compact(self, points, source):
+        self.forest.predict(self.X)
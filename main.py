@@ -3,23 +3,58 @@ CryptoAnalytics Pro - Sistema de Análise e Predição de Criptomoedas
 Aplicação principal FastAPI
 """
 
-from fastapi import FastAPI, HTTPException
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, HTTPException, WebSocket
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import HTMLResponse
+from fastapi.responses import HTMLResponse, JSONResponse, Response
 from app.api import router
 from app.models import CryptoInfo, PredictionResponse, TechnicalAnalysis
+from app.data_fetcher import async_coin_gecko
+from app.technical_analysis import analyzer
+from app.jobs import training_jobs
+from app.prewarm import prewarmer
+from app.stream import stream_hub
+from app.warmup import warmup
+from app.metrics import CONTENT_TYPE, MetricsMiddleware, metrics
+from app.profiling import ProfilingMiddleware
 import uvicorn
 import os
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Ciclo de vida da aplicação"""
+    # Restaurar os estados incrementais de indicadores
+    analyzer.streams.load(analyzer.state_path)
+    # Aquecer as principais moedas em segundo plano
+    if os.getenv("PREWARM_ENABLED", "true").lower() == "true":
+        prewarmer.start()
+    # Carregar dependências pesadas, modelos e caches sem atrasar o início do serviço
+    warmup.start()
+    yield
+    await warmup.stop()
+    await prewarmer.stop()
+    await stream_hub.close()
+    analyzer.streams.save(analyzer.state_path)
+    training_jobs.shutdown()
+    # Fechar o pool de conexões do cliente assíncrono
+    await async_coin_gecko.close()
+
 # Criar instância do FastAPI
 app = FastAPI(
     title="CryptoAnalytics Pro API",
     description="API profissional para análise e predição de criptomoedas usando Machine Learning",
     version="1.0.0",
     docs_url="/docs",
-    redoc_url="/redoc"
+    redoc_url="/redoc",
+    lifespan=lifespan
 )
 
+# Perfil por amostragem de requisições de /api/* (sob demanda ou 1 a cada N)
+app.add_middleware(ProfilingMiddleware)
+
+# Latência por rota e requisições em andamento, expostas em /metrics
+app.add_middleware(MetricsMiddleware)
+
 # Incluir rotas da API
 app.include_router(router, prefix="/api", tags=["Crypto Analytics"])
 
@@ -32,6 +67,11 @@ async def read_root():
     with open("static/index.html", "r", encoding="utf-8") as f:
         return HTMLResponse(content=f.read())
 
+@app.websocket("/ws/stream")
+async def stream(websocket: WebSocket):
+    """Atualizações ao vivo de preço e indicadores das moedas inscritas"""
+    await stream_hub.serve(websocket)
+
 @app.get("/health")
 async def health_check():
     """Endpoint de health check"""
@@ -41,6 +81,17 @@ async def health_check():
         "version": "1.0.0"
     }
 
+@app.get("/ready")
+async def readiness_check():
+    """Prontidão: 200 depois do aquecimento de modelos e caches, 503 enquanto ele roda"""
+    status = warmup.status()
+    return JSONResponse(content=status, status_code=200 if status["ready"] else 503)
+
+@app.get("/metrics", include_in_schema=False)
+async def get_metrics():
+    """Métricas do processo no formato texto do Prometheus"""
+    return Response(content=metrics.render(), media_type=CONTENT_TYPE)
+
 if __name__ == "__main__":
     # Permitir configurar porta via variável de ambiente (Railway usa PORT)
     port = int(os.getenv("PORT", 8000))
@@ -4,14 +4,50 @@ const API_BASE = '/api';
 let currentCoinId = null;
 let priceChart = null;
 let historicalChart = null;
+let stream = null;
 
 // Inicialização
 document.addEventListener('DOMContentLoaded', function() {
     loadTrendingCryptos();
     setupEventListeners();
     initializeHeroChart();
+    connectStream();
 });
 
+// Canal de atualizações ao vivo (uma atualização por moeda compartilhada no servidor)
+function connectStream() {
+    const protocol = window.location.protocol === 'https:' ? 'wss' : 'ws';
+    stream = new WebSocket(`${protocol}://${window.location.host}/ws/stream`);
+    
+    stream.onopen = () => {
+        if (currentCoinId) streamSubscribe(currentCoinId);
+    };
+    stream.onmessage = (event) => {
+        const message = JSON.parse(event.data);
+        if (message.type !== 'update' || message.coin_id !== currentCoinId) return;
+        renderCryptoSummary(message.market);
+        renderTechnicalAnalysis(message.analysis);
+    };
+    stream.onclose = () => {
+        // Reconectar após uma pausa
+        setTimeout(connectStream, 5000);
+    };
+}
+
+function streamSend(action, coinId) {
+    if (stream && stream.readyState === WebSocket.OPEN) {
+        stream.send(JSON.stringify({ action: action, coins: [coinId] }));
+    }
+}
+
+function streamSubscribe(coinId) {
+    streamSend('subscribe', coinId);
+}
+
+function streamUnsubscribe(coinId) {
+    streamSend('unsubscribe', coinId);
+}
+
 // Event Listeners
 function setupEventListeners() {
     const searchInput = document.getElementById('cryptoSearch');
@@ -75,34 +111,36 @@ async function searchCrypto() {
 // Carregar dados da criptomoeda
 async function loadCryptoData(coinId) {
     showLoading();
+    if (currentCoinId && currentCoinId !== coinId) streamUnsubscribe(currentCoinId);
     currentCoinId = coinId;
     
     try {
-        // Buscar informações básicas
-        const infoResponse = await fetch(`${API_BASE}/crypto/${coinId}`);
-        if (!infoResponse.ok) {
+        // Buscar informações, análise, predição e histórico em uma única chamada
+        // (training = modelo ainda em treinamento)
+        const response = await fetch(`${API_BASE}/dashboard/${coinId}?days=7`);
+        if (!response.ok) {
             throw new Error('Criptomoeda não encontrada');
         }
-        const cryptoInfo = await infoResponse.json();
-        
-        // Buscar análise técnica
-        const analysisResponse = await fetch(`${API_BASE}/analysis/${coinId}`);
-        const analysis = analysisResponse.ok ? await analysisResponse.json() : null;
-        
-        // Buscar predição
-        const predictionResponse = await fetch(`${API_BASE}/predict/${coinId}?days=7`);
-        const prediction = predictionResponse.ok ? await predictionResponse.json() : null;
-        
-        // Buscar dados históricos
-        const historicalResponse = await fetch(`${API_BASE}/historical/${coinId}?days=30`);
-        const historical = historicalResponse.ok ? await historicalResponse.json() : null;
+        const dashboard = await response.json();
+        const cryptoInfo = dashboard.info;
+        const analysis = dashboard.analysis;
+        const prediction = dashboard.prediction;
+        const training = dashboard.training;
+        const historical = dashboard.historical;
         
         // Renderizar dados
         renderCryptoInfo(cryptoInfo);
         if (analysis) renderTechnicalAnalysis(analysis);
         if (prediction) renderPrediction(prediction);
+        if (training) {
+            renderTrainingStatus(training.job);
+            waitForTraining(training.status_url, coinId);
+        }
         if (historical) renderHistoricalChart(historical);
         
+        // Receber as próximas atualizações pelo canal ao vivo
+        streamSubscribe(coinId);
+        
         // Scroll para conteúdo
         document.getElementById('dashboard').scrollIntoView({ behavior: 'smooth' });
         
@@ -117,42 +155,10 @@ async function loadCryptoData(coinId) {
 // Renderizar informações básicas
 function renderCryptoInfo(info) {
     const container = document.getElementById('mainContent');
-    const changeClass = info.price_change_24h >= 0 ? 'positive' : 'negative';
-    const changeIcon = info.price_change_24h >= 0 ? 'fa-arrow-up' : 'fa-arrow-down';
     
     container.innerHTML = `
         <div class="col-12 mb-4 fade-in">
-            <div class="crypto-card">
-                <div class="row align-items-center">
-                    <div class="col-md-8">
-                        <h2 class="mb-3">
-                            <i class="fab fa-bitcoin me-2"></i>
-                            ${info.name} (${info.symbol})
-                        </h2>
-                        <div class="price">$${formatNumber(info.current_price)}</div>
-                        <div class="change ${changeClass} mt-2">
-                            <i class="fas ${changeIcon} me-1"></i>
-                            ${info.price_change_24h >= 0 ? '+' : ''}${info.price_change_24h.toFixed(2)}%
-                        </div>
-                    </div>
-                    <div class="col-md-4 text-md-end">
-                        <div class="mb-2">
-                            <small class="text-muted">Market Cap</small>
-                            <div class="fw-bold">$${formatNumber(info.market_cap)}</div>
-                        </div>
-                        <div class="mb-2">
-                            <small class="text-muted">Volume 24h</small>
-                            <div class="fw-bold">$${formatNumber(info.total_volume)}</div>
-                        </div>
-                        <div>
-                            <small class="text-muted">24h High/Low</small>
-                            <div class="fw-bold">
-                                $${formatNumber(info.high_24h)} / $${formatNumber(info.low_24h)}
-                            </div>
-                        </div>
-                    </div>
-                </div>
-            </div>
+            <div class="crypto-card" id="cryptoSummary"></div>
         </div>
         <div class="col-12 fade-in">
             <div class="chart-container">
@@ -161,6 +167,47 @@ function renderCryptoInfo(info) {
             </div>
         </div>
     `;
+    renderCryptoSummary(info);
+}
+
+// Renderizar preço e dados de mercado (também usado nas atualizações ao vivo)
+function renderCryptoSummary(info) {
+    const container = document.getElementById('cryptoSummary');
+    if (!container) return;
+    const changeClass = info.price_change_24h >= 0 ? 'positive' : 'negative';
+    const changeIcon = info.price_change_24h >= 0 ? 'fa-arrow-up' : 'fa-arrow-down';
+    
+    container.innerHTML = `
+        <div class="row align-items-center">
+            <div class="col-md-8">
+                <h2 class="mb-3">
+                    <i class="fab fa-bitcoin me-2"></i>
+                    ${info.name} (${info.symbol})
+                </h2>
+                <div class="price">$${formatNumber(info.current_price)}</div>
+                <div class="change ${changeClass} mt-2">
+                    <i class="fas ${changeIcon} me-1"></i>
+                    ${info.price_change_24h >= 0 ? '+' : ''}${info.price_change_24h.toFixed(2)}%
+                </div>
+            </div>
+            <div class="col-md-4 text-md-end">
+                <div class="mb-2">
+                    <small class="text-muted">Market Cap</small>
+                    <div class="fw-bold">$${formatNumber(info.market_cap)}</div>
+                </div>
+                <div class="mb-2">
+                    <small class="text-muted">Volume 24h</small>
+                    <div class="fw-bold">$${formatNumber(info.total_volume)}</div>
+                </div>
+                <div>
+                    <small class="text-muted">24h High/Low</small>
+                    <div class="fw-bold">
+                        $${formatNumber(info.high_24h)} / $${formatNumber(info.low_24h)}
+                    </div>
+                </div>
+            </div>
+        </div>
+    `;
 }
 
 // Renderizar análise técnica
@@ -265,6 +312,51 @@ function renderPrediction(prediction) {
     `;
 }
 
+// Renderizar aviso de modelo em treinamento
+function renderTrainingStatus(job) {
+    const container = document.getElementById('mlPredictions');
+    
+    container.innerHTML = `
+        <div class="col-md-8 mx-auto fade-in">
+            <div class="prediction-card">
+                <h3><i class="fas fa-brain me-2"></i>Predição para ${job.days_ahead} dias</h3>
+                <div class="mt-4">
+                    <div class="spinner-border spinner-border-sm me-2" role="status"></div>
+                    Treinando modelo para ${job.coin_id}...
+                </div>
+            </div>
+        </div>
+    `;
+}
+
+// Acompanhar o job de treinamento e buscar a predição ao concluir
+async function waitForTraining(statusUrl, coinId) {
+    while (currentCoinId === coinId) {
+        await new Promise(resolve => setTimeout(resolve, 3000));
+        
+        try {
+            const response = await fetch(statusUrl);
+            if (!response.ok) return;
+            const job = await response.json();
+            
+            if (job.status === 'completed') {
+                const predictionResponse = await fetch(`${API_BASE}/predict/${coinId}?days=${job.days_ahead}`);
+                if (predictionResponse.ok && predictionResponse.status !== 202 && currentCoinId === coinId) {
+                    renderPrediction(await predictionResponse.json());
+                }
+                return;
+            }
+            if (job.status === 'failed' || job.status === 'cancelled') {
+                console.error('Erro no treinamento do modelo:', job.error);
+                return;
+            }
+        } catch (error) {
+            console.error('Erro ao acompanhar treinamento:', error);
+            return;
+        }
+    }
+}
+
 // Renderizar gráfico histórico
 function renderHistoricalChart(historical) {
     const ctx = document.getElementById('priceChart');
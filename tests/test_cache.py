@@ -0,0 +1,135 @@
+"""
+Single-flight do TTLCache: threads e corrotinas compartilham um carregamento por chave
+"""
+
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from app.cache import TTLCache
+
+
+def _wait_until(condition, timeout: float = 5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "condição não atingida a tempo"
+        time.sleep(0.005)
+
+
+def test_threads_share_one_load():
+    cache = TTLCache()
+    release = threading.Event()
+    calls = []
+
+    def loader():
+        calls.append(1)
+        release.wait(5)
+        return "valor"
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        futures = [pool.submit(cache.get_or_load, "chave", loader) for _ in range(8)]
+        _wait_until(lambda: cache.coalesced == 7)
+        release.set()
+        results = [future.result(5) for future in futures]
+
+    assert results == ["valor"] * 8
+    assert len(calls) == 1
+    assert cache.get("chave") == "valor"
+
+
+def test_coroutines_share_one_load():
+    cache = TTLCache()
+    calls = []
+
+    async def loader():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        return "valor"
+
+    async def main():
+        return await asyncio.gather(*(cache.aget_or_load("chave", loader) for _ in range(10)))
+
+    assert asyncio.run(main()) == ["valor"] * 10
+    assert len(calls) == 1
+    assert cache.coalesced == 9
+
+
+def test_thread_joins_coroutine_load():
+    cache = TTLCache()
+    calls = []
+
+    async def aloader():
+        calls.append("async")
+        await asyncio.sleep(0.1)
+        return "valor"
+
+    def loader():
+        calls.append("sync")
+        return "outro"
+
+    async def main():
+        leader = asyncio.ensure_future(cache.aget_or_load("chave", aloader))
+        await asyncio.sleep(0.01)
+        follower = asyncio.get_running_loop().run_in_executor(None, cache.get_or_load, "chave", loader)
+        return await asyncio.gather(leader, follower)
+
+    assert asyncio.run(main()) == ["valor", "valor"]
+    assert calls == ["async"]
+
+
+def test_cancelled_leader_does_not_break_followers():
+    cache = TTLCache()
+
+    async def loader():
+        await asyncio.sleep(0.05)
+        return "valor"
+
+    async def main():
+        leader = asyncio.ensure_future(cache.aget_or_load("chave", loader))
+        await asyncio.sleep(0)
+        follower = asyncio.ensure_future(cache.aget_or_load("chave", loader))
+        await asyncio.sleep(0)
+        leader.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await leader
+        return await follower
+
+    assert asyncio.run(main()) == "valor"
+    assert cache.get("chave") == "valor"
+
+
+def test_errors_reach_every_waiter_and_are_not_cached():
+    cache = TTLCache()
+    calls = []
+
+    async def failing():
+        calls.append(1)
+        await asyncio.sleep(0.02)
+        raise RuntimeError("falhou")
+
+    async def main():
+        return await asyncio.gather(*(cache.aget_or_load("chave", failing) for _ in range(3)),
+                                    return_exceptions=True)
+
+    results = asyncio.run(main())
+    assert all(isinstance(result, RuntimeError) for result in results)
+    assert len(calls) == 1
+    assert cache.get_or_load("chave", lambda: "depois") == "depois"
+
+
+def test_peek_does_not_count_lookups():
+    cache = TTLCache()
+    cache.set("chave", 1)
+    assert cache.peek("chave") == 1
+    assert cache.peek("ausente", "padrão") == "padrão"
+    assert (cache.hits, cache.misses) == (0, 0)
+
+
+def test_entries_expire_after_ttl():
+    cache = TTLCache()
+    cache.set("chave", 1, ttl=0.01)
+    time.sleep(0.02)
+    assert cache.get("chave") is None
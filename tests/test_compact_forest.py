@@ -0,0 +1,54 @@
+"""
+CompactForest reproduz as predições do RandomForestRegressor do scikit-learn
+"""
+
+import numpy as np
+import pytest
+
+from app.compact_forest import CompactForest
+
+pytest.importorskip("sklearn")
+from sklearn.ensemble import RandomForestRegressor  # noqa: E402
+
+
+@pytest.fixture(scope="module")
+def trained():
+    rng = np.random.default_rng(0)
+    X = rng.normal(size=(400, 10)).astype(np.float32)
+    y = X[:, 0] * 3 + np.sin(X[:, 1]) + rng.normal(scale=0.1, size=400)
+    model = RandomForestRegressor(n_estimators=15, max_depth=8, random_state=0).fit(X, y)
+    return model, CompactForest.from_estimator(model)
+
+
+def _inputs(model) -> np.ndarray:
+    rng = np.random.default_rng(1)
+    X = rng.normal(size=(300, 10))
+    # Linhas exatamente sobre os limiares das árvores (o caso de desempate)
+    tree = model.estimators_[0].tree_
+    split = tree.feature >= 0
+    on_threshold = rng.normal(size=(int(split.sum()), 10))
+    on_threshold[np.arange(len(on_threshold)), tree.feature[split]] = tree.threshold[split]
+    return np.concatenate([X, on_threshold])
+
+
+def test_tree_predictions_match_sklearn_exactly(trained):
+    model, forest = trained
+    X = _inputs(model)
+    expected = np.stack([estimator.predict(X.astype(np.float32)) for estimator in model.estimators_])
+    np.testing.assert_array_equal(forest.tree_predictions(X), expected)
+
+
+def test_predict_matches_sklearn(trained):
+    model, forest = trained
+    X = _inputs(model)
+    np.testing.assert_allclose(forest.predict(X), model.predict(X.astype(np.float32)), rtol=1e-12, atol=0)
+
+
+def test_saved_forest_predicts_the_same(trained, tmp_path):
+    model, forest = trained
+    path = str(tmp_path / "modelo.forest")
+    forest.save(path)
+    loaded = CompactForest.load(path)
+    X = _inputs(model)
+    np.testing.assert_array_equal(loaded.predict(X), forest.predict(X))
+    assert loaded.n_estimators == model.n_estimators
@@ -0,0 +1,28 @@
+"""
+Redução de séries com LTTB
+"""
+
+import numpy as np
+
+from app.downsampling import lttb_indices
+
+
+def test_keeps_endpoints_and_size():
+    x = np.arange(1000)
+    y = np.sin(x / 50)
+    indices = lttb_indices(x, y, 100)
+    assert len(indices) == 100
+    assert indices[0] == 0 and indices[-1] == 999
+    assert np.all(np.diff(indices) > 0)
+
+
+def test_preserves_spikes():
+    x = np.arange(500)
+    y = np.zeros(500)
+    y[137], y[311] = 50.0, -40.0
+    indices = lttb_indices(x, y, 20)
+    assert 137 in indices and 311 in indices
+
+
+def test_short_series_is_kept_whole():
+    np.testing.assert_array_equal(lttb_indices(np.arange(10), np.arange(10), 50), np.arange(10))
@@ -0,0 +1,76 @@
+"""
+Paridade entre o caminho incremental e o de série completa dos indicadores
+"""
+
+import numpy as np
+
+from app.price_series import PriceSeries
+from app.technical_analysis import TechnicalAnalyzer
+from app.timeseries_store import DAY_MS, SERIES_DTYPE, TimeSeriesStore
+
+HOUR_MS = 3_600_000
+START = 1_700_006_400_000  # meia-noite UTC
+
+
+def _points(timestamps, rng) -> np.ndarray:
+    points = np.zeros(len(timestamps), dtype=SERIES_DTYPE)
+    points["timestamp"] = timestamps
+    points["price"] = 100 * np.exp(np.cumsum(rng.normal(0, 0.03, len(timestamps))))
+    points["volume"] = 1e6
+    return points
+
+
+def _stored(store: TimeSeriesStore) -> PriceSeries:
+    return PriceSeries.from_records(store.load("bitcoin", "daily"))
+
+
+def test_incremental_matches_full_series_with_intraday_tail(tmp_path):
+    rng = np.random.default_rng(7)
+    store = TimeSeriesStore(str(tmp_path))
+    # 80 aberturas diárias e mais três pontos dentro do último dia
+    timestamps = np.concatenate([
+        START + np.arange(80) * DAY_MS,
+        START + 79 * DAY_MS + np.array([4, 9, 15]) * HOUR_MS
+    ])
+    store.merge("bitcoin", "daily", _points(timestamps, rng))
+    series = _stored(store)
+    assert len(series) == 81
+
+    analyzer = TechnicalAnalyzer()
+    assert analyzer.analyze_incremental("bitcoin", series) == \
+        analyzer.analyze_historical("bitcoin", series.prices)
+
+
+def test_incremental_follows_store_across_syncs(tmp_path):
+    rng = np.random.default_rng(11)
+    store = TimeSeriesStore(str(tmp_path))
+    store.merge("bitcoin", "daily", _points(START + np.arange(60) * DAY_MS, rng))
+
+    analyzer = TechnicalAnalyzer()
+    analyzer.analyze_incremental("bitcoin", _stored(store))
+    # Sincronizações de hora em hora: o preço atual muda dentro do dia e o
+    # dia seguinte abre um novo intervalo
+    for hour in range(1, 40):
+        tick = START + 59 * DAY_MS + hour * HOUR_MS
+        store.merge("bitcoin", "daily", _points([tick], rng))
+        series = _stored(store)
+        assert analyzer.analyze_incremental("bitcoin", series) == \
+            analyzer.analyze_historical("bitcoin", series.prices)
+
+
+def test_saved_state_keeps_provisional_tail(tmp_path):
+    rng = np.random.default_rng(3)
+    store = TimeSeriesStore(str(tmp_path))
+    timestamps = np.concatenate([START + np.arange(40) * DAY_MS, [START + 39 * DAY_MS + 6 * HOUR_MS]])
+    store.merge("bitcoin", "daily", _points(timestamps, rng))
+    analyzer = TechnicalAnalyzer()
+    analyzer.analyze_incremental("bitcoin", _stored(store))
+    path = str(tmp_path / "state.json")
+    analyzer.streams.save(path)
+
+    restored = TechnicalAnalyzer()
+    assert restored.streams.load(path) == 1
+    store.merge("bitcoin", "daily", _points([START + 39 * DAY_MS + 12 * HOUR_MS], rng))
+    series = _stored(store)
+    assert restored.analyze_incremental("bitcoin", series) == \
+        analyzer.analyze_historical("bitcoin", series.prices)
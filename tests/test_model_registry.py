@@ -0,0 +1,85 @@
+"""
+Registro de modelos: leituras coalescidas, gerações e despejo por memória
+"""
+
+import threading
+import time
+
+import numpy as np
+
+from app.model_registry import ModelRegistry
+
+
+def test_concurrent_loads_read_once():
+    registry = ModelRegistry()
+    release = threading.Event()
+    calls = []
+
+    def loader():
+        calls.append(1)
+        release.wait(5)
+        return np.zeros(4)
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(registry.get(("btc", 7), loader)))
+               for _ in range(5)]
+    for thread in threads:
+        thread.start()
+    deadline = time.monotonic() + 5
+    while registry.coalesced < 4 and time.monotonic() < deadline:
+        time.sleep(0.005)
+    release.set()
+    for thread in threads:
+        thread.join(5)
+
+    assert len(calls) == 1
+    assert len(results) == 5 and all(result is results[0] for result in results)
+
+
+def test_load_finished_after_invalidate_is_not_registered():
+    registry = ModelRegistry()
+    started, release = threading.Event(), threading.Event()
+
+    def stale_loader():
+        started.set()
+        release.wait(5)
+        return "antigo"
+
+    thread = threading.Thread(target=registry.get, args=(("btc", 7), stale_loader))
+    thread.start()
+    started.wait(5)
+    registry.invalidate(("btc", 7))
+    release.set()
+    thread.join(5)
+
+    assert ("btc", 7) not in registry
+    assert registry.get(("btc", 7), lambda: "novo") == "novo"
+
+
+def test_put_replaces_inflight_load():
+    registry = ModelRegistry()
+    started, release = threading.Event(), threading.Event()
+
+    def stale_loader():
+        started.set()
+        release.wait(5)
+        return "antigo"
+
+    thread = threading.Thread(target=registry.get, args=(("btc", 7), stale_loader))
+    thread.start()
+    started.wait(5)
+    registry.put(("btc", 7), "treinado", size=1)
+    release.set()
+    thread.join(5)
+
+    assert registry.get(("btc", 7), lambda: "outro") == "treinado"
+
+
+def test_least_recently_used_models_are_evicted():
+    registry = ModelRegistry(memory_budget=100)
+    for coin_id in ("a", "b", "c"):
+        registry.put((coin_id, 7), np.zeros(5))  # 40 bytes cada
+    assert ("a", 7) not in registry
+    assert ("b", 7) in registry and ("c", 7) in registry
+    assert registry.total_bytes == 80
+    assert registry.evictions == 1
@@ -0,0 +1,44 @@
+"""
+Token bucket das chamadas à API externa
+"""
+
+import pytest
+
+from app.rate_limiter import BACKGROUND, INTERACTIVE, RateLimitError, RequestScheduler, UpstreamThrottled
+
+
+def test_burst_then_reject_past_max_wait():
+    scheduler = RequestScheduler(rate=0.1, burst=2, max_wait={INTERACTIVE: 0.1, BACKGROUND: 0.1})
+    scheduler.acquire()
+    scheduler.acquire()
+    with pytest.raises(RateLimitError) as error:
+        scheduler.acquire()
+    assert error.value.retry_after >= 1.0
+    assert scheduler.granted[INTERACTIVE] == 2
+    assert scheduler.rejected[INTERACTIVE] == 1
+
+
+def test_throttled_call_is_retried():
+    scheduler = RequestScheduler(rate=100, burst=5, max_retries=2)
+    attempts = []
+
+    def fn():
+        attempts.append(1)
+        if len(attempts) == 1:
+            raise UpstreamThrottled(retry_after=0.01)
+        return "ok"
+
+    assert scheduler.call(fn) == "ok"
+    assert scheduler.retries == 1
+    assert scheduler.throttled == 1
+
+
+def test_gives_up_after_max_retries():
+    scheduler = RequestScheduler(rate=100, burst=5, max_retries=1)
+
+    def fn():
+        raise UpstreamThrottled(retry_after=0.01)
+
+    with pytest.raises(RateLimitError):
+        scheduler.call(fn)
+    assert scheduler.throttled == 2